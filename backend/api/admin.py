@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Admin API endpoints
+Operational views for diagnosing slow requests (profiles, SQL statement counts)
+and background jobs (run times, missed deadlines)
+"""
+import json
+import logging
+from flask import Blueprint, current_app, jsonify, request, send_file
+from utils.profiling import get_profiler
+from utils import query_stats
+
+logger = logging.getLogger(__name__)
+
+admin_bp = Blueprint('admin', __name__)
+
+PROFILE_MIMETYPES = {
+    'json': 'application/json',
+    'prof': 'application/octet-stream',
+    'collapsed': 'text/plain'
+}
+
+
+@admin_bp.route('/profiles', methods=['GET'])
+def list_profiles():
+    """
+    GET /api/admin/profiles?limit=50
+    Recent cProfile captures, newest first
+
+    Returns:
+        {enabled: bool, profiles: [{id, name, created, duration_ms, ...}]}
+    """
+    profiler = get_profiler(current_app)
+    if profiler is None:
+        return jsonify({'enabled': False, 'profiles': []}), 200
+
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({'enabled': True, 'profiles': profiler.list_profiles(limit)}), 200
+
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    GET /api/admin/profiles/<id>?format=json|prof|collapsed
+    One capture: summary with the top functions (json, default), the raw
+    pstats file (prof) or collapsed stacks for flamegraphs (collapsed)
+    """
+    profiler = get_profiler(current_app)
+    if profiler is None:
+        return jsonify({'error': 'Profiling is disabled (PROFILING_ENABLED)'}), 404
+
+    fmt = request.args.get('format', 'json')
+    path = profiler.path(profile_id, fmt)
+    if path is None:
+        return jsonify({'error': f'Profile {profile_id} ({fmt}) not found'}), 404
+
+    if fmt == 'json':
+        with open(path, encoding='utf-8') as f:
+            return jsonify(json.load(f)), 200
+    return send_file(path, mimetype=PROFILE_MIMETYPES[fmt], as_attachment=True,
+                     download_name=f"{profile_id}.{fmt}")
+
+
+@admin_bp.route('/query-stats', methods=['GET'])
+def get_query_stats():
+    """
+    GET /api/admin/query-stats
+    SQL statements per route and per background cycle since start (or last reset)
+
+    Returns:
+        {budget: int, routes: {name: {units, queries, avg_queries, max_queries,
+         db_time_ms, avg_db_time_ms, slowest: [...], repeated: [...]}}}
+    """
+    return jsonify({
+        'budget': current_app.config.get('SQL_QUERY_BUDGET') or 0,
+        'routes': query_stats.registry.snapshot()
+    }), 200
+
+
+@admin_bp.route('/query-stats', methods=['DELETE'])
+def reset_query_stats():
+    """DELETE /api/admin/query-stats - Clear the aggregates"""
+    query_stats.registry.reset()
+    return jsonify({'message': 'Query stats reset'}), 200
+
+
+@admin_bp.route('/jobs', methods=['GET'])
+def get_jobs():
+    """
+    GET /api/admin/jobs
+    Background jobs scheduled in this process (none on workers that are not the leader)
+
+    Returns:
+        {leader: bool, jobs: {name: {interval, align, overlap, jitter, running, runs,
+         failures, missed, last_started, last_duration_ms, avg_duration_ms,
+         max_duration_ms, max_lag_ms, next_run_in, last_error}}}
+    """
+    from services import auto_refresh
+
+    service = auto_refresh.auto_refresh_service
+    return jsonify({
+        'leader': service.is_leader if service else False,
+        'jobs': service.job_stats() if service else {}
+    }), 200
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Batch API endpoint
+Runs several read-only API calls in one HTTP request, e.g. the dashboard
+bootstrap (stats, every TWR/P&L horizon, snapshots, cash flows)
+Sub-requests are dispatched straight to their view functions in the batch's
+app context: they share its DB session and a single read transaction (every
+sub-request sees the same database state) and skip the per-request hooks
+(CORS, metrics, compression), which apply once to the batch response.
+"""
+import logging
+import time
+from flask import Blueprint, current_app, g, jsonify, request
+from werkzeug.exceptions import HTTPException
+from db.models import db
+from utils.serialization import json_fragment
+
+logger = logging.getLogger(__name__)
+
+batch_bp = Blueprint('batch', __name__)
+
+MAX_SUB_REQUESTS = 50
+
+
+def _begin_read(session):
+    """
+    Open the read transaction shared by the sub-requests
+
+    pysqlite only issues BEGIN before writes, so without it each SELECT
+    would see the latest commit. Other databases already run the session
+    in a transaction.
+    """
+    connection = session.connection()
+    if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN')
+
+
+def _sub_request(app, path):
+    """
+    Dispatch one GET to its view in a nested request context
+
+    Returns:
+        (status, body): body is the response's JSON document as bytes
+        (other content types are wrapped in a JSON string)
+    """
+    # The nested context shares the app context, hence `g`: hide the batch's own
+    # per-request state (profiling, SQL stats, timers) from the sub-request teardown
+    saved = dict(vars(g))
+    vars(g).clear()
+    try:
+        with app.test_request_context(path, method='GET', base_url=request.host_url):
+            try:
+                rv = app.dispatch_request()
+            except HTTPException as e:  # 404, 405, abort(): Flask-CORS would render them as HTML
+                return e.code, app.json.dumps({'error': e.description}).encode()
+            except Exception as e:
+                rv = app.handle_user_exception(e)  # Registered handlers, else raise
+            response = app.make_response(rv)
+            if response.is_streamed:
+                response.close()  # Runs the generator's context teardown while `g` is still hidden
+                return 400, app.json.dumps({'error': 'Streaming endpoints cannot be batched'}).encode()
+    finally:
+        vars(g).clear()
+        vars(g).update(saved)
+
+    if response.is_json:
+        return response.status_code, response.get_data().rstrip()
+    return response.status_code, app.json.dumps(response.get_data(as_text=True)).encode()
+
+
+@batch_bp.route('/batch', methods=['POST'])
+def run_batch():
+    """
+    POST /api/batch
+    Execute several GET /api/... requests and return every result
+
+    Body:
+        {requests: ["/api/performance/stats", {id: "twr7", path: "/api/performance/twr/7"}, ...]}
+
+    Returns:
+        {
+            responses: [{id, path, status, duration_ms, body}],  # In request order
+            duration_ms: float
+        }
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('requests')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Body must be {"requests": [path or {id, path}, ...]}'}), 400
+    if len(items) > MAX_SUB_REQUESTS:
+        return jsonify({'error': f'At most {MAX_SUB_REQUESTS} requests per batch'}), 400
+
+    subs = []
+    for i, item in enumerate(items):
+        path = item.get('path') if isinstance(item, dict) else item
+        if not isinstance(path, str) or not path.startswith('/api/') or path.startswith('/api/batch'):
+            return jsonify({'error': f'requests[{i}]: expected a GET path under /api/ (not /api/batch)'}), 400
+        subs.append((item.get('id', str(i)) if isinstance(item, dict) else str(i), path))
+
+    app = current_app._get_current_object()
+    started = time.perf_counter()
+    responses = []
+    try:
+        _begin_read(db.session)
+        for sub_id, path in subs:
+            sub_started = time.perf_counter()
+            try:
+                status, body = _sub_request(app, path)
+            except Exception as e:
+                logger.error(f"Batch sub-request {path} failed: {e}")
+                status, body = 500, app.json.dumps({'error': str(e)}).encode()
+            responses.append({
+                'id': sub_id,
+                'path': path,
+                'status': status,
+                'duration_ms': round((time.perf_counter() - sub_started) * 1000, 3),
+                'body': json_fragment(app, body)  # Not re-encoded with orjson
+            })
+    finally:
+        db.session.rollback()  # Read-only: end the shared transaction
+
+    g._query_budget_units = len(subs)  # SQL_QUERY_BUDGET applies per sub-request
+    return jsonify({
+        'responses': responses,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 3)
+    }), 200
@@ -4,48 +4,67 @@ Performance API endpoints
 Handles TWR analytics, P&L tracking, snapshots, and cash flows
 """
 import logging
-from flask import Blueprint, jsonify, request
-from datetime import datetime, timedelta
-from services.session_manager import session_manager
+import math
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from datetime import datetime
 from core.performance_tracker import PerformanceTracker
+from core.export import FORMATS, stream_export
+from core.bulk_import import import_stream
+from core import portfolio_summary
+from core.snapshot_store import get_snapshot_store, snapshot_dicts
 from db.models import db, Snapshot, CashFlow
+from utils.clock import get_clock
+from utils import timestamps
+from utils.serialization import wants_columnar
+from utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 performance_bp = Blueprint('performance', __name__)
 
+# Concurrent identical requests (several tabs polling) share one computation
+twr_flight = SingleFlight('twr')
+pnl_flight = SingleFlight('pnl')
+snapshot_flight = SingleFlight('create_snapshot')
+
 
 @performance_bp.route('/snapshots', methods=['GET'])
 def get_snapshots():
     """
-    GET /api/performance/snapshots?start_date=&end_date=
+    GET /api/performance/snapshots?start_date=&end_date=[&format=columnar]
     Get snapshots for a period
 
     Returns:
         {snapshots: [...], count: int}
+        columnar: {t: [epoch s], id, total_value_usd, twr, pnl, pnl_percent: [...], count: int}
     """
     try:
         # Parse query parameters
         start_date_str = request.args.get('start_date')
         end_date_str = request.args.get('end_date')
 
-        query = Snapshot.query
-
-        # Apply date filters if provided
-        if start_date_str:
-            start_date = datetime.fromisoformat(start_date_str)
-            query = query.filter(Snapshot.timestamp >= start_date)
+        # Apply date filters if provided (stored INTEGER timestamps)
+        start_ts = timestamps.encode(datetime.fromisoformat(start_date_str)) if start_date_str else None
+        end_ts = timestamps.encode(datetime.fromisoformat(end_date_str)) if end_date_str else None
 
-        if end_date_str:
-            end_date = datetime.fromisoformat(end_date_str)
-            query = query.filter(Snapshot.timestamp <= end_date)
+        # Ordered by timestamp in the store
+        snapshots, _ = get_snapshot_store().sync()
+        lo, hi = snapshots.span(start_ts, end_ts)
 
-        # Order by timestamp
-        snapshots = query.order_by(Snapshot.timestamp).all()
+        if wants_columnar(request):
+            return jsonify({
+                't': timestamps.epoch_many(snapshots['timestamp'][lo:hi]),
+                'id': snapshots['id'][lo:hi].tolist(),
+                'total_value_usd': snapshots['total_value_usd'][lo:hi].tolist(),
+                'twr': [None if math.isnan(v) else round(v, 4) for v in snapshots['twr'][lo:hi]],
+                'pnl': [None if math.isnan(v) else v for v in snapshots['pnl'][lo:hi]],
+                'pnl_percent': [None if math.isnan(v) else round(v, 4) for v in snapshots['pnl_percent'][lo:hi]],
+                'count': hi - lo
+            }), 200
 
         return jsonify({
-            'snapshots': [s.to_dict() for s in snapshots],
-            'count': len(snapshots)
+            'snapshots': snapshot_dicts(snapshots, lo, hi),
+            'count': hi - lo
         }), 200
 
     except Exception as e:
@@ -63,45 +82,47 @@ def create_snapshot():
         {message: str, snapshot: {...}}
     """
     try:
-        from db.models import LastBalance
+        # Simultaneous clicks create one snapshot, returned to every caller
+        payload, status = snapshot_flight.do('manual', _create_snapshot)
+        return jsonify(payload), status
+
+    except Exception as e:
+        logger.error(f"Error creating snapshot: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def _create_snapshot():
+    """Snapshot of the last_balance table -> (response body, status)"""
+    from db.models import LastBalance
 
-        trader = session_manager.get_trader()
-        tracker = PerformanceTracker(trader)
+    tracker = PerformanceTracker(None)  # Database only: no Binance connection needed
 
-        # Get balances from last_balance table
-        last_balances = LastBalance.query.all()
+    # Get balances from last_balance table
+    last_balances = LastBalance.query.all()
 
-        if not last_balances:
-            return jsonify({'error': 'No balances available in last_balance table'}), 400
+    if not last_balances:
+        return {'error': 'No balances available in last_balance table'}, 400
 
-        # Convert to format expected by tracker
-        balances = {
-            lb.asset: {
-                'balance': lb.balance,
-                'usd_value': lb.usd_value
-            }
-            for lb in last_balances
+    # Convert to format expected by tracker
+    balances = {
+        lb.asset: {
+            'balance': lb.balance,
+            'usd_value': lb.usd_value
         }
+        for lb in last_balances
+    }
 
-        success = tracker.save_current_snapshot(balances=balances)
+    success = tracker.save_current_snapshot(balances=balances)
 
-        if success:
-            # Get the latest snapshot
-            latest = Snapshot.query.order_by(Snapshot.timestamp.desc()).first()
+    if not success:
+        return {'error': 'Failed to create snapshot'}, 500
 
-            return jsonify({
-                'message': 'Snapshot created successfully',
-                'snapshot': latest.to_dict() if latest else None
-            }), 201
-        else:
-            return jsonify({'error': 'Failed to create snapshot'}), 500
-
-    except RuntimeError as e:
-        logger.error(f"Session not initialized: {e}")
-        return jsonify({'error': 'Binance session not initialized'}), 500
-    except Exception as e:
-        logger.error(f"Error creating snapshot: {e}")
-        return jsonify({'error': str(e)}), 500
+    # Get the latest snapshot
+    latest = Snapshot.query.order_by(Snapshot.timestamp.desc()).first()
+    return {
+        'message': 'Snapshot created successfully',
+        'snapshot': latest.to_dict() if latest else None
+    }, 201
 
 
 @performance_bp.route('/cashflows', methods=['GET'])
@@ -120,14 +141,14 @@ def get_cash_flows():
 
         query = CashFlow.query
 
-        # Apply date filters if provided
+        # Apply date filters if provided (stored INTEGER timestamps)
         if start_date_str:
-            start_date = datetime.fromisoformat(start_date_str)
-            query = query.filter(CashFlow.timestamp >= start_date)
+            start_ts = timestamps.encode(datetime.fromisoformat(start_date_str))
+            query = query.filter(CashFlow.timestamp >= start_ts)
 
         if end_date_str:
-            end_date = datetime.fromisoformat(end_date_str)
-            query = query.filter(CashFlow.timestamp <= end_date)
+            end_ts = timestamps.encode(datetime.fromisoformat(end_date_str))
+            query = query.filter(CashFlow.timestamp <= end_ts)
 
         # Order by timestamp
         cash_flows = query.order_by(CashFlow.timestamp).all()
@@ -179,16 +200,19 @@ def create_cash_flow():
             amount_usd = -amount_usd
 
         # Create cash flow with INTEGER timestamp
-        timestamp_int = int(datetime.utcnow().strftime('%Y%m%d%H%M'))
+        timestamp_int = PerformanceTracker.datetime_to_timestamp(get_clock().now())
 
         cash_flow = CashFlow(
             timestamp=timestamp_int,
-            amount_usd=int(amount_usd),
+            amount_usd=round(amount_usd, 2),
             type=cf_type
         )
 
         db.session.add(cash_flow)
+        db.session.flush()
+        portfolio_summary.record(cash_flows=[cash_flow])
         db.session.commit()
+        get_snapshot_store().add(cash_flow)
 
         logger.info(f"ðŸ’° Cash flow created: {cf_type} {amount_usd:+.2f}â‚¬")
 
@@ -225,9 +249,8 @@ def get_twr(days):
         }
     """
     try:
-        trader = session_manager.get_trader()
-        tracker = PerformanceTracker(trader)
-        metrics = tracker.calculate_performance_metrics(days)
+        tracker = PerformanceTracker(None)  # Reads the snapshot store only
+        metrics = twr_flight.do(days, lambda: tracker.calculate_performance_metrics(days))
 
         if not metrics or metrics['twr'] is None:
             return jsonify({
@@ -245,9 +268,6 @@ def get_twr(days):
 
         return jsonify(metrics), 200
 
-    except RuntimeError as e:
-        logger.error(f"Session not initialized: {e}")
-        return jsonify({'error': 'Binance session not initialized'}), 500
     except Exception as e:
         logger.error(f"Error getting TWR for {days} days: {e}")
         return jsonify({'error': str(e)}), 500
@@ -276,13 +296,10 @@ def get_pnl(days):
         }
     """
     try:
-        trader = session_manager.get_trader()
-        tracker = PerformanceTracker(trader)
+        tracker = PerformanceTracker(None)  # Reads the snapshot store only
 
-        if days == 0:
-            pnl = tracker.calculate_simple_pnl(days=None)
-        else:
-            pnl = tracker.calculate_simple_pnl(days=days)
+        # days=0 means total (None)
+        pnl = pnl_flight.do(days, lambda: tracker.calculate_simple_pnl(days=days or None))
 
         # Format dates for JSON
         pnl['period_start'] = pnl['period_start'].isoformat()
@@ -290,9 +307,6 @@ def get_pnl(days):
 
         return jsonify(pnl), 200
 
-    except RuntimeError as e:
-        logger.error(f"Session not initialized: {e}")
-        return jsonify({'error': 'Binance session not initialized'}), 500
     except Exception as e:
         logger.error(f"Error getting P&L for {days} days: {e}")
         return jsonify({'error': str(e)}), 500
@@ -313,43 +327,31 @@ def get_stats():
             total_withdrawals_usd: float,
             first_snapshot_date: str,
             last_snapshot_date: str,
-            latest_snapshot_id: int
+            latest_snapshot_id: int,
+            latest_cashflow_id: int
         }
     """
     try:
-        trader = session_manager.get_trader()
-        tracker = PerformanceTracker(trader)
-
-        # Get tracking stats
-        stats = tracker.get_tracking_stats()
-
-        # Get latest snapshot ID for cache invalidation
-        latest_snapshot = Snapshot.query.order_by(Snapshot.timestamp.desc()).first()
-
-        # Get cash flow count and totals
-        cashflow_count = CashFlow.query.count()
-        all_cash_flows = CashFlow.query.all()
-
-        total_deposits = sum(cf.amount_usd for cf in all_cash_flows if cf.amount_usd > 0)
-        total_withdrawals = sum(abs(cf.amount_usd) for cf in all_cash_flows if cf.amount_usd < 0)
+        # Single-row read of the materialized summary (core/portfolio_summary.py)
+        summary = portfolio_summary.get_summary()
+        first_dt = timestamps.decode(summary['first_snapshot_ts']) if summary['first_snapshot_ts'] else None
+        last_dt = timestamps.decode(summary['last_snapshot_ts']) if summary['last_snapshot_ts'] else None
 
         # Format dates - match frontend expectations
         result = {
-            'tracking_days': stats['days'],
-            'total_snapshots': stats['total_snapshots'],
-            'total_cashflows': cashflow_count,
-            'total_deposits_usd': total_deposits,
-            'total_withdrawals_usd': total_withdrawals,
-            'first_snapshot_date': stats['first_snapshot'].isoformat() if stats['first_snapshot'] else None,
-            'last_snapshot_date': stats['last_snapshot'].isoformat() if stats['last_snapshot'] else None,
-            'latest_snapshot_id': latest_snapshot.id if latest_snapshot else None  # For reference
+            'tracking_days': (last_dt - first_dt).days if first_dt else 0,
+            'total_snapshots': summary['snapshot_count'],
+            'total_cashflows': summary['cashflow_count'],
+            'total_deposits_usd': summary['total_deposits_usd'],
+            'total_withdrawals_usd': summary['total_withdrawals_usd'],
+            'first_snapshot_date': first_dt.isoformat() if first_dt else None,
+            'last_snapshot_date': last_dt.isoformat() if last_dt else None,
+            'latest_snapshot_id': summary['latest_snapshot_id'],  # For cache invalidation
+            'latest_cashflow_id': summary['latest_cashflow_id']
         }
 
         return jsonify(result), 200
 
-    except RuntimeError as e:
-        logger.error(f"Session not initialized: {e}")
-        return jsonify({'error': 'Binance session not initialized'}), 500
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
         return jsonify({'error': str(e)}), 500
@@ -358,56 +360,95 @@ def get_stats():
 @performance_bp.route('/twr-history', methods=['GET'])
 def get_twr_history():
     """
-    GET /api/performance/twr-history?days=30
+    GET /api/performance/twr-history?days=30[&format=columnar]
     Get TWR evolution over time for charting
+
+    Returns:
+        [{x: ISO date, y: TWR %}, ...]
+        columnar: {t: [epoch s], twr: [TWR %]}
     """
     try:
         days = int(request.args.get('days', 30))
         
-        # Calculate date range: from (now - days) to now
-        end_date = datetime.utcnow()
-        
-        if days == 0:
-            # All time - get first snapshot date
-            first_snapshot = Snapshot.query.order_by(Snapshot.timestamp).first()
-            if first_snapshot:
-                # Convertir INTEGER en datetime
-                timestamp_str = str(first_snapshot.timestamp)
-                start_date = datetime.strptime(timestamp_str, '%Y%m%d%H%M')
-            else:
-                start_date = end_date
-        else:
-            start_date = end_date - timedelta(days=days)
-        
-        # Convertir en INTEGER pour la requête SQL
-        start_ts = int(start_date.strftime('%Y%m%d%H%M'))
-        end_ts = int(end_date.strftime('%Y%m%d%H%M'))
-        
+        # Calculate date range: from (now - days) to now (epoch seconds)
+        end_ts = timestamps.encode(get_clock().now())
+        snapshots, _ = get_snapshot_store().sync()
+
+        # days=0: all time - from the first snapshot
+        start_ts = end_ts - days * 86400 if days else None
+
         # Get snapshots in period (SANS le filtre twr.isnot(None))
-        snapshots = Snapshot.query\
-            .filter(Snapshot.timestamp >= start_ts)\
-            .filter(Snapshot.timestamp <= end_ts)\
-            .order_by(Snapshot.timestamp)\
-            .all()
-        
-        if not snapshots:
-            return jsonify([]), 200
-        
-        # Format for Chart.js
-        result = []
-        for snapshot in snapshots:
-            # Convertir INTEGER timestamp en datetime pour ISO format
-            timestamp_str = str(snapshot.timestamp)
-            snapshot_dt = datetime.strptime(timestamp_str, '%Y%m%d%H%M')
-            
-            result.append({
-                'x': snapshot_dt.isoformat(),
-                'y': round(snapshot.twr, 2) if snapshot.twr is not None else 0.0
-            })
-        
+        lo, hi = snapshots.span(start_ts, end_ts)
+
+        twr = [round(v, 2) if not math.isnan(v) else 0.0 for v in snapshots['twr'][lo:hi]]
+        if wants_columnar(request):
+            return jsonify({'t': timestamps.epoch_many(snapshots['timestamp'][lo:hi]), 'twr': twr}), 200
+
+        # Format for Chart.js (NaN = no stored TWR)
+        result = [
+            {'x': iso, 'y': y}
+            for iso, y in zip(timestamps.iso_many(snapshots['timestamp'][lo:hi]), twr)
+        ]
+
         return jsonify(result), 200
         
     except Exception as e:
         logger.error(f"Error getting TWR history: {e}")
         return jsonify({'error': str(e)}), 500
 
+
+@performance_bp.route('/export/<table>', methods=['GET'])
+def export_table(table):
+    """
+    GET /api/performance/export/<snapshots|cashflows>?format=csv|arrow|parquet&start_date=&end_date=
+    Stream a whole table in columnar form (arrow/parquet require pyarrow)
+
+    Returns:
+        Attachment streamed chunk by chunk
+    """
+    fmt = request.args.get('format', 'csv')
+    try:
+        start = datetime.fromisoformat(request.args['start_date']) if request.args.get('start_date') else None
+        end = datetime.fromisoformat(request.args['end_date']) if request.args.get('end_date') else None
+        chunks = stream_export(table, fmt, start, end)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except ImportError as e:
+        return jsonify({'error': str(e)}), 501
+
+    mimetype, extension = FORMATS[fmt]
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={table}.{extension}'}
+    )
+
+
+@performance_bp.route('/import/<table>', methods=['POST'])
+def import_table(table):
+    """
+    POST /api/performance/import/<snapshots|cashflows>?format=csv|jsonl&dry_run=1
+    Bulk import historical rows from a CSV (with header) or JSON-lines body
+    or multipart 'file' upload. Duplicates are skipped, TWR/P&L recomputed once.
+
+    Returns:
+        {inserted, duplicates, error_count, errors: [{line, error}], recomputed, dry_run}
+    """
+    upload = request.files.get('file')
+    filename = upload.filename if upload else ''
+    fmt = request.args.get('format') or (
+        'jsonl' if filename.endswith(('.jsonl', '.ndjson')) or 'ndjson' in (request.content_type or '')
+        or 'jsonl' in (request.content_type or '') else 'csv'
+    )
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true')
+
+    try:
+        result = import_stream(table, upload.stream if upload else request.stream, fmt, dry_run=dry_run)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error importing {table}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+    status = 400 if result['error_count'] and not result['inserted'] and not result['duplicates'] else 200
+    return jsonify(result), status
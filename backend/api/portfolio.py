@@ -4,9 +4,10 @@ Portfolio API endpoints
 Handles portfolio balance fetching from database
 """
 import logging
-from datetime import datetime
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from db.models import LastBalance
+from services.price_board import get_price_board
+from utils import timestamps
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +18,8 @@ portfolio_bp = Blueprint('portfolio', __name__)
 def get_balances():
     """
     GET /api/portfolio/balances
-    Get portfolio balances from last_balance table
+    Get portfolio balances from the shared price board,
+    falling back to the last_balance table
 
     Returns:
         {
@@ -31,7 +33,33 @@ def get_balances():
         }
     """
     try:
-        # Get balances from last_balance table
+        # Fast path: shared price board published by the auto-refresh leader
+        board = get_price_board(current_app)
+        live = board.read() if board else None
+
+        if live:
+            balances = sorted(
+                (
+                    {
+                        'asset': b['asset'],
+                        'balance': b['balance'],
+                        'usd_value': b['usd_value'],
+                        'percentage': b['percentage']
+                    }
+                    for b in live['balances']
+                ),
+                key=lambda b: b['usd_value'],
+                reverse=True
+            )
+
+            return jsonify({
+                'total_value_usd': sum(b['usd_value'] for b in balances),
+                'balances': balances,
+                'timestamp': timestamps.decode(int(live['updated_at'])).isoformat(),
+                'count': len(balances)
+            }), 200
+
+        # Fallback: get balances from last_balance table
         last_balances = LastBalance.query.order_by(LastBalance.usd_value.desc()).all()
 
         if not last_balances:
@@ -56,18 +84,8 @@ def get_balances():
             for lb in last_balances
         ]
 
-        # Use the most recent timestamp (INTEGER format YYYYMMDDHHmm)
-        timestamp_int = max(lb.timestamp for lb in last_balances)
-
-        # Convert to ISO format
-        timestamp_str = str(timestamp_int)
-        dt = datetime(
-            year=int(timestamp_str[0:4]),
-            month=int(timestamp_str[4:6]),
-            day=int(timestamp_str[6:8]),
-            hour=int(timestamp_str[8:10]),
-            minute=int(timestamp_str[10:12])
-        )
+        # Use the most recent timestamp (INTEGER epoch seconds)
+        dt = timestamps.decode(max(timestamps.normalize(lb.timestamp) for lb in last_balances))
 
         return jsonify({
             'total_value_usd': total_value_usd,
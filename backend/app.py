@@ -5,13 +5,19 @@ Main entry point for the Binance Portfolio Manager backend
 """
 
 import os
+import sys
 import logging
-from flask import Flask
-from flask_cors import CORS
+from flask import Flask, Response
 from config import config
-from db.models import db
+from sqlalchemy.orm import Session
+from db.models import db, LastBalance
+from db import read_replica
+from db.migrations import migrate_timestamps, upgrade_schema
+from core import portfolio_summary, snapshot_store
 from services.session_manager import session_manager
+from services.leader_election import file_lock
 from utils.env_loader import load_env_file
+from utils import metrics, profiling, query_stats, serialization
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,12 +26,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def create_app(config_name='development'):
+def create_app(config_name='development', config_overrides=None):
     """
     Application factory pattern
 
     Args:
         config_name: Configuration name ('development' or 'production')
+        config_overrides: Optional dict applied on top (benchmarks, simulations)
 
     Returns:
         Flask app instance
@@ -34,6 +41,8 @@ def create_app(config_name='development'):
 
     # Load configuration
     app.config.from_object(config[config_name])
+    if config_overrides:
+        app.config.update(config_overrides)
     logger.info(f"📝 Configuration loaded: {config_name}")
 
     # Load environment variables from .env
@@ -41,18 +50,42 @@ def create_app(config_name='development'):
 
     # Initialize database
     db.init_app(app)
+    metrics.instrument_session(Session)
 
-    with app.app_context():
+    # Workers boot concurrently: serialize schema creation
+    with app.app_context(), file_lock(f"{app.config['LEADER_LOCK_FILE']}.init"):
         db.create_all()
+        upgrade_schema(db)
+        portfolio_summary.ensure()
         logger.info("✅ Database initialized")
 
+    # Legacy YYYYMMDDHHMM timestamps -> epoch seconds, in short transactions
+    # (outside the lock: workers booting together share the work row by row)
+    with app.app_context():
+        migrate_timestamps(db)
+
+    # Snapshots and cash flows served from memory (core/snapshot_store.py), loaded on first read
+    snapshot_store.init_app(app)
+
+    # Optional in-memory copy of the database for read-only API requests (READ_REPLICA)
+    read_replica.init_app(app, db)
+
     api_key = os.environ.get('BINANCE_API_KEY') or app.config.get('BINANCE_API_KEY')
     api_secret = os.environ.get('BINANCE_API_SECRET') or app.config.get('BINANCE_API_SECRET')
     testnet = os.environ.get('BINANCE_TESTNET', 'False').lower() == 'true' or app.config.get('BINANCE_TESTNET', False)
 
+    api_url = os.environ.get('BINANCE_API_URL') or app.config.get('BINANCE_API_URL')
+
     if api_key and api_secret:
-        session_manager.initialize(api_key, api_secret, testnet)
-        logger.info("✅ Binance session initialized")
+        lazy = app.config.get('BINANCE_LAZY_CONNECT', True)
+        session_manager.initialize(
+            api_key, api_secret, testnet, api_url=api_url, lazy=lazy,
+            timeout=app.config.get('BINANCE_TIMEOUT', 10),
+            max_retries=app.config.get('BINANCE_MAX_RETRIES', 2),
+            pool_size=app.config.get('BINANCE_POOL_SIZE', 10),
+            hedge_percentile=app.config.get('BINANCE_HEDGE_PERCENTILE', 95)
+        )
+        logger.info("✅ Binance session configured (connects on first use)" if lazy else "✅ Binance session initialized")
     else:
         logger.warning("⚠️  Binance API credentials not found in configuration")
 
@@ -63,6 +96,8 @@ def create_app(config_name='development'):
         'http://localhost:5173,http://localhost:3000,http://localhost'
     ).split(',')
 
+    from flask_cors import CORS  # Imported here like the blueprints below
+
     CORS(app, resources={
         r"/api/*": {
             "origins": allowed_origins,
@@ -75,25 +110,82 @@ def create_app(config_name='development'):
     # Register API blueprints
     from api.portfolio import portfolio_bp
     from api.performance import performance_bp
+    from api.admin import admin_bp
+    from api.batch import batch_bp
 
     app.register_blueprint(portfolio_bp, url_prefix='/api/portfolio')
     app.register_blueprint(performance_bp, url_prefix='/api/performance')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(batch_bp, url_prefix='/api')
 
     logger.info("✅ Portfolio API registered")
     logger.info("✅ Performance API registered")
+    logger.info("✅ Admin API registered")
+
+    # orjson encoder and brotli/gzip responses (JSON_SERIALIZER, COMPRESSION_*)
+    serialization.init_app(app)
+
+    # Request latency per route (GET /metrics)
+    metrics.instrument_app(app)
+    _register_gauges()
+
+    # Opt-in cProfile captures (PROFILING_ENABLED)
+    profiling.init_app(app)
+
+    # SQL statements per request (SQL_QUERY_BUDGET, GET /api/admin/query-stats)
+    query_stats.init_app(app)
+
+    # Maintenance commands (flask --app app <command>)
+    from cli import register_commands
+    register_commands(app)
 
     # Health check endpoint
     @app.route('/health')
     def health_check():
+        service = _auto_refresh_service()
         return {
             'status': 'healthy',
-            'trader_initialized': session_manager.is_initialized()
+            'trader_initialized': session_manager.is_initialized(),
+            'trader_connected': session_manager.is_connected(),
+            'auto_refresh_leader': service.is_leader if service else False
         }
 
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
     logger.info("🚀 Flask application created successfully")
     return app
 
 
+def _auto_refresh_service():
+    """The AutoRefreshService of this process, None (and not imported) until start_auto_refresh()"""
+    module = sys.modules.get('services.auto_refresh')
+    return module.auto_refresh_service if module else None
+
+
+def _register_gauges():
+    """Gauges computed at scrape time (database and auto-refresh state)"""
+
+    def refresh_age():
+        service = _auto_refresh_service()
+        return service.last_refresh_age() if service else None
+
+    def thread_liveness():
+        service = _auto_refresh_service()
+        return {(name,): int(alive) for name, alive in service.thread_status().items()} if service else None
+
+    metrics.gauge('portfolio_snapshots', 'Snapshots stored',
+                  callback=lambda: portfolio_summary.get_summary()['snapshot_count'])
+    metrics.gauge('portfolio_snapshot_store_bytes', 'Memory held by the snapshot store columns',
+                  callback=lambda: snapshot_store.get_snapshot_store().nbytes())
+    metrics.gauge('portfolio_assets', 'Assets in last_balance', callback=lambda: LastBalance.query.count())
+    metrics.gauge('portfolio_last_refresh_age_seconds', 'Seconds since the last successful balance refresh',
+                  callback=refresh_age)
+    metrics.gauge('portfolio_thread_alive', 'Background jobs scheduled on a live dispatcher in this process (1/0)', ('thread',),
+                  callback=thread_liveness)
+
+
 if __name__ == '__main__':
     app = create_app('development')
 
@@ -0,0 +1 @@
+"""Benchmark suite (synthetic histories, scaling curves)"""
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Benchmark the balance refresh fetch against the local fake exchange
+
+Usage (from the backend folder):
+    python -m benchmarks.binance_fetch                      # 50 ms +-10 ms, 3% of requests +500 ms
+    python -m benchmarks.binance_fetch --cycles 500 --slow-rate 0.01 -o fetch.json
+
+Times the fetch phase of BinanceTrader.get_all_balances_usd (account +
+all tickers) for three strategies against the same injected latency:
+'sequential' (one request after the other, the previous behaviour),
+'concurrent' (both at once, no hedging) and 'hedged' (both at once, each
+sent again after its 95th latency percentile). The first --warmup cycles of
+each strategy are not counted (the hedger learns its percentiles there).
+Reports cycle latency percentiles and the extra requests hedging cost.
+
+The 'prices' section lists --listed assets of which the account holds
+--held, and compares the full ticker dump with the holdings-scoped
+/ticker/price?symbols=[...] fetch: ticker bytes per cycle, parse time
+(JSON decode + price dict) and fetch time.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.harness import percentiles  # noqa: E402
+
+STRATEGIES = ('sequential', 'concurrent', 'hedged')
+PRICE_STRATEGIES = ('full', 'scoped')
+
+
+def run_strategy(strategy, exchange, opts):
+    """Fetch cycle durations (seconds) of one strategy"""
+    from core.binance_trader import BinanceTrader
+
+    trader = BinanceTrader('bench', 'bench', api_url=exchange.url,
+                           hedge_percentile=opts.percentile if strategy == 'hedged' else 0)
+    if strategy == 'sequential':
+        def cycle():
+            trader.client.get_account()
+            trader.client.get_all_tickers()
+    else:
+        def cycle():
+            trader.get_all_balances_usd(min_value=0.0)
+
+    samples = []
+    requests_before = None
+    for i in range(opts.warmup + opts.cycles):
+        if i == opts.warmup:
+            requests_before = exchange.requests
+            trader.hedger.stats.update(calls=0, hedged=0, hedge_won=0)
+        started = time.perf_counter()
+        cycle()
+        if i >= opts.warmup:
+            samples.append(time.perf_counter() - started)
+    requests = exchange.requests - requests_before
+    trader.hedger.shutdown()
+
+    return {
+        **{name: round(value * 1000, 1) for name, value in percentiles(samples, (50, 90, 95, 99)).items()},
+        'mean': round(statistics.fmean(samples) * 1000, 1),
+        'max': round(max(samples) * 1000, 1),
+        'requests_per_cycle': round(requests / opts.cycles, 3),
+        'hedged': trader.hedger.stats['hedged'],
+        'hedge_won': trader.hedger.stats['hedge_won']
+    }
+
+
+def run_prices(strategy, exchange, opts):
+    """Ticker bytes, parse time and fetch time per cycle of one price strategy"""
+    from core.binance_trader import BinanceTrader
+
+    trader = BinanceTrader('bench', 'bench', api_url=exchange.url, hedge_percentile=0)
+    tickers = []  # (bytes, parse seconds) of each /ticker/price response
+
+    def on_response(response, *args, **kwargs):
+        if response.url.split('?')[0].endswith('/ticker/price'):
+            started = time.perf_counter()
+            {t['symbol']: float(t['price']) for t in response.json()}
+            tickers.append((len(response.content), time.perf_counter() - started))
+
+    trader.client.session.hooks['response'].append(on_response)
+    trader.get_all_balances_usd(min_value=0.0)  # Learns the held routes
+
+    fetch, parse, size = [], [], []
+    for _ in range(opts.price_cycles):
+        if strategy == 'full':
+            trader.price_symbols = None
+        del tickers[:]
+        started = time.perf_counter()
+        trader.get_all_balances_usd(min_value=0.0)
+        fetch.append(time.perf_counter() - started)
+        size.append(sum(nbytes for nbytes, _ in tickers))
+        parse.append(sum(seconds for _, seconds in tickers))
+    trader.hedger.shutdown()
+
+    return {
+        'symbols': len(trader.price_symbols) if strategy == 'scoped' else len(trader.all_symbols),
+        'ticker_bytes': statistics.median(size),
+        'parse_ms': round(statistics.median(parse) * 1000, 3),
+        'fetch_p50_ms': round(statistics.median(fetch) * 1000, 1)
+    }
+
+
+def run(opts):
+    from simulation.fake_exchange import FakeExchange, FakeMarket
+
+    logging.disable(logging.WARNING)
+    exchange = FakeExchange(FakeMarket(assets=opts.assets), latency_ms=opts.latency_ms, jitter_ms=opts.jitter_ms,
+                            slow_rate=opts.slow_rate, slow_ms=opts.slow_ms, weight_limit=10 ** 9).start()
+    report = {
+        'meta': {
+            'date': datetime.utcnow().isoformat(),
+            'python': sys.version.split()[0],
+            'cycles': opts.cycles,
+            'latency_ms': opts.latency_ms,
+            'jitter_ms': opts.jitter_ms,
+            'slow_rate': opts.slow_rate,
+            'slow_ms': opts.slow_ms,
+            'hedge_percentile': opts.percentile,
+            'listed': opts.listed,
+            'held': opts.held
+        },
+        'results_ms': {},
+        'prices': {}
+    }
+    try:
+        for strategy in STRATEGIES:
+            result = run_strategy(strategy, exchange, opts)
+            report['results_ms'][strategy] = result
+            print(f"✅ {strategy:10s} p50 {result['p50']:7.1f} ms  p99 {result['p99']:7.1f} ms  "
+                  f"max {result['max']:7.1f} ms  {result['requests_per_cycle']:.2f} requests/cycle",
+                  file=sys.stderr)
+    finally:
+        exchange.stop()
+
+    market = FakeMarket(assets=opts.listed, held=opts.held, history_days=0)
+    exchange = FakeExchange(market, weight_limit=10 ** 9).start()
+    try:
+        for strategy in PRICE_STRATEGIES:
+            result = run_prices(strategy, exchange, opts)
+            report['prices'][strategy] = result
+            print(f"✅ {strategy:10s} {result['symbols']:5d} symbols  {result['ticker_bytes']:>8.0f} B  "
+                  f"parse {result['parse_ms']:6.2f} ms  fetch {result['fetch_p50_ms']:6.1f} ms", file=sys.stderr)
+    finally:
+        exchange.stop()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cycles', type=int, default=300, help='Fetch cycles measured per strategy')
+    parser.add_argument('--warmup', type=int, default=30, help='Cycles run before measuring')
+    parser.add_argument('--assets', type=int, default=20, help='Assets held on the fake exchange')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Fake exchange latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--slow-rate', type=float, default=0.03, help='Fraction of requests delayed by --slow-ms')
+    parser.add_argument('--slow-ms', type=float, default=500)
+    parser.add_argument('--percentile', type=float, default=95, help='Hedge after this latency percentile')
+    parser.add_argument('--listed', type=int, default=2000, help='Assets listed in the prices section')
+    parser.add_argument('--held', type=int, default=12, help='Assets held in the prices section')
+    parser.add_argument('--price-cycles', type=int, default=50, help='Cycles measured per price strategy')
+    parser.add_argument('-o', '--output', default='-', help='JSON output file ("-" = stdout)')
+    opts = parser.parse_args(argv)
+
+    report = run(opts)
+    payload = json.dumps(report, indent=2)
+    if opts.output == '-':
+        print(payload)
+    else:
+        with open(opts.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"📄 Results written to {opts.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Timing helpers shared by the benchmark scripts
+"""
+import math
+import statistics
+import time
+
+
+def measure(fn, min_time=0.2, max_repeats=5, min_repeats=1):
+    """
+    Time fn() repeatedly (until min_time is spent or max_repeats is reached)
+
+    Returns:
+        dict: {'repeats', 'min', 'median', 'max'} in seconds
+    """
+    samples = []
+    spent = 0.0
+    while len(samples) < max_repeats and (len(samples) < min_repeats or spent < min_time):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        spent += elapsed
+
+    return {
+        'repeats': len(samples),
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'max': max(samples)
+    }
+
+
+def percentiles(samples, points=(50, 90, 99)):
+    """{'p50': ..., 'p90': ..., 'p99': ...} of a list of durations"""
+    ordered = sorted(samples)
+    return {
+        f"p{p}": ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+        for p in points
+    } if ordered else {}
+
+
+def fit_exponent(points):
+    """
+    Slope of log(time) vs log(n): ~0 constant, ~1 linear, ~2 quadratic
+
+    Args:
+        points: [(n, seconds), ...]
+    """
+    points = [(n, t) for n, t in points if n > 0 and t > 0]
+    if len(points) < 2:
+        return None
+
+    xs = [math.log(n) for n, _ in points]
+    ys = [math.log(t) for _, t in points]
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if var_x == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x, 3)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Benchmark API read latency from the SQLite file vs the in-memory read replica
+
+Usage (from the backend folder):
+    python -m benchmarks.read_replica                        # a year of hourly snapshots, 2 readers
+    python -m benchmarks.read_replica --readers 4 --write-interval-ms 5 -o replica.json
+
+For each mode ('file': READ_REPLICA off, 'replica': on) and load ('idle',
+'writes': a thread rewriting every last_balance row and committing every
+--write-interval-ms, like a fast auto-refresh), --readers threads loop over
+read-only endpoints through the Flask test client for --seconds. Reports
+request latency percentiles, requests served, and in replica mode the
+number and duration of the copies made to keep up with the writes.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.harness import percentiles  # noqa: E402
+from benchmarks.synthetic import OfflineTrader, generate_history  # noqa: E402
+
+MODES = ('file', 'replica')
+LOADS = ('idle', 'writes')
+PATHS = [
+    '/api/portfolio/balances',
+    '/api/performance/stats',
+    '/api/performance/cashflows',
+    '/api/performance/pnl/30',
+]
+
+
+def _build_app(db_path, workdir, replica):
+    from app import create_app
+
+    return create_app('development', {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'LEADER_LOCK_FILE': os.path.join(workdir, 'bench.lock'),
+        'PRICE_BOARD_FILE': '',  # /balances reads last_balance
+        'SQL_QUERY_BUDGET': 0,
+        'READ_REPLICA': replica
+    })
+
+
+def writer(app, stop, interval, counts):
+    """Rewrite every last_balance row and commit, every `interval` seconds"""
+    from db.models import db, LastBalance
+    from utils import timestamps
+
+    rng = random.Random(1)
+    with app.app_context():
+        while not stop.is_set():
+            now = timestamps.encode(datetime.utcnow())
+            for row in LastBalance.query.all():
+                row.balance *= 1 + rng.gauss(0, 0.001)
+                row.timestamp = now
+            db.session.commit()
+            counts['writes'] += 1
+            stop.wait(interval)
+        db.session.remove()
+
+
+def reader(app, stop, samples):
+    client = app.test_client()
+    i = 0
+    while not stop.is_set():
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        started = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, (path, response.status_code)
+
+
+def run_scenario(app, load, opts):
+    from db.read_replica import get_read_replica
+
+    replica = get_read_replica(app)
+    before = dict(replica.stats) if replica else None
+    stop = threading.Event()
+    samples = []
+    counts = {'writes': 0}
+    threads = [threading.Thread(target=reader, args=(app, stop, samples)) for _ in range(opts.readers)]
+    if load == 'writes':
+        threads.append(threading.Thread(target=writer, args=(app, stop, opts.write_interval_ms / 1000, counts)))
+    for thread in threads:
+        thread.start()
+    time.sleep(opts.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    result = {
+        **{name: round(value * 1000, 2) for name, value in percentiles(samples, (50, 90, 99)).items()},
+        'mean': round(statistics.fmean(samples) * 1000, 2),
+        'max': round(max(samples) * 1000, 2),
+        'requests': len(samples),
+        'writes': counts['writes']
+    }
+    if replica:
+        result['refreshes'] = replica.stats['refreshes'] - before['refreshes']
+        result['last_refresh_ms'] = replica.stats['last_refresh_ms']
+        result['replica_bytes'] = replica.stats['bytes']
+    return result
+
+
+def run(opts):
+    from db.models import db
+    from db.read_replica import get_read_replica
+    from services.session_manager import session_manager
+
+    logging.disable(logging.WARNING)
+    session_manager.set_trader(OfflineTrader())
+    report = {
+        'meta': {
+            'date': datetime.utcnow().isoformat(),
+            'python': sys.version.split()[0],
+            'snapshots': opts.snapshots,
+            'readers': opts.readers,
+            'seconds': opts.seconds,
+            'write_interval_ms': opts.write_interval_ms
+        },
+        'results_ms': {}
+    }
+    with tempfile.TemporaryDirectory(prefix='portfolio-replica-') as workdir:
+        db_path = os.path.join(workdir, 'bench.db')
+        app = _build_app(db_path, workdir, replica=False)
+        with app.app_context():
+            generate_history(opts.snapshots)  # Also fills last_balance
+            db.session.remove()
+
+        for mode in MODES:
+            app = _build_app(db_path, workdir, replica=mode == 'replica')
+            for load in LOADS:
+                result = run_scenario(app, load, opts)
+                report['results_ms'][f'{mode}/{load}'] = result
+                print(f"✅ {mode:8s} {load:7s} p50 {result['p50']:6.2f} ms  p99 {result['p99']:7.2f} ms  "
+                      f"max {result['max']:7.2f} ms  {result['requests']} requests, {result['writes']} commits"
+                      + (f", {result['refreshes']} copies" if 'refreshes' in result else ''), file=sys.stderr)
+            replica = get_read_replica(app)
+            if replica:
+                replica.stop()
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--snapshots', type=int, default=24 * 365, help='Hourly snapshots generated')
+    parser.add_argument('--readers', type=int, default=2, help='Reader threads')
+    parser.add_argument('--seconds', type=float, default=5, help='Duration of each scenario')
+    parser.add_argument('--write-interval-ms', type=float, default=20, help='Pause between writer commits')
+    parser.add_argument('-o', '--output', default='-', help='JSON output file ("-" = stdout)')
+    opts = parser.parse_args(argv)
+
+    report = run(opts)
+    payload = json.dumps(report, indent=2)
+    if opts.output == '-':
+        print(payload)
+    else:
+        with open(opts.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"📄 Results written to {opts.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
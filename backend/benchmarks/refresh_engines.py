@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Benchmark balance refresh throughput: threaded engine vs asyncio pipeline
+
+Usage (from the backend folder):
+    python -m benchmarks.refresh_engines                    # 1, 10 and 50 accounts, 50 ms +-10 ms
+    python -m benchmarks.refresh_engines --accounts 1 100 --seconds 20 -o engines.json
+
+The fake exchange runs in a subprocess (its threads would otherwise share
+this process's GIL and CPU time). For each number of accounts, each engine
+refreshes every account back to back for --seconds:
+
+- 'threads': one thread per account, each with its own BinanceTrader
+  (account and tickers fetched concurrently by its Hedger pool, hedging off),
+  writing under a lock like the scheduler's balance job.
+- 'asyncio': one event loop, one AsyncBinanceTrader per account, and the
+  services.async_refresh.RefreshPipeline: valuation on the loop, writes
+  batched on one executor thread.
+
+Both write every valuation to a throwaway SQLite table (one upsert per asset,
+one commit per batch). Reports refreshes per second, the cycle latency
+(fetch start to commit), peak thread count and CPU milliseconds per refresh.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.harness import percentiles  # noqa: E402
+
+ENGINES = ('threads', 'asyncio')
+
+
+class Store:
+    """SQLite sink recording the latency of every stored valuation"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS balances (account TEXT, asset TEXT, balance REAL, '
+                          'usd_value REAL, PRIMARY KEY (account, asset))')
+        self.lock = threading.Lock()
+        self.latencies = []
+
+    def write(self, batch):
+        """{account: (balances, started)} in one transaction"""
+        with self.lock:
+            with self.conn:
+                for account, (balances, _) in batch.items():
+                    self.conn.executemany(
+                        'INSERT OR REPLACE INTO balances VALUES (?, ?, ?, ?)',
+                        [(account, asset, b['balance'], b['usd_value']) for asset, b in balances.items()])
+            finished = time.perf_counter()
+            self.latencies.extend(finished - started for _, started in batch.values())
+
+
+class ThreadMonitor:
+    """Peak threading.active_count() while running"""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.05):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_threads(url, accounts, store, opts):
+    from core.binance_trader import BinanceTrader
+
+    traders = [BinanceTrader('bench', 'bench', api_url=url, hedge_percentile=0) for _ in range(accounts)]
+    stop = threading.Event()
+
+    def loop(name, trader):
+        while not stop.is_set():
+            started = time.perf_counter()
+            balances = trader.get_all_balances_usd(min_value=0.0)
+            store.write({name: (balances, started)})
+
+    for trader in traders:
+        trader.get_all_balances_usd(min_value=0.0)  # Warm-up: learns the held routes
+    threads = [threading.Thread(target=loop, args=(f"a{i}", trader)) for i, trader in enumerate(traders)]
+    del store.latencies[:]
+    with ThreadMonitor() as monitor:
+        cpu, wall = time.process_time(), time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(opts.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    for trader in traders:
+        trader.hedger.shutdown()
+    return wall, cpu, monitor.peak
+
+
+def run_asyncio(url, accounts, store, opts):
+    from core.binance_async import AsyncBinanceTrader
+    from services.async_refresh import RefreshPipeline
+
+    async def main():
+        traders = await asyncio.gather(*(AsyncBinanceTrader.create('bench', 'bench', api_url=url)
+                                         for _ in range(accounts)))
+        for trader in traders:
+            await trader.fetch()  # Warm-up: learns the held routes
+        pipeline = RefreshPipeline({f"a{i}": trader for i, trader in enumerate(traders)}, store.write, 0)
+        stopping = asyncio.Event()
+        del store.latencies[:]
+        with ThreadMonitor() as monitor:
+            cpu, wall = time.process_time(), time.perf_counter()
+            asyncio.get_running_loop().call_later(opts.seconds, stopping.set)
+            await pipeline.run(stopping)
+            pipeline.executor.shutdown(wait=True)
+            cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+        await asyncio.gather(*(trader.close() for trader in traders))
+        return wall, cpu, monitor.peak
+
+    return asyncio.run(main())
+
+
+def start_exchange(opts):
+    """Fake exchange subprocess on a free port, returns (process, url)"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'simulation.fake_exchange', '--port', str(port), '--assets', str(opts.assets),
+         '--latency-ms', str(opts.latency_ms), '--jitter-ms', str(opts.jitter_ms), '--weight-limit', str(10 ** 9)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{url}/api/v3/ping", timeout=1).read()
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('fake exchange did not start')
+
+
+def run(opts):
+    logging.disable(logging.WARNING)
+    report = {
+        'meta': {
+            'date': datetime.utcnow().isoformat(),
+            'python': sys.version.split()[0],
+            'seconds': opts.seconds,
+            'assets': opts.assets,
+            'latency_ms': opts.latency_ms,
+            'jitter_ms': opts.jitter_ms
+        },
+        'results': {}
+    }
+    process, url = start_exchange(opts)
+    try:
+        with tempfile.TemporaryDirectory(prefix='portfolio-engines-') as workdir:
+            for accounts in opts.accounts:
+                for engine in ENGINES:
+                    store = Store(os.path.join(workdir, f'{engine}-{accounts}.db'))
+                    runner = run_threads if engine == 'threads' else run_asyncio
+                    wall, cpu, peak = runner(url, accounts, store, opts)
+                    samples = store.latencies
+                    result = {
+                        'refreshes': len(samples),
+                        'refreshes_per_second': round(len(samples) / wall, 1),
+                        **{f'{name}_ms': round(value * 1000, 1)
+                           for name, value in percentiles(samples, (50, 99)).items()},
+                        'mean_ms': round(statistics.fmean(samples) * 1000, 1),
+                        'peak_threads': peak,
+                        'cpu_ms_per_refresh': round(cpu / len(samples) * 1000, 3)
+                    }
+                    store.conn.close()
+                    report['results'][f'{engine}/{accounts}'] = result
+                    print(f"✅ {engine:8s} {accounts:4d} accounts  {result['refreshes_per_second']:7.1f} refreshes/s  "
+                          f"p50 {result['p50_ms']:6.1f} ms  p99 {result['p99_ms']:6.1f} ms  "
+                          f"{result['peak_threads']:4d} threads  {result['cpu_ms_per_refresh']:.2f} CPU ms/refresh",
+                          file=sys.stderr)
+    finally:
+        process.terminate()
+        process.wait()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--accounts', type=int, nargs='+', default=[1, 10, 50], help='Accounts refreshed at once')
+    parser.add_argument('--seconds', type=float, default=10, help='Duration of each scenario')
+    parser.add_argument('--assets', type=int, default=20, help='Assets held on the fake exchange')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Fake exchange latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('-o', '--output', default='-', help='JSON output file ("-" = stdout)')
+    opts = parser.parse_args(argv)
+
+    report = run(opts)
+    payload = json.dumps(report, indent=2)
+    if opts.output == '-':
+        print(payload)
+    else:
+        with open(opts.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"📄 Results written to {opts.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark PerformanceTracker and every Flask endpoint on synthetic histories
+
+Usage (from the backend folder):
+    python -m benchmarks.run                           # 1k, 10k, 100k, 1M snapshots
+    python -m benchmarks.run --sizes 1000,10000 -o results.json
+
+Writes machine-readable JSON: one timing point per (benchmark, size) plus the
+fitted scaling exponent (≈1 linear, ≈2 quadratic) so regressions show up.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.harness import measure, fit_exponent  # noqa: E402
+from benchmarks.synthetic import OfflineTrader, generate_history  # noqa: E402
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# (name, method, path, json body) - every route of the API
+ENDPOINTS = [
+    ('GET /health', 'get', '/health', None),
+    ('GET /api/portfolio/balances', 'get', '/api/portfolio/balances', None),
+    ('POST /api/portfolio/refresh', 'post', '/api/portfolio/refresh', None),
+    ('GET /api/performance/snapshots', 'get', '/api/performance/snapshots', None),
+    ('GET /api/performance/cashflows', 'get', '/api/performance/cashflows', None),
+    ('POST /api/performance/cashflows', 'post', '/api/performance/cashflows', {'amount_usd': 100, 'type': 'DEPOSIT'}),
+    ('GET /api/performance/twr/0', 'get', '/api/performance/twr/0', None),
+    ('GET /api/performance/twr/30', 'get', '/api/performance/twr/30', None),
+    ('GET /api/performance/pnl/0', 'get', '/api/performance/pnl/0', None),
+    ('GET /api/performance/pnl/30', 'get', '/api/performance/pnl/30', None),
+    ('GET /api/performance/stats', 'get', '/api/performance/stats', None),
+    ('GET /api/performance/twr-history?days=30', 'get', '/api/performance/twr-history?days=30', None),
+    ('GET /api/performance/twr-history?days=0', 'get', '/api/performance/twr-history?days=0', None),
+    # Last: appends a snapshot, only the first call passes the 5 min guard
+    ('POST /api/performance/snapshots', 'post', '/api/performance/snapshots', None),
+]
+SINGLE_SHOT = {'POST /api/performance/snapshots'}
+
+
+def _build_app(db_path, workdir):
+    """Fresh app on its own database, no Binance session, no shared files"""
+    from app import create_app
+    from services.session_manager import session_manager
+
+    session_manager.set_trader(OfflineTrader())
+    return create_app('development', {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'LEADER_LOCK_FILE': os.path.join(workdir, 'bench.lock'),
+        'PRICE_BOARD_FILE': ''
+    })
+
+
+def _uncovered_routes(app):
+    """Routes the ENDPOINTS table does not exercise (reported, not fatal)"""
+    adapter = app.url_map.bind('localhost')
+    covered = {
+        (adapter.match(path.split('?')[0], method.upper())[0], method.upper())
+        for _, method, path, _ in ENDPOINTS
+    }
+    return sorted(
+        f"{method} {rule.rule}"
+        for rule in app.url_map.iter_rules() if rule.endpoint != 'static'
+        for method in rule.methods - {'HEAD', 'OPTIONS'}
+        if (rule.endpoint, method) not in covered
+    )
+
+
+def bench_tracker(info, opts):
+    """PerformanceTracker methods (inside an app context)"""
+    from core.performance_tracker import PerformanceTracker
+
+    tracker = PerformanceTracker(None)
+    first, last = info['first'], info['last']
+    results = {
+        'calculate_twr(total)': measure(lambda: tracker.calculate_twr(first, last), opts.min_time, opts.repeats),
+        'calculate_twr(30d)': measure(
+            lambda: tracker.calculate_twr(last - timedelta(days=30), last), opts.min_time, opts.repeats),
+        'get_tracking_stats': measure(tracker.get_tracking_stats, opts.min_time, opts.repeats),
+    }
+    for days in (0, 7, 30, 365):
+        results[f'calculate_performance_metrics({days})'] = measure(
+            lambda: tracker.calculate_performance_metrics(days), opts.min_time, opts.repeats)
+    for days in (None, 30):
+        results[f'calculate_simple_pnl({days})'] = measure(
+            lambda: tracker.calculate_simple_pnl(days), opts.min_time, opts.repeats)
+    return results
+
+
+def measure_memory(sample=10000):
+    """Bytes per snapshot: snapshot store columns vs hydrated ORM objects (sampled)"""
+    import gc
+    from core.snapshot_store import get_snapshot_store
+    from db.models import db, Snapshot
+
+    snapshots, _ = get_snapshot_store().sync()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        objects = Snapshot.query.order_by(Snapshot.timestamp).limit(sample).all()
+        orm_bytes, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    count = len(objects)
+    del objects
+    db.session.expunge_all()
+
+    return {
+        'store_bytes': snapshots.nbytes(),
+        'store_bytes_per_snapshot': round(snapshots.nbytes() / len(snapshots), 1) if len(snapshots) else None,
+        'orm_bytes_per_snapshot': round(orm_bytes / count, 1) if count else None
+    }
+
+
+def bench_save_snapshot(info, opts):
+    """save_current_snapshot (appends snapshots after the history: run last)"""
+    from core.performance_tracker import PerformanceTracker
+
+    tracker = PerformanceTracker(None)
+    next_ts = [info['last'] + timedelta(hours=2)]  # Clear of the snapshot POSTed at 'now'
+
+    def save():
+        next_ts[0] += timedelta(hours=1)
+        tracker.save_current_snapshot({'A000': {'balance': 1, 'usd_value': 10000}}, timestamp=next_ts[0])
+
+    return {'save_current_snapshot': measure(save, opts.min_time, opts.repeats)}
+
+
+def bench_endpoints(app, opts):
+    """Every API route through the Flask test client"""
+    client = app.test_client()
+    results = {}
+    for name, method, path, body in ENDPOINTS:
+        call = getattr(client, method)
+
+        def request():
+            response = call(path, json=body) if body is not None else call(path)
+            if response.status_code >= 500:
+                raise RuntimeError(f"{name} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+        if name in SINGLE_SHOT:
+            results[name] = measure(request, 0, 1)
+        else:
+            results[name] = measure(request, opts.min_time, opts.repeats)
+    return results
+
+
+def run(opts):
+    logging.disable(logging.WARNING)  # Metric calculations log at INFO on every call
+    report = {
+        'meta': {
+            'date': datetime.utcnow().isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'sizes': opts.sizes,
+            'cashflow_every': opts.cashflow_every
+        },
+        'sizes': {},
+        'benchmarks': {}
+    }
+
+    with tempfile.TemporaryDirectory(prefix='portfolio-bench-') as workdir:
+        for n in opts.sizes:
+            db_path = os.path.join(workdir, f'bench-{n}.db')
+            app = _build_app(db_path, workdir)
+
+            with app.app_context():
+                started = datetime.utcnow()
+                info = generate_history(n, cashflow_every=opts.cashflow_every)
+                generation_s = (datetime.utcnow() - started).total_seconds()
+                timings = bench_tracker(info, opts)
+                memory = measure_memory()
+
+            timings.update(bench_endpoints(app, opts))
+
+            with app.app_context():
+                timings.update(bench_save_snapshot(info, opts))
+            report['sizes'][n] = {
+                'cash_flows': info['cash_flows'],
+                'generation_s': generation_s,
+                'db_bytes': os.path.getsize(db_path),
+                'memory': memory
+            }
+            for name, stats in timings.items():
+                report['benchmarks'].setdefault(name, {'points': []})['points'].append({'n': n, **stats})
+
+            print(f"✅ {n} snapshots: {len(timings)} benchmarks", file=sys.stderr)
+
+        report['uncovered_routes'] = _uncovered_routes(app)
+
+    for bench in report['benchmarks'].values():
+        bench['exponent'] = fit_exponent([(p['n'], p['median']) for p in bench['points']])
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        type=lambda v: [int(x) for x in v.split(',') if x],
+                        help='Comma-separated snapshot counts')
+    parser.add_argument('--cashflow-every', type=int, default=336, help='Average snapshots between cash flows')
+    parser.add_argument('--repeats', type=int, default=5, help='Maximum repeats per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Seconds spent per benchmark before stopping')
+    parser.add_argument('-o', '--output', default='benchmark-results.json', help='JSON output file ("-" = stdout)')
+    opts = parser.parse_args(argv)
+
+    report = run(opts)
+    payload = json.dumps(report, indent=2, default=str)
+    if opts.output == '-':
+        print(payload)
+    else:
+        with open(opts.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"📄 Results written to {opts.output}", file=sys.stderr)
+
+    for name, bench in sorted(report['benchmarks'].items()):
+        last = bench['points'][-1]
+        print(f"{name:55s} {last['median'] * 1000:10.2f} ms @ {last['n']:>8}  O(n^{bench['exponent']})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
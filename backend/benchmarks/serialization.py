@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark response serialization: encoder x payload shape x content coding
+
+Usage (from the backend folder):
+    python -m benchmarks.serialization                      # a year of hourly snapshots
+    python -m benchmarks.serialization --snapshots 8760 -o serialization.json
+
+For /twr-history?days=365 and /snapshots (per-row dicts vs ?format=columnar),
+with the stdlib and orjson encoders and identity/gzip/brotli codings, reports
+bytes on the wire and server CPU per request (process time: the Flask test
+client runs in-process). orjson and brotli rows are skipped when the
+optional packages are missing.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.harness import measure  # noqa: E402
+from benchmarks.synthetic import OfflineTrader, generate_history  # noqa: E402
+
+PAYLOADS = [
+    ('twr-history rows', '/api/performance/twr-history?days=365'),
+    ('twr-history columnar', '/api/performance/twr-history?days=365&format=columnar'),
+    ('snapshots rows', '/api/performance/snapshots'),
+    ('snapshots columnar', '/api/performance/snapshots?format=columnar'),
+]
+
+
+def _build_app(db_path, workdir, serializer):
+    from app import create_app
+    from services.session_manager import session_manager
+
+    session_manager.set_trader(OfflineTrader())
+    return create_app('development', {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'LEADER_LOCK_FILE': os.path.join(workdir, 'bench.lock'),
+        'PRICE_BOARD_FILE': '',
+        'JSON_SERIALIZER': serializer,
+        'COMPRESSION_MIN_SIZE': 1024
+    })
+
+
+def bench_request(client, path, encoding, opts):
+    """Wall time, CPU time and wire bytes of one GET"""
+    cpu = []
+    wire = {}
+
+    def request():
+        started = time.process_time()
+        response = client.get(path, headers={'Accept-Encoding': encoding})
+        body = response.get_data()
+        cpu.append(time.process_time() - started)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+        wire['bytes'] = len(body)
+        wire['encoding'] = response.headers.get('Content-Encoding', 'identity')
+
+    client.get(path)  # Warm the snapshot store
+    timing = measure(request, opts.min_time, opts.repeats, min_repeats=3)
+    return {**timing, 'cpu_median': statistics.median(cpu), **wire}
+
+
+def run(opts):
+    from utils import serialization
+
+    logging.disable(logging.WARNING)
+    serializers = ['stdlib'] + (['orjson'] if serialization.orjson is not None else [])
+    encodings = ['identity', 'gzip'] + (['br'] if serialization.brotli is not None else [])
+
+    report = {
+        'meta': {
+            'date': datetime.utcnow().isoformat(),
+            'python': sys.version.split()[0],
+            'snapshots': opts.snapshots,
+            'serializers': serializers,
+            'encodings': encodings
+        },
+        'results': []
+    }
+
+    with tempfile.TemporaryDirectory(prefix='portfolio-serialization-') as workdir:
+        db_path = os.path.join(workdir, 'bench.db')
+        for i, serializer in enumerate(serializers):
+            app = _build_app(db_path, workdir, serializer)
+            if i == 0:
+                with app.app_context():
+                    generate_history(opts.snapshots)
+            client = app.test_client()
+
+            for payload, path in PAYLOADS:
+                for encoding in encodings:
+                    result = bench_request(client, path, encoding, opts)
+                    report['results'].append({
+                        'payload': payload, 'serializer': serializer, 'accept_encoding': encoding, **result
+                    })
+                    print(f"✅ {payload:22s} {serializer:7s} {encoding:8s} {result['bytes']:>9} B "
+                          f"{result['cpu_median'] * 1000:8.2f} ms CPU", file=sys.stderr)
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--snapshots', type=int, default=24 * 365, help='Hourly snapshots generated')
+    parser.add_argument('--repeats', type=int, default=20, help='Maximum repeats per combination')
+    parser.add_argument('--min-time', type=float, default=0.5, help='Seconds spent per combination before stopping')
+    parser.add_argument('-o', '--output', default='serialization-results.json', help='JSON output file ("-" = stdout)')
+    opts = parser.parse_args(argv)
+
+    report = run(opts)
+    payload = json.dumps(report, indent=2)
+    if opts.output == '-':
+        print(payload)
+    else:
+        with open(opts.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"📄 Results written to {opts.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
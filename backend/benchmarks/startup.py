@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Start-up report - time from process start to a healthy /health, and where imports go
+
+Usage (from the backend folder):
+    python -m benchmarks.startup                         # 5 cold starts of wsgi.py
+    python -m benchmarks.startup --budget-ms 1500        # exit 1 above the budget (CI)
+    python -m benchmarks.startup --fake-exchange         # with Binance credentials set
+
+Each run starts a fresh interpreter with `python -X importtime`, imports
+wsgi.py (production app + auto-refresh threads, throwaway database), serves
+it on a local port and polls GET /health until it answers 200. The import
+log is folded per top-level package (self time), so a new eager dependency
+shows up by name. --budget-ms compares the median time to healthy.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Runs in the child: import the production entry point and serve it
+CHILD = """
+from werkzeug.serving import make_server
+import wsgi
+server = make_server('127.0.0.1', 0, wsgi.app, threaded=True)
+print(f"PORT {server.server_port}", flush=True)
+server.serve_forever()
+"""
+
+POLL_INTERVAL = 0.005
+TIMEOUT = 60
+
+
+def parse_importtime(stderr):
+    """
+    Fold `-X importtime` lines
+
+    Returns:
+        (total_us, {top-level package: self_us})
+    """
+    total = 0
+    by_package = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_field, cumulative_field, name = line.split('|')
+        self_us = int(self_field.split(':')[1])
+        cumulative_us = int(cumulative_field)
+        if not name.startswith('  '):  # Depth 0: imported by the entry point itself
+            total += cumulative_us
+        package = name.strip().split('.')[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    return total, by_package
+
+
+def interpreter_baseline():
+    """Seconds for `python -c pass` (subtracted mentally from the totals)"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return time.perf_counter() - started
+
+
+def start_once(env):
+    """
+    One cold start
+
+    Returns:
+        dict: {'healthy_s', 'listening_s', 'imports_us', 'packages'}
+    """
+    started = time.perf_counter()
+    child = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', CHILD],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    try:
+        port = None
+        for line in child.stdout:
+            if line.startswith('PORT '):
+                port = int(line.split()[1])
+                break
+        if port is None:
+            raise RuntimeError(f"Server exited before listening:\n{child.stderr.read()[-2000:]}")
+        listening = time.perf_counter() - started
+
+        url = f"http://127.0.0.1:{port}/health"
+        while True:
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    if response.status == 200:
+                        break
+            except OSError:
+                pass
+            if time.perf_counter() - started > TIMEOUT:
+                raise RuntimeError(f"/health not healthy after {TIMEOUT} s")
+            time.sleep(POLL_INTERVAL)
+        healthy = time.perf_counter() - started
+    finally:
+        child.terminate()
+        try:
+            _, stderr = child.communicate(timeout=10)
+        except subprocess.TimeoutExpired:
+            child.kill()
+            _, stderr = child.communicate()
+
+    imports_us, packages = parse_importtime(stderr)
+    return {'healthy_s': healthy, 'listening_s': listening, 'imports_us': imports_us, 'packages': packages}
+
+
+def run(opts):
+    exchange = None
+    with tempfile.TemporaryDirectory(prefix='portfolio-startup-') as workdir:
+        env = {k: v for k, v in os.environ.items() if not k.startswith('BINANCE_')}
+        env.update({
+            'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+            'LEADER_LOCK_FILE': os.path.join(workdir, 'startup.lock'),
+            'PRICE_BOARD_FILE': '',
+            'PYTHONDONTWRITEBYTECODE': '1'
+        })
+        if opts.fake_exchange:
+            from simulation.fake_exchange import FakeExchange, FakeMarket
+
+            exchange = FakeExchange(FakeMarket(), latency_ms=opts.latency_ms).start()
+            env.update({'BINANCE_API_KEY': 'x', 'BINANCE_API_SECRET': 'x', 'BINANCE_API_URL': exchange.url})
+
+        try:
+            runs = [start_once(env) for _ in range(opts.runs)]
+        finally:
+            if exchange is not None:
+                exchange.stop()
+
+    packages = {}
+    for r in runs:
+        for name, us in r['packages'].items():
+            packages.setdefault(name, []).append(us)
+    top = sorted(((name, statistics.median(v)) for name, v in packages.items()), key=lambda item: -item[1])
+
+    return {
+        'meta': {
+            'date': datetime.utcnow().isoformat(),
+            'python': sys.version.split()[0],
+            'runs': opts.runs,
+            'fake_exchange': opts.fake_exchange
+        },
+        'interpreter_ms': round(interpreter_baseline() * 1000, 1),
+        'healthy_ms': [round(r['healthy_s'] * 1000, 1) for r in runs],
+        'healthy_median_ms': round(statistics.median(r['healthy_s'] for r in runs) * 1000, 1),
+        'listening_median_ms': round(statistics.median(r['listening_s'] for r in runs) * 1000, 1),
+        'imports_median_ms': round(statistics.median(r['imports_us'] for r in runs) / 1000, 1),
+        'top_packages_ms': {name: round(us / 1000, 1) for name, us in top[:opts.top]}
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Cold starts measured')
+    parser.add_argument('--budget-ms', type=float, help='Fail (exit 1) if the median time to healthy exceeds this')
+    parser.add_argument('--fake-exchange', action='store_true', help='Set Binance credentials against a local fake exchange')
+    parser.add_argument('--latency-ms', type=float, default=100, help='Fake exchange latency (with --fake-exchange)')
+    parser.add_argument('--top', type=int, default=15, help='Packages listed in the import breakdown')
+    parser.add_argument('-o', '--output', default='-', help='JSON output file ("-" = stdout)')
+    opts = parser.parse_args(argv)
+
+    report = run(opts)
+    payload = json.dumps(report, indent=2)
+    if opts.output == '-':
+        print(payload)
+    else:
+        with open(opts.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"📄 Results written to {opts.output}", file=sys.stderr)
+
+    print(f"🚀 /health healthy after {report['healthy_median_ms']:.0f} ms (median of {opts.runs}; "
+          f"imports {report['imports_median_ms']:.0f} ms, bare interpreter {report['interpreter_ms']:.0f} ms)",
+          file=sys.stderr)
+    if opts.budget_ms is not None and report['healthy_median_ms'] > opts.budget_ms:
+        print(f"❌ Start-up budget exceeded: {report['healthy_median_ms']:.0f} ms > {opts.budget_ms:.0f} ms",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
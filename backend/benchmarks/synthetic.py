@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Synthetic portfolio histories for benchmarks
+Hourly snapshots following a random walk, with deposits/withdrawals at a
+realistic density (default: one every ~2 weeks) and a current last_balance.
+"""
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from core import portfolio_summary
+from core.performance_tracker import PerformanceTracker
+from db.models import db, Snapshot, CashFlow, LastBalance
+
+INSERT_CHUNK = 50000
+
+
+class OfflineTrader:
+    """Stand-in for BinanceTrader: endpoints only need get_trader() to succeed"""
+
+    all_symbols = []
+    client = None
+
+    def __init__(self, balances=None):
+        self.balances = balances or {}
+
+    def get_all_balances_usd(self, min_value=0.0):
+        return {a: b for a, b in self.balances.items() if b['usd_value'] >= min_value}
+
+
+def generate_history(n_snapshots, cashflow_every=336, interval=3600, assets=15,
+                     end=None, seed=42, with_metrics=True):
+    """
+    Fill the current app's (empty) database with a synthetic history
+
+    Args:
+        n_snapshots: Number of snapshots
+        cashflow_every: Average snapshots between two cash flows
+        interval: Seconds between snapshots
+        assets: Number of assets in last_balance
+        end: Datetime of the last snapshot (default: previous full hour, so
+             live endpoints can still append a snapshot)
+        with_metrics: Fill the stored TWR/P&L columns (one recompute pass)
+
+    Returns:
+        dict: {'snapshots', 'cash_flows', 'first', 'last'}
+    """
+    rng = random.Random(seed)
+    to_ts = PerformanceTracker.datetime_to_timestamp
+    step = timedelta(seconds=interval)
+    end = end or datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+    start = end - step * (n_snapshots - 1)
+
+    value = 10000.0
+    dt = start
+    snapshots, cash_flows = [], []
+    n_cash_flows = 0
+
+    for i in range(n_snapshots):
+        value *= 1 + rng.gauss(0.0001, 0.01)
+        if i and rng.random() < 1 / cashflow_every:
+            amount = rng.choice([500, 1000, 2500]) if rng.random() < 0.75 else -rng.choice([250, 1000])
+            amount = max(amount, -value / 2)
+            value += amount
+            cash_flows.append({
+                'timestamp': to_ts(dt - step / 2),
+                'amount_usd': round(amount, 2),
+                'type': 'DEPOSIT' if amount > 0 else 'WITHDRAW'
+            })
+        snapshots.append({'timestamp': to_ts(dt), 'total_value_usd': int(value)})
+        dt += step
+
+        if len(snapshots) >= INSERT_CHUNK:
+            db.session.execute(insert(Snapshot), snapshots)
+            snapshots = []
+        if len(cash_flows) >= INSERT_CHUNK:
+            db.session.execute(insert(CashFlow), cash_flows)
+            n_cash_flows += len(cash_flows)
+            cash_flows = []
+
+    if snapshots:
+        db.session.execute(insert(Snapshot), snapshots)
+    if cash_flows:
+        db.session.execute(insert(CashFlow), cash_flows)
+        n_cash_flows += len(cash_flows)
+
+    weights = [rng.random() for _ in range(assets)]
+    db.session.execute(insert(LastBalance), [
+        {
+            'timestamp': to_ts(dt),
+            'asset': f"A{i:03d}",
+            'balance': w * 10,
+            'usd_value': value * w / sum(weights),
+            'percentage': w / sum(weights) * 100
+        }
+        for i, w in enumerate(weights)
+    ])
+    portfolio_summary.rebuild()
+    db.session.commit()
+
+    if with_metrics:
+        PerformanceTracker(None).recompute_snapshot_metrics(batch_size=INSERT_CHUNK)
+
+    return {
+        'snapshots': n_snapshots,
+        'cash_flows': n_cash_flows,
+        'first': start,
+        'last': dt - step
+    }
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark timestamp decoding on large history reads, and the epoch migration
+
+Usage (from the backend folder):
+    python -m benchmarks.timestamps                          # 1M hourly timestamps
+    python -m benchmarks.timestamps --rows 100000 --migrate-rows 100000 -o timestamps.json
+
+'decode' times the column decoders of utils.timestamps (ISO strings for
+/snapshots rows and CSV exports, epoch seconds for ?format=columnar,
+datetimes for per-row to_dict, Arrow timestamps for Arrow/Parquet exports)
+over --rows consecutive hourly values, against the same decoders for the
+previous YYYYMMDDHHMM storage (reproduced below as the 'legacy' codec).
+
+'migration' fills a throwaway SQLite database with --migrate-rows legacy
+snapshots and times db.migrations.migrate_timestamps: rows per second and
+the average length of one batch transaction (how long other workers can be
+kept waiting for the write lock).
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.harness import measure  # noqa: E402
+from utils import timestamps  # noqa: E402
+
+EPOCH_DAY = date(1970, 1, 1)
+
+
+def legacy_encode(dt):
+    return dt.year * 100000000 + dt.month * 1000000 + dt.day * 10000 + dt.hour * 100 + dt.minute
+
+
+def legacy_decode(value):
+    if isinstance(value, datetime):
+        return value
+    value = int(value)
+    return datetime(value // 100000000, value // 1000000 % 100, value // 10000 % 100, value // 100 % 100, value % 100)
+
+
+def legacy_iso_many(values):
+    out = []
+    for v in values:
+        s = str(v)
+        out.append(f"{s[0:4]}-{s[4:6]}-{s[6:8]}T{s[8:10]}:{s[10:12]}:00")
+    return out
+
+
+def legacy_epoch_many(values):
+    out = []
+    days_cache = {}
+    for v in values:
+        day = v // 10000
+        days = days_cache.get(day)
+        if days is None:
+            days = days_cache[day] = (date(day // 10000, day // 100 % 100, day % 100) - EPOCH_DAY).days
+        out.append(days * 86400 + v // 100 % 100 * 3600 + v % 100 * 60)
+    return out
+
+
+def legacy_arrow(values):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    return pc.strptime(pc.cast(pa.array(values, type=pa.int64()), pa.string()), format='%Y%m%d%H%M', unit='s')
+
+
+def decoders():
+    """{name: (legacy decoder, epoch decoder)} of whole columns"""
+    pairs = {
+        'iso': (legacy_iso_many, timestamps.iso_many),
+        'epoch': (legacy_epoch_many, timestamps.epoch_many),
+        'datetime': (lambda values: [legacy_decode(v) for v in values],
+                     lambda values: [timestamps.decode(v) for v in values]),
+    }
+    try:
+        import pyarrow  # noqa: F401
+        pairs['arrow'] = (legacy_arrow, timestamps.arrow_timestamps)
+    except ImportError:
+        pass
+    return pairs
+
+
+def bench_decode(opts):
+    """Milliseconds per column decode in both storage formats"""
+    start = datetime(2020, 1, 1)
+    dts = [start + timedelta(hours=i) for i in range(opts.rows)]
+    columns = {'legacy': [legacy_encode(dt) for dt in dts], 'epoch': [timestamps.encode(dt) for dt in dts]}
+
+    results = {}
+    for name, (legacy, epoch) in decoders().items():
+        assert [str(x) for x in legacy(columns['legacy'][:48])] == [str(x) for x in epoch(columns['epoch'][:48])]
+        row = {}
+        for storage, fn in (('legacy', legacy), ('epoch', epoch)):
+            timing = measure(lambda: fn(columns[storage]), min_time=opts.min_time, max_repeats=opts.repeats)
+            row[f'{storage}_ms'] = round(timing['median'] * 1000, 2)
+        row['speedup'] = round(row['legacy_ms'] / row['epoch_ms'], 1) if row['epoch_ms'] else None
+        results[name] = row
+        print(f"✅ {name:9s} legacy {row['legacy_ms']:9.2f} ms  epoch {row['epoch_ms']:9.2f} ms  "
+              f"x{row['speedup']}", file=sys.stderr)
+    return results
+
+
+def bench_migration(opts):
+    """Time migrate_timestamps over a database of legacy snapshots"""
+    from sqlalchemy import insert
+    from app import create_app
+    from db.migrations import MIGRATION_BATCH_SIZE, migrate_timestamps
+    from db.models import db, Snapshot
+
+    with tempfile.TemporaryDirectory(prefix='portfolio-ts-') as workdir:
+        app = create_app('development', {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            'LEADER_LOCK_FILE': os.path.join(workdir, 'bench.lock'),
+            'PRICE_BOARD_FILE': ''
+        })
+        with app.app_context():
+            start = datetime(2020, 1, 1)
+            db.session.execute(insert(Snapshot), [
+                {'timestamp': legacy_encode(start + timedelta(hours=i)), 'total_value_usd': 10000}
+                for i in range(opts.migrate_rows)
+            ])
+            db.session.commit()
+
+            started = time.perf_counter()
+            converted = migrate_timestamps(db, batch_size=opts.batch_size or MIGRATION_BATCH_SIZE)
+            seconds = time.perf_counter() - started
+            first = db.session.query(Snapshot.timestamp).order_by(Snapshot.id).first()[0]
+            assert first == timestamps.encode(start), first
+            db.session.remove()
+            db.engine.dispose()
+
+    batches = math.ceil(converted / (opts.batch_size or MIGRATION_BATCH_SIZE))
+    result = {
+        'rows': converted,
+        'batch_size': opts.batch_size or MIGRATION_BATCH_SIZE,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(converted / seconds),
+        'batch_ms': round(seconds / batches * 1000, 2)
+    }
+    print(f"✅ migration {converted} rows in {seconds:.2f} s ({result['rows_per_second']} rows/s, "
+          f"{result['batch_ms']:.1f} ms per {result['batch_size']}-row transaction)", file=sys.stderr)
+    return result
+
+
+def run(opts):
+    logging.disable(logging.WARNING)
+    return {
+        'meta': {
+            'date': datetime.utcnow().isoformat(),
+            'python': sys.version.split()[0],
+            'rows': opts.rows,
+            'migrate_rows': opts.migrate_rows
+        },
+        'decode': bench_decode(opts),
+        'migration': bench_migration(opts) if opts.migrate_rows else None
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000, help='Timestamps decoded per column')
+    parser.add_argument('--migrate-rows', type=int, default=200000, help='Legacy snapshots migrated (0 = skip)')
+    parser.add_argument('--batch-size', type=int, help='Rows per migration transaction (default: MIGRATION_BATCH_SIZE)')
+    parser.add_argument('--repeats', type=int, default=5, help='Maximum repeats per decoder')
+    parser.add_argument('--min-time', type=float, default=1.0, help='Seconds spent per decoder before stopping')
+    parser.add_argument('-o', '--output', default='-', help='JSON output file ("-" = stdout)')
+    opts = parser.parse_args(argv)
+
+    report = run(opts)
+    payload = json.dumps(report, indent=2)
+    if opts.output == '-':
+        print(payload)
+    else:
+        with open(opts.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"📄 Results written to {opts.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
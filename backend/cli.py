@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Flask CLI commands (maintenance and offline jobs)
+Usage: flask --app app <command> [options]   (from the backend folder)
+"""
+import logging
+import click
+
+logger = logging.getLogger(__name__)
+
+
+def register_commands(app):
+    """Attach the maintenance commands to the Flask CLI"""
+
+    @app.cli.command('reconstruct-history')
+    @click.option('--since', required=True, type=click.DateTime(formats=['%Y-%m-%d']),
+                  help='Date the account history starts (first run only)')
+    @click.option('--symbols', default='', help='Comma-separated pairs to pull trades for (default: guessed)')
+    @click.option('--fixtures', type=click.Path(exists=True, file_okay=False),
+                  help='Replay recorded Binance responses instead of calling the API')
+    @click.option('--chunk-size', default=500, show_default=True, help='Buckets written per transaction')
+    def reconstruct_history(since, symbols, fixtures, chunk_size):
+        """Rebuild past snapshots and cash flows from Binance trade/deposit/withdraw history"""
+        from core.history_reconstruction import HistoryReconstructor, BinanceHistorySource, RecordedHistorySource
+        from core.klines import BinanceKlineSource, OfflineKlineSource
+        from services.session_manager import session_manager
+
+        if fixtures:
+            source = RecordedHistorySource(fixtures)
+            kline_source = OfflineKlineSource.from_json(f"{fixtures}/klines.json")
+        else:
+            trader = session_manager.get_trader()
+            source = BinanceHistorySource(trader.client)
+            kline_source = BinanceKlineSource(trader.client)
+
+        reconstructor = HistoryReconstructor(
+            source, kline_source,
+            interval=app.config.get('SNAPSHOT_INTERVAL', 3600),
+            chunk_size=chunk_size
+        )
+        result = reconstructor.run(since, [s for s in symbols.split(',') if s] or None)
+        click.echo(f"✅ {result['events']} events fetched, {result['snapshots']} snapshots reconstructed")
+
+    @app.cli.command('export')
+    @click.argument('table', type=click.Choice(['snapshots', 'cashflows']))
+    @click.option('--format', 'fmt', default='csv', show_default=True,
+                  type=click.Choice(['csv', 'arrow', 'parquet']), help='arrow/parquet require pyarrow')
+    @click.option('-o', '--output', required=True, type=click.Path(dir_okay=False), help='Destination file')
+    @click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), help='First day included')
+    @click.option('--until', type=click.DateTime(formats=['%Y-%m-%d']), help='Last timestamp included')
+    @click.option('--chunk-size', default=10000, show_default=True, help='Rows read and written per chunk')
+    def export(table, fmt, output, since, until, chunk_size):
+        """Stream a table to CSV, Arrow IPC or Parquet"""
+        from core.export import stream_export
+
+        try:
+            chunks = stream_export(table, fmt, since, until, chunk_size)
+        except ImportError as e:
+            raise click.ClickException(str(e))
+
+        written = 0
+        with open(output, 'w' if fmt == 'csv' else 'wb', **({'encoding': 'utf-8', 'newline': ''} if fmt == 'csv' else {})) as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        click.echo(f"✅ {table} exported to {output} ({written} {'chars' if fmt == 'csv' else 'bytes'})")
+
+    @app.cli.command('import')
+    @click.argument('table', type=click.Choice(['snapshots', 'cashflows']))
+    @click.argument('source', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+                  help='Input format (default: from the file extension)')
+    @click.option('--chunk-size', default=5000, show_default=True, help='Rows validated and inserted per transaction')
+    @click.option('--dry-run', is_flag=True, help='Validate and count duplicates without writing')
+    def import_rows(table, source, fmt, chunk_size, dry_run):
+        """Bulk import snapshots or cash flows from CSV / JSON lines (idempotent)"""
+        from core.bulk_import import import_stream
+
+        fmt = fmt or ('jsonl' if source.endswith(('.jsonl', '.ndjson')) else 'csv')
+        with open(source, 'rb') as f:
+            result = import_stream(table, f, fmt, chunk_size, dry_run)
+
+        for error in result['errors']:
+            click.echo(f"  line {error['line']}: {error['error']}", err=True)
+        click.echo(f"{'🔍 Dry run: ' if dry_run else '✅ '}{result['inserted']} rows imported, "
+                   f"{result['duplicates']} duplicates skipped, {result['error_count']} invalid, "
+                   f"{result['recomputed']} snapshots recomputed")
+
+    @app.cli.command('repair-summary')
+    def repair_summary():
+        """Recompute the materialized portfolio summary from the snapshot and cash flow tables"""
+        from core import portfolio_summary
+        from db.models import db
+
+        before = portfolio_summary.get_summary()
+        portfolio_summary.rebuild()
+        db.session.commit()
+        after = portfolio_summary.get_summary()
+
+        drift = {key: (before[key], after[key]) for key in after if before[key] != after[key]}
+        for key, (old, new) in drift.items():
+            click.echo(f"  {key}: {old} -> {new}")
+        click.echo(f"✅ Summary rebuilt ({len(drift)} fields corrected): {after['snapshot_count']} snapshots, "
+                   f"{after['cashflow_count']} cash flows")
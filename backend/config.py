@@ -3,6 +3,8 @@
 Configuration management for Flask backend
 """
 import os
+import tempfile
+from datetime import datetime
 from pathlib import Path
 
 # Base directory - use absolute path to avoid issues with Flask reloader
@@ -22,10 +24,71 @@ class Config:
     BINANCE_API_KEY = os.environ.get('BINANCE_API_KEY')
     BINANCE_API_SECRET = os.environ.get('BINANCE_API_SECRET')
     BINANCE_TESTNET = os.environ.get('BINANCE_TESTNET', 'false').lower() == 'true'
+    # Optional endpoint override, e.g. http://localhost:8765 for the local fake exchange
+    BINANCE_API_URL = os.environ.get('BINANCE_API_URL')
+    # Connect on the first use of the client instead of at start-up (import, ping, exchange info)
+    BINANCE_LAZY_CONNECT = os.environ.get('BINANCE_LAZY_CONNECT', 'true').lower() == 'true'
+    # HTTP client - per-request timeout, retries of idempotent requests (connection errors, 5xx),
+    # keep-alive pool, and the latency percentile after which a refresh call is sent again (0 = off)
+    BINANCE_TIMEOUT = float(os.environ.get('BINANCE_TIMEOUT', '10'))  # seconds
+    BINANCE_MAX_RETRIES = int(os.environ.get('BINANCE_MAX_RETRIES', '2'))
+    BINANCE_POOL_SIZE = int(os.environ.get('BINANCE_POOL_SIZE', '10'))
+    BINANCE_HEDGE_PERCENTILE = float(os.environ.get('BINANCE_HEDGE_PERCENTILE', '95'))
 
     # Auto-refresh settings
     BALANCE_UPDATE_INTERVAL = 30  # seconds - how often to update balances from Binance
     SNAPSHOT_INTERVAL = 3600  # seconds - how often to create snapshots (3600s = 1 hour)
+    SNAPSHOT_BACKFILL_MAX = 720  # max missed snapshots rebuilt from klines on start-up (720 = 30 days)
+    # Balance refresh engine: 'threads' (scheduler job, blocking REST calls) or 'asyncio'
+    # (AsyncClient fetch -> value -> executor write pipeline on one event loop)
+    REFRESH_ENGINE = os.environ.get('REFRESH_ENGINE', 'threads').lower()
+
+    # Cash flows - import deposits/withdrawals from Binance history automatically
+    # Opt-in: imported flows would double count deposits also entered by hand (POST /api/cashflows)
+    CASHFLOW_AUTO_INGEST = os.environ.get('CASHFLOW_AUTO_INGEST', 'false').lower() == 'true'
+    CASHFLOW_SYNC_INTERVAL = 600  # seconds - how often to poll deposit/withdraw history
+    # First ingestion starts here (YYYY-MM-DD), default: activation time (avoids duplicating manual entries)
+    CASHFLOW_INGEST_SINCE = datetime.strptime(os.environ['CASHFLOW_INGEST_SINCE'], '%Y-%m-%d') \
+        if os.environ.get('CASHFLOW_INGEST_SINCE') else None
+
+    # Leader election - with several Gunicorn workers only the lock holder runs auto-refresh
+    # (the lock file must be shared by all workers, i.e. on the same host/container)
+    LEADER_LOCK_FILE = os.environ.get('LEADER_LOCK_FILE') or \
+        os.path.join(tempfile.gettempdir(), 'portfolio-auto-refresh.lock')
+    LEADER_RETRY_INTERVAL = 5  # seconds - how often followers try to take over
+
+    # Price board - latest valuation shared with API workers through a memory-mapped file
+    # (unset: a file in /dev/shm named after the database; empty PRICE_BOARD_FILE disables it,
+    # /portfolio/balances then reads last_balance)
+    PRICE_BOARD_FILE = os.environ.get('PRICE_BOARD_FILE')
+    PRICE_BOARD_CAPACITY = 512  # max assets on the board
+    PRICE_BOARD_MAX_AGE = None  # seconds before readers ignore the board (None = 3 balance intervals)
+
+    # Profiling - opt-in cProfile captures of requests (X-Profile: 1 header or sampling)
+    # and refresh cycles (sampling), listed at GET /api/admin/profiles
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'portfolio-profiles')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))  # 0.01 = 1% of requests
+    PROFILE_MAX_FILES = 50  # captures kept (oldest deleted first)
+    PROFILE_HEADER = 'X-Profile'
+
+    # SQL instrumentation - statements per request/cycle at GET /api/admin/query-stats
+    # (X-SQL-Queries / X-SQL-Time-Ms headers in debug or with SQL_STATS_HEADERS)
+    SQL_QUERY_BUDGET = int(os.environ.get('SQL_QUERY_BUDGET', '25'))  # warn above this per request (0 = off)
+    SQL_STATS_HEADERS = os.environ.get('SQL_STATS_HEADERS', 'false').lower() == 'true'
+
+    # Read replica - in-memory copy of the SQLite file per worker serving GET /api/... requests,
+    # refreshed after each commit and when another worker's commit is seen (poll interval)
+    READ_REPLICA = os.environ.get('READ_REPLICA', 'false').lower() == 'true'
+    READ_REPLICA_POLL_INTERVAL = float(os.environ.get('READ_REPLICA_POLL_INTERVAL', '0.5'))  # seconds
+
+    # Serialization - orjson when installed ('auto'), 'stdlib' to force json;
+    # brotli/gzip compression negotiated via Accept-Encoding above COMPRESSION_MIN_SIZE bytes
+    JSON_SERIALIZER = os.environ.get('JSON_SERIALIZER', 'auto')
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 4  # 0-11: 4 is close to gzip -6 speed with smaller output
 
     # Portfolio settings
     MIN_BALANCE_USD = 5.0  # Minimum balance to display
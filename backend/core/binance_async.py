@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Binance Async - asyncio counterpart of BinanceTrader's balance fetch
+Built on python-binance's AsyncClient (aiohttp, installed with python-binance),
+so one event loop can keep the account and ticker requests of many accounts
+in flight without a thread per request. Same behaviour as BinanceTrader:
+ticker requests scoped to the held routes (the full dump until holdings are
+known), a delisted route reloads exchange info, valuation by
+binance_trader.value_balances. Connection errors and 5xx answers are retried
+like the requests adapter of core.binance_http; 429s never are. There is no
+hedging: a slow call only delays its own account.
+"""
+import asyncio
+import json
+import logging
+import time
+from core.binance_http import DEFAULT_MAX_RETRIES, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, RETRY_STATUSES
+from core.binance_trader import INVALID_SYMBOL, TICKER_BATCH_SIZE, held_assets, price_symbol, value_balances
+from utils.metrics import BINANCE_LATENCY, BINANCE_WEIGHT
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF = 0.2  # seconds, doubled after each retry (urllib3 backoff_factor)
+
+
+def async_client_class(api_url=None):
+    """
+    python-binance AsyncClient subclass pointed at `api_url`
+
+    Args:
+        api_url: Optional base URL replacing https://api.binance.com
+    """
+    # Deferred like client_class: python-binance pulls dateparser & co
+    from binance import AsyncClient
+
+    class EndpointAsyncClient(AsyncClient):
+        pass
+
+    if api_url:
+        EndpointAsyncClient.API_URL = EndpointAsyncClient.API_TESTNET_URL = f"{api_url}/api"
+        EndpointAsyncClient.MARGIN_API_URL = f"{api_url}/sapi"
+    return EndpointAsyncClient
+
+
+def _trace_config():
+    """aiohttp trace hooks feeding the same metrics as instrument_http_session"""
+    import aiohttp
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        BINANCE_LATENCY.observe(time.perf_counter() - context.started,
+                                endpoint=params.url.path, status=str(params.response.status))
+        weight = params.response.headers.get('X-MBX-USED-WEIGHT-1M')
+        if weight is not None:
+            BINANCE_WEIGHT.set(int(weight))
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    return trace
+
+
+def _retryable(error):
+    """Connection errors, timeouts and 5xx (the requests adapter's retry policy)"""
+    import aiohttp
+
+    if isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+        return True
+    return getattr(error, 'status_code', None) in RETRY_STATUSES
+
+
+class AsyncBinanceTrader:
+    """Balance fetch and valuation of one Binance account on an event loop"""
+
+    def __init__(self, client, max_retries=DEFAULT_MAX_RETRIES, min_value=0.0):
+        """
+        Args:
+            client: python-binance AsyncClient
+            max_retries: Retries of a request on connection errors and 5xx
+            min_value: Balances worth less than this (USD) are left out of value()
+        """
+        self.client = client
+        self.max_retries = max_retries
+        self.min_value = min_value
+        self.all_symbols = []
+        # Routes pricing the current holdings (None: unknown, the next fetch gets every ticker)
+        self.price_symbols = None
+        self._trading = frozenset()
+
+    @classmethod
+    async def create(cls, api_key, api_secret, testnet=False, api_url=None, timeout=DEFAULT_TIMEOUT,
+                     max_retries=DEFAULT_MAX_RETRIES, pool_size=DEFAULT_POOL_SIZE, min_value=0.0, **_):
+        """
+        Connect (ping) and load exchange info; must run on the loop that will use the trader
+
+        Args:
+            api_url: Optional base URL replacing https://api.binance.com
+            timeout: Seconds per HTTP request
+            pool_size: Connections kept to Binance (aiohttp connector limit)
+            **_: BinanceTrader options without an async equivalent (hedge_percentile)
+        """
+        import aiohttp
+
+        if api_url:
+            api_url = api_url.rstrip('/')
+        client = await async_client_class(api_url).create(
+            api_key, api_secret, testnet=testnet,
+            requests_params={'timeout': aiohttp.ClientTimeout(total=timeout)},
+            session_params={'connector': aiohttp.TCPConnector(limit=pool_size),
+                            'trace_configs': [_trace_config()]}
+        )
+        trader = cls(client, max_retries=max_retries, min_value=min_value)
+        try:
+            await trader.load_exchange_info()
+        except Exception:
+            await client.close_connection()
+            raise
+        return trader
+
+    async def close(self):
+        await self.client.close_connection()
+
+    async def load_exchange_info(self):
+        info = await self._call(self.client.get_exchange_info)
+        self.all_symbols = [s['symbol'] for s in info['symbols'] if s['status'] == 'TRADING']
+        self._trading = frozenset(self.all_symbols)
+
+    async def _call(self, method, **params):
+        """Await one REST call, retrying connection errors and 5xx with exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await method(**params)
+            except Exception as e:
+                if attempt == self.max_retries or not _retryable(e):
+                    raise
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    def routes(self, assets):
+        """Sorted symbols pricing the given assets (stablecoins and unpriceable assets have none)"""
+        return sorted({symbol for symbol in (price_symbol(a, self._trading) for a in assets) if symbol})
+
+    async def _get_prices(self, symbols):
+        """[{symbol, price}] of the given symbols (TICKER_BATCH_SIZE per request, sent concurrently)"""
+        batches = await asyncio.gather(*(
+            self._call(self.client.get_symbol_ticker,
+                       symbols=json.dumps(symbols[i:i + TICKER_BATCH_SIZE], separators=(',', ':')))
+            for i in range(0, len(symbols), TICKER_BATCH_SIZE)
+        ))
+        return [ticker for batch in batches for ticker in batch]
+
+    async def fetch(self):
+        """
+        Account and prices, requested concurrently
+
+        Returns:
+            (account, {symbol: price})
+        """
+        scoped = self.price_symbols is not None
+        prices = self._get_prices(self.price_symbols) if scoped else self._call(self.client.get_all_tickers)
+        try:
+            account, batch = await asyncio.gather(self._call(self.client.get_account), prices)
+        except Exception as e:
+            if not scoped or getattr(e, 'code', None) != INVALID_SYMBOL:
+                raise
+            # A held route was delisted since exchange info was loaded
+            logger.warning(f"⚠️  Scoped ticker fetch rejected ({e}), reloading exchange info")
+            self.price_symbols = None
+            await self.load_exchange_info()
+            return await self.fetch()
+
+        tickers = {t['symbol']: float(t['price']) for t in batch}
+        if self._trading:
+            self.price_symbols = self.routes(held_assets(account))
+            missing = [symbol for symbol in self.price_symbols if symbol not in tickers]
+            if scoped and missing:  # Holdings changed since the last refresh
+                tickers.update((t['symbol'], float(t['price'])) for t in await self._get_prices(missing))
+        return account, tickers
+
+    def value(self, account, tickers):
+        """{asset: {'balance', 'price', 'usd_value'}} (CPU only, runs on the loop)"""
+        return value_balances(account, tickers, self.min_value)
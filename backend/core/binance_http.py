@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Binance HTTP - Pooled, retried and hedged REST calls for BinanceTrader
+The python-binance client is given a keep-alive connection pool sized for
+the concurrent refresh calls, a per-request timeout and bounded retries of
+idempotent requests on connection errors and 5xx answers (never on 429:
+Binance bans clients that ignore rate limits).
+
+Hedger.gather() runs independent calls (account + tickers) concurrently.
+When a call is still running after the configured percentile of its own
+recent latencies, the same request is sent a second time and the first
+answer wins, so one stalled connection no longer holds up the cycle. At the
+95th percentile this costs about 5% extra request weight.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from utils.metrics import BINANCE_HEDGES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 10  # seconds per request (connect and read)
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_POOL_SIZE = 10
+DEFAULT_HEDGE_PERCENTILE = 95  # 0 = never hedge
+
+RETRY_STATUSES = (500, 502, 503, 504)
+LATENCY_WINDOW = 200  # latencies kept per call
+MIN_SAMPLES = 20  # no hedging before this many latencies are known
+MIN_HEDGE_DELAY = 0.02  # seconds - never hedge earlier than this
+
+
+def mount_pool(session, pool_size=DEFAULT_POOL_SIZE, max_retries=DEFAULT_MAX_RETRIES):
+    """Give a requests.Session a sized keep-alive pool and a retry policy"""
+    # Deferred like client_class: the requests stack is only needed once connecting
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=max_retries, connect=max_retries, read=max_retries, status=max_retries,
+        backoff_factor=0.2, status_forcelist=RETRY_STATUSES, raise_on_status=False,  # Last 5xx raises as before
+        respect_retry_after_header=False  # Would otherwise retry 429s that carry Retry-After
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def client_class(api_url=None, pool_size=DEFAULT_POOL_SIZE, max_retries=DEFAULT_MAX_RETRIES):
+    """
+    python-binance Client subclass using the pool and safe for concurrent calls
+
+    Args:
+        api_url: Optional base URL replacing https://api.binance.com
+    """
+    # Deferred: python-binance pulls dateparser & co (~0.5 s of start-up)
+    from binance.client import Client
+
+    class PooledClient(Client):
+        def _init_session(self):
+            return mount_pool(super()._init_session(), pool_size, max_retries)
+
+        def _request(self, method, uri, signed, force_params=False, **kwargs):
+            # The stock version re-reads self.response, which a concurrent call may have replaced
+            kwargs = self._get_request_kwargs(method, signed, force_params, **kwargs)
+            response = getattr(self.session, method)(uri, **kwargs)
+            self.response = response
+            return self._handle_response(response)
+
+    if api_url:
+        # The client pings in its constructor, so the URLs must be set on the class
+        PooledClient.API_URL = PooledClient.API_TESTNET_URL = f"{api_url}/api"
+        PooledClient.MARGIN_API_URL = f"{api_url}/sapi"
+    return PooledClient
+
+
+class Hedger:
+    """Concurrent calls with a hedged second attempt after a latency percentile"""
+
+    def __init__(self, percentile=DEFAULT_HEDGE_PERCENTILE, max_workers=4):
+        """
+        Args:
+            percentile: Latency percentile after which a call is sent again (0 = off)
+            max_workers: Threads for primary and hedged attempts
+        """
+        self.percentile = percentile
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='binance')
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'hedged': 0, 'hedge_won': 0}
+
+    def hedge_delay(self, name):
+        """Seconds after which `name` is hedged (None while disabled or learning)"""
+        if not self.percentile:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies.get(name, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(MIN_HEDGE_DELAY, samples[index])
+
+    def _observe(self, name, seconds):
+        with self._lock:
+            self._latencies.setdefault(name, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def _submit(self, name, fn):
+        def attempt():
+            started = time.perf_counter()
+            result = fn()
+            self._observe(name, time.perf_counter() - started)
+            return result
+
+        return self._executor.submit(attempt)
+
+    def gather(self, calls):
+        """
+        Run independent calls concurrently, hedging the slow ones
+
+        Args:
+            calls: {name: zero-argument callable}
+
+        Returns:
+            dict: {name: result} (the first exception is raised if a call
+            fails with no other attempt of it still running)
+        """
+        started = time.perf_counter()
+        pending = {}  # future -> (name, attempt number)
+        hedge_at = {}
+        for name, fn in calls.items():
+            pending[self._submit(name, fn)] = (name, 0)
+            delay = self.hedge_delay(name)
+            if delay is not None:
+                hedge_at[name] = started + delay
+
+        results = {}
+        hedged = set()
+        while len(results) < len(calls):
+            timeout = max(0.0, min(hedge_at.values()) - time.perf_counter()) if hedge_at else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name, attempt = pending.pop(future)
+                if name in results:
+                    continue  # The other attempt already answered
+                if future.exception() is None:
+                    results[name] = future.result()
+                    hedge_at.pop(name, None)
+                    if name in hedged:
+                        BINANCE_HEDGES.inc(call=name, winner='hedge' if attempt else 'primary')
+                        with self._lock:
+                            self.stats['hedge_won'] += bool(attempt)
+                elif not any(other == name for other, _ in pending.values()):
+                    raise future.exception()  # Retries already happened in the adapter
+
+            now = time.perf_counter()
+            for name, due in list(hedge_at.items()):
+                if now >= due:
+                    del hedge_at[name]
+                    hedged.add(name)
+                    pending[self._submit(name, calls[name])] = (name, 1)
+                    logger.debug(f"Hedging {name} after {now - started:.3f}s")
+
+        with self._lock:
+            self.stats['calls'] += len(calls)
+            self.stats['hedged'] += len(hedged)
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -3,18 +3,105 @@
 Binance Trader - Core trading logic extracted from main.py
 PRESERVED: Original business logic without modifications
 """
+import json
 import logging
-from binance.client import Client
+from functools import partial
+from core.binance_http import (DEFAULT_HEDGE_PERCENTILE, DEFAULT_MAX_RETRIES, DEFAULT_POOL_SIZE,
+                               DEFAULT_TIMEOUT, Hedger, client_class)
+from utils.metrics import REFRESH_DURATION, instrument_http_session
 
 logger = logging.getLogger(__name__)
 
+# Assets valued at 1 USD, and quotes tried (in order) to price everything else
+STABLECOINS = ['USDT', 'USDC', 'BUSD', 'FDUSD']
+QUOTE_ASSETS = ['USDT', 'USDC', 'BUSD']
+
+TICKER_BATCH_SIZE = 100  # symbols per /ticker/price request (keeps the URL short)
+INVALID_SYMBOL = -1121  # Binance error code: a requested symbol is not listed (any more)
+
+
+def price_symbol(asset, symbols):
+    """
+    Symbol used to price an asset in USD (None for stablecoins or unpriceable assets)
+
+    Args:
+        asset: Asset code (e.g. 'BTC')
+        symbols: Collection of tradable symbols (e.g. BinanceTrader.all_symbols)
+    """
+    if asset in STABLECOINS:
+        return None
+    for quote in QUOTE_ASSETS:
+        if f"{asset}{quote}" in symbols:
+            return f"{asset}{quote}"
+    return None
+
+
+def held_assets(account):
+    """Assets with a non-zero free or locked balance in a /account answer"""
+    return [b['asset'] for b in account['balances'] if float(b['free']) + float(b['locked']) > 0]
+
+
+def value_balances(account, tickers, min_value):
+    """
+    USD value of each account balance at the given ticker prices
+
+    Args:
+        account: /api/v3/account answer
+        tickers: {symbol: price}
+        min_value: Balances worth less than this (USD) are left out
+
+    Returns:
+        {asset: {'balance', 'price', 'usd_value'}}
+    """
+    balances = {}
+
+    for bal in account['balances']:
+        asset, total = bal['asset'], float(bal['free']) + float(bal['locked'])
+        if total <= 0:
+            continue
+
+        if asset in STABLECOINS:
+            price = 1.0
+        else:
+            symbol = price_symbol(asset, tickers)
+            price = tickers[symbol] if symbol else 0
+        usd_val = total * price
+
+        if usd_val >= min_value:
+            balances[asset] = {
+                'balance': total,
+                'price': price,
+                'usd_value': usd_val
+            }
+    return balances
+
 
 class BinanceTrader:
-    def __init__(self, api_key, api_secret, testnet=False):
-        self.client = Client(api_key, api_secret, testnet=testnet)
+    def __init__(self, api_key, api_secret, testnet=False, api_url=None, timeout=DEFAULT_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES, pool_size=DEFAULT_POOL_SIZE,
+                 hedge_percentile=DEFAULT_HEDGE_PERCENTILE):
+        """
+        Args:
+            api_url: Optional base URL replacing https://api.binance.com
+                     (e.g. a local fake exchange for soak tests)
+            timeout: Seconds per HTTP request
+            max_retries: Retries of idempotent requests on connection errors and 5xx
+            pool_size: Keep-alive connections kept to Binance
+            hedge_percentile: Latency percentile after which a refresh call is sent again (0 = off)
+        """
+        if api_url:
+            api_url = api_url.rstrip('/')
+            logger.info(f"Binance API URL overridden: {api_url}")
+        client = client_class(api_url, pool_size=pool_size, max_retries=max_retries)
+        self.client = client(api_key, api_secret, testnet=testnet, requests_params={'timeout': timeout})
+        instrument_http_session(self.client.session)
+        self.hedger = Hedger(hedge_percentile)
         self.all_symbols = []
         self.all_assets = set()
         self.exchange_info = None
+        # Routes pricing the current holdings (None: unknown, the next refresh fetches every ticker)
+        self.price_symbols = None
+        self._trading = frozenset()
         logger.info(f"Client Binance initialisÃ© (testnet: {testnet})")
         self._load_exchange_info()
 
@@ -22,6 +109,7 @@ class BinanceTrader:
         try:
             self.exchange_info = self.client.get_exchange_info()
             self.all_symbols = [s['symbol'] for s in self.exchange_info['symbols'] if s['status'] == 'TRADING']
+            self._trading = frozenset(self.all_symbols)
             for symbol_info in self.exchange_info['symbols']:
                 if symbol_info['status'] == 'TRADING':
                     self.all_assets.add(symbol_info['baseAsset'])
@@ -31,27 +119,53 @@ class BinanceTrader:
             logger.error(f"Erreur chargement exchange info: {e}")
 
     def get_all_balances_usd(self, min_value=300.0):
-        account = self.client.get_account()
-        tickers = {t['symbol']: float(t['price']) for t in self.client.get_all_tickers()}
-        balances = {}
-
-        for bal in account['balances']:
-            asset, total = bal['asset'], float(bal['free']) + float(bal['locked'])
-            if total <= 0:
-                continue
-
-            if asset in ['USDT', 'USDC', 'BUSD', 'FDUSD']:
-                usd_val = total
-            else:
-                usd_val = 0
-                for quote in ['USDT', 'USDC', 'BUSD']:
-                    if f"{asset}{quote}" in tickers:
-                        usd_val = total * tickers[f"{asset}{quote}"]
-                        break
-
-            if usd_val >= min_value:
-                balances[asset] = {
-                    'balance': total,
-                    'usd_value': usd_val
-                }
-        return balances
+        with REFRESH_DURATION.time(phase='fetch'):
+            scoped = self.price_symbols is not None
+            try:
+                # Independent requests: sent concurrently, each hedged when unusually slow
+                fetched = self.hedger.gather({'account': self.client.get_account, **self._ticker_calls()})
+            except Exception as e:
+                if not scoped or getattr(e, 'code', None) != INVALID_SYMBOL:
+                    raise
+                # A held route was delisted since exchange info was loaded
+                logger.warning(f"⚠️  Scoped ticker fetch rejected ({e}), reloading exchange info")
+                self.price_symbols = None
+                self._load_exchange_info()
+                return self.get_all_balances_usd(min_value)
+
+            account = fetched.pop('account')
+            tickers = {t['symbol']: float(t['price']) for batch in fetched.values() for t in batch}
+
+            if self._trading:
+                self.price_symbols = self.routes(held_assets(account))
+                missing = [symbol for symbol in self.price_symbols if symbol not in tickers]
+                if scoped and missing:  # Holdings changed since the last refresh
+                    tickers.update((t['symbol'], float(t['price'])) for t in self._get_prices(missing))
+
+        with REFRESH_DURATION.time(phase='value'):
+            return self._value_balances(account, tickers, min_value)
+
+    def routes(self, assets):
+        """Sorted symbols pricing the given assets (stablecoins and unpriceable assets have none)"""
+        return sorted({symbol for symbol in (price_symbol(a, self._trading) for a in assets) if symbol})
+
+    def _ticker_calls(self):
+        """{name: callable} fetching the prices needed this refresh (every ticker until holdings are known)"""
+        if self.price_symbols is None:
+            return {'tickers': self.client.get_all_tickers}
+        symbols = self.price_symbols
+        batches = [symbols[i:i + TICKER_BATCH_SIZE] for i in range(0, len(symbols), TICKER_BATCH_SIZE)]
+        return {f"tickers_{n}" if n else 'tickers': partial(self._get_prices, batch) for n, batch in enumerate(batches)}
+
+    def _get_prices(self, symbols):
+        """[{symbol, price}] of the given symbols (at most TICKER_BATCH_SIZE per request)"""
+        prices = []
+        for i in range(0, len(symbols), TICKER_BATCH_SIZE):
+            batch = json.dumps(symbols[i:i + TICKER_BATCH_SIZE], separators=(',', ':'))
+            prices.extend(self.client.get_symbol_ticker(symbols=batch))
+        return prices
+
+    def _value_balances(self, account, tickers, min_value):
+        """USD value of each account balance at the given ticker prices"""
+        return value_balances(account, tickers, min_value)
+
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Bulk Import - Load historical snapshots and cash flows from CSV or JSON lines
+Rows are validated chunk by chunk and inserted with one executemany per
+chunk (one transaction each). Rows already in the database (same snapshot
+timestamp, same cash flow tx_id or timestamp/amount/type) are skipped, so an
+import can be re-run safely. Stored TWR/P&L columns are recomputed once at
+the end, from the earliest imported row.
+"""
+import csv
+import io
+import json
+import logging
+import math
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from core import portfolio_summary
+from core.performance_tracker import PerformanceTracker
+from db.models import db, Snapshot, CashFlow
+from utils import timestamps
+
+logger = logging.getLogger(__name__)
+
+TABLES = ('snapshots', 'cashflows')
+FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+
+class RowError(ValueError):
+    """Invalid row (message reported with its line number)"""
+
+
+def parse_timestamp(value):
+    """
+    Stored integer (epoch seconds, or legacy YYYYMMDDHHMM) or ISO 8601
+    string/datetime -> stored integer
+    Timezone-aware values are converted to UTC; fractions of a second are dropped.
+    """
+    if value is None or value == '':
+        raise RowError('missing timestamp')
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        text = str(value).strip()
+        if text.isdigit():
+            try:
+                return timestamps.normalize(int(text))
+            except ValueError:
+                raise RowError(f'invalid timestamp {text!r}')
+        else:
+            try:
+                dt = datetime.fromisoformat(text.replace('Z', '+00:00'))
+            except ValueError:
+                raise RowError(f'invalid timestamp {text!r}')
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamps.encode(dt)
+
+
+def _number(row, field):
+    value = row.get(field)
+    if value is None or value == '':
+        raise RowError(f'missing {field}')
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise RowError(f'invalid {field} {value!r}')
+    if not math.isfinite(number):
+        raise RowError(f'invalid {field} {value!r}')
+    return number
+
+
+def validate_snapshot(row):
+    """{timestamp, total_value_usd} -> insertable mapping (metrics are recomputed)"""
+    value = _number(row, 'total_value_usd')
+    if value < 0:
+        raise RowError('total_value_usd must be >= 0')
+    return {'timestamp': parse_timestamp(row.get('timestamp')), 'total_value_usd': int(value)}
+
+
+def validate_cash_flow(row):
+    """{timestamp, amount_usd, type[, tx_id]} -> insertable mapping (withdrawals stored negative)"""
+    cf_type = str(row.get('type') or '').upper()
+    if cf_type not in ('DEPOSIT', 'WITHDRAW'):
+        raise RowError('type must be DEPOSIT or WITHDRAW')
+    amount = _number(row, 'amount_usd')
+    if amount == 0:
+        raise RowError('amount_usd must not be 0')
+    amount = -abs(amount) if cf_type == 'WITHDRAW' else abs(amount)
+    return {
+        'timestamp': parse_timestamp(row.get('timestamp')),
+        'amount_usd': round(amount, 2),
+        'type': cf_type,
+        'tx_id': str(row['tx_id']) if row.get('tx_id') not in (None, '') else None
+    }
+
+
+def read_rows(text_stream, fmt):
+    """Yield (line number, dict) from a CSV (with header) or JSON-lines text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(text_stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_num, line in enumerate(text_stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_num, RowError(f'invalid JSON: {e}')
+                continue
+            yield line_num, row if isinstance(row, dict) else RowError('expected a JSON object')
+    else:
+        raise ValueError(f"Unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+
+class BulkImporter:
+    """Chunked, idempotent import of one table"""
+
+    def __init__(self, table, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+        """
+        Args:
+            table: 'snapshots' or 'cashflows'
+            chunk_size: Rows validated and inserted per transaction
+            dry_run: Validate and count duplicates without writing
+        """
+        if table not in TABLES:
+            raise ValueError(f"Unknown table {table!r} (expected one of {', '.join(TABLES)})")
+        self.table = table
+        self.model = Snapshot if table == 'snapshots' else CashFlow
+        self.validate = validate_snapshot if table == 'snapshots' else validate_cash_flow
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+
+    def _key(self, row):
+        if self.table == 'snapshots':
+            return row['timestamp']
+        return row['tx_id'] or (row['timestamp'], row['amount_usd'], row['type'])
+
+    def _existing_keys(self, rows):
+        """Natural keys of the chunk already stored"""
+        low = min(r['timestamp'] for r in rows)
+        high = max(r['timestamp'] for r in rows)
+        model = self.model
+
+        if self.table == 'snapshots':
+            query = db.session.query(model.timestamp).filter(model.timestamp.between(low, high))
+            return {ts for (ts,) in query}
+
+        keys = set()
+        tx_ids = [r['tx_id'] for r in rows if r['tx_id']]
+        if tx_ids:
+            keys.update(tx for (tx,) in db.session.query(model.tx_id).filter(model.tx_id.in_(tx_ids)))
+        query = db.session.query(model.timestamp, model.amount_usd, model.type)\
+            .filter(model.timestamp.between(low, high))
+        keys.update((ts, round(amount, 2), cf_type) for ts, amount, cf_type in query)
+        return keys
+
+    def _flush(self, rows, seen, result):
+        """Dedupe and insert one validated chunk in its own transaction"""
+        if not rows:
+            return
+        existing = self._existing_keys(rows)
+        fresh = []
+        for row in rows:
+            key = self._key(row)
+            if key in existing or key in seen:
+                result['duplicates'] += 1
+                continue
+            seen.add(key)
+            fresh.append(row)
+
+        if fresh and not self.dry_run:
+            try:
+                db.session.execute(insert(self.model), fresh)
+                if self.table == 'snapshots':
+                    portfolio_summary.record(snapshots=fresh)
+                else:
+                    portfolio_summary.record(cash_flows=fresh)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        if fresh:
+            result['inserted'] += len(fresh)
+            earliest = min(r['timestamp'] for r in fresh)
+            if result['earliest'] is None or earliest < result['earliest']:
+                result['earliest'] = earliest
+
+    def run(self, rows):
+        """
+        Import rows (requires app context)
+
+        Args:
+            rows: Iterable of (line number, dict or RowError) - see read_rows
+
+        Returns:
+            dict: {'inserted', 'duplicates', 'error_count', 'errors': [{line, error}],
+                   'recomputed', 'dry_run'}
+        """
+        result = {'inserted': 0, 'duplicates': 0, 'error_count': 0, 'errors': [],
+                  'earliest': None, 'recomputed': 0, 'dry_run': self.dry_run}
+        seen = set()  # Keys inserted by this import (duplicates inside the file)
+        chunk = []
+
+        for line_num, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                chunk.append(self.validate(row))
+            except RowError as e:
+                result['error_count'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append({'line': line_num, 'error': str(e)})
+
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, seen, result)
+                chunk = []
+        self._flush(chunk, seen, result)
+
+        earliest = result.pop('earliest')
+        if earliest is not None and not self.dry_run:
+            # One pass over the snapshots after the earliest imported row
+            result['recomputed'] = PerformanceTracker(None).recompute_snapshot_metrics(
+                since=timestamps.decode(earliest))
+
+        logger.info(f"📥 Imported {result['inserted']} {self.table} "
+                    f"({result['duplicates']} duplicates, {result['error_count']} invalid rows)")
+        return result
+
+
+def import_stream(table, binary_stream, fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """Import a UTF-8 byte stream (file upload, request body, open file)"""
+    text_stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    return BulkImporter(table, chunk_size, dry_run).run(read_rows(text_stream, fmt))
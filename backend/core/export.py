@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Export - Stream snapshots and cash flows in columnar form (CSV, Arrow IPC, Parquet)
+Rows are read through a streaming cursor in fixed-size partitions, turned into
+columns and encoded chunk by chunk, so memory stays flat whatever the table
+size. Timestamps are decoded a whole column at a time (utils.timestamps).
+Arrow and Parquet need pyarrow (optional dependency).
+"""
+import csv
+import io
+import logging
+from sqlalchemy import select
+from db.models import db, Snapshot, CashFlow
+from utils import timestamps
+
+logger = logging.getLogger(__name__)
+
+# Exportable tables: model and columns, in output order
+TABLES = {
+    'snapshots': (Snapshot, ['id', 'timestamp', 'total_value_usd', 'twr', 'pnl', 'pnl_percent']),
+    'cashflows': (CashFlow, ['id', 'timestamp', 'amount_usd', 'type', 'tx_id']),
+}
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def iter_column_chunks(table, start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield {column: [values]} chunks of a table ordered by timestamp (requires app context)
+
+    Args:
+        table: Key of TABLES
+        start / end: Optional datetimes bounding the timestamp column (inclusive)
+        chunk_size: Rows fetched and yielded per chunk
+    """
+    model, columns = TABLES[table]
+    query = select(*[getattr(model, c) for c in columns]).order_by(model.timestamp, model.id)
+    if start is not None:
+        query = query.where(model.timestamp >= timestamps.encode(start))
+    if end is not None:
+        query = query.where(model.timestamp <= timestamps.encode(end))
+
+    result = db.session.execute(query.execution_options(stream_results=True, yield_per=chunk_size))
+    try:
+        for rows in result.partitions(chunk_size):
+            yield dict(zip(columns, (list(col) for col in zip(*rows))))
+    finally:
+        result.close()
+
+
+def stream_csv(table, start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """CSV text chunks (header first), timestamps as ISO 8601 UTC"""
+    _, columns = TABLES[table]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for chunk in iter_column_chunks(table, start, end, chunk_size):
+        chunk['timestamp'] = timestamps.iso_many(chunk['timestamp'])
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(zip(*(chunk[c] for c in columns)))
+        yield buffer.getvalue()
+
+
+class _ChunkSink:
+    """Write-only file object collecting what pyarrow writes, drained per chunk"""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_schema(table):
+    import pyarrow as pa
+
+    _, columns = TABLES[table]
+    types = {
+        'timestamp': pa.timestamp('s'),
+        'id': pa.int64(), 'total_value_usd': pa.int64(), 'pnl': pa.int64(),
+        'twr': pa.float64(), 'pnl_percent': pa.float64(), 'amount_usd': pa.float64(),
+        'type': pa.string(), 'tx_id': pa.string()
+    }
+    return pa.schema([(c, types[c]) for c in columns])
+
+
+def _record_batch(chunk, schema):
+    import pyarrow as pa
+
+    arrays = [
+        timestamps.arrow_timestamps(chunk[c]) if c == 'timestamp' else pa.array(chunk[c], type=schema.field(c).type)
+        for c in schema.names
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def stream_arrow(table, fmt='arrow', start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Arrow IPC stream or Parquet bytes, one record batch / row group per chunk
+
+    Raises:
+        ImportError: pyarrow is not installed
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(table)
+    sink = _ChunkSink()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        for chunk in iter_column_chunks(table, start, end, chunk_size):
+            batch = _record_batch(chunk, schema)
+            if fmt == 'parquet':
+                writer.write_batch(batch, row_group_size=len(chunk['id']))
+            else:
+                writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream_export(table, fmt='csv', start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Chunks of the export in the requested format (str for CSV, bytes otherwise)"""
+    if table not in TABLES:
+        raise ValueError(f"Unknown table {table!r} (expected one of {', '.join(TABLES)})")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    if fmt == 'csv':
+        return stream_csv(table, start, end, chunk_size)
+    if not pyarrow_available():
+        raise ImportError(f"Format {fmt} requires pyarrow (pip install pyarrow)")
+    return stream_arrow(table, fmt, start, end, chunk_size)
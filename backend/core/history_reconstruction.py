@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+History Reconstruction - Rebuild past snapshots from Binance account history
+Three resumable steps:
+1. fetch_events: pull trades, deposits and withdrawals incrementally into ledger_events
+2. replay: walk ledger_events in time order into a quantity-per-asset timeline
+3. build_snapshots: value each interval bucket with bulk-fetched klines and
+   bulk-insert snapshots (plus deposits/withdrawals as cash flows)
+
+Progress is stored in sync_cursors after every page/chunk, so an interrupted
+run resumes where it stopped. Memory is bounded by the chunk size.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from core.binance_trader import STABLECOINS, QUOTE_ASSETS, price_symbol
+from core.klines import to_epoch_ms, from_epoch_ms
+from core import portfolio_summary
+from core.performance_tracker import PerformanceTracker
+from db.models import db, Snapshot, CashFlow, LedgerEvent, SyncCursor
+from utils.clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+TRADES_PER_REQUEST = 1000
+HISTORY_WINDOW = timedelta(days=90)  # Binance deposit/withdraw history max range
+HISTORY_PER_REQUEST = 1000  # Binance deposit/withdraw history max rows per call
+DEPOSIT_CREDITED = (1, 6)      # Success, credited but locked
+DEPOSIT_PENDING = (0, 8)       # Pending, waiting user confirmation
+WITHDRAW_COMPLETED = 6
+WITHDRAW_PENDING = (0, 2, 4)   # Email sent, awaiting approval, processing
+
+
+class BinanceHistorySource:
+    """Account history from the Binance REST API"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def exchange_info(self):
+        return self.client.get_exchange_info()
+
+    def account(self):
+        return self.client.get_account()
+
+    def trades(self, symbol, from_id):
+        return self.client.get_my_trades(symbol=symbol, fromId=from_id, limit=TRADES_PER_REQUEST)
+
+    def deposits(self, start_ms, end_ms):
+        return self.client.get_deposit_history(startTime=start_ms, endTime=end_ms, limit=HISTORY_PER_REQUEST)
+
+    def withdrawals(self, start_ms, end_ms):
+        return self.client.get_withdraw_history(startTime=start_ms, endTime=end_ms, limit=HISTORY_PER_REQUEST)
+
+
+class RecordedHistorySource:
+    """
+    Recorded Binance responses (same contract as BinanceHistorySource)
+    Directory layout: exchange_info.json, account.json, trades.json
+    ({symbol: [trades]}), deposits.json, withdrawals.json
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _load(self, name, default):
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return default
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def exchange_info(self):
+        return self._load('exchange_info.json', {'symbols': []})
+
+    def account(self):
+        return self._load('account.json', {'balances': []})
+
+    def trades(self, symbol, from_id):
+        trades = [t for t in self._load('trades.json', {}).get(symbol, []) if t['id'] >= from_id]
+        return sorted(trades, key=lambda t: t['id'])[:TRADES_PER_REQUEST]
+
+    def deposits(self, start_ms, end_ms):
+        rows = [d for d in self._load('deposits.json', []) if start_ms <= d['insertTime'] <= end_ms]
+        return sorted(rows, key=lambda d: d['insertTime'], reverse=True)[:HISTORY_PER_REQUEST]
+
+    def withdrawals(self, start_ms, end_ms):
+        rows = [w for w in self._load('withdrawals.json', []) if start_ms <= withdraw_time_ms(w) <= end_ms]
+        return sorted(rows, key=withdraw_time_ms, reverse=True)[:HISTORY_PER_REQUEST]
+
+
+def fetch_history_window(fetch, start_ms, end_ms):
+    """
+    All rows of [start_ms, end_ms] from a deposit/withdraw history call
+
+    Binance returns at most HISTORY_PER_REQUEST rows (the newest) without any
+    paging token, so a full page means rows may be missing: the window is
+    split in two and each half fetched again.
+
+    Args:
+        fetch: Callable(start_ms, end_ms) -> rows (bounds inclusive)
+    """
+    rows = fetch(start_ms, end_ms)
+    if len(rows) < HISTORY_PER_REQUEST:
+        return rows
+    if end_ms <= start_ms:
+        logger.warning(f"⚠️  {len(rows)} history rows at {start_ms} ms, some may be missing")
+        return rows
+    middle = (start_ms + end_ms) // 2
+    return fetch_history_window(fetch, start_ms, middle) + fetch_history_window(fetch, middle + 1, end_ms)
+
+
+def withdraw_time_ms(withdrawal):
+    """Binance returns applyTime as 'YYYY-MM-DD HH:MM:SS' (UTC)"""
+    return to_epoch_ms(datetime.strptime(withdrawal['applyTime'], '%Y-%m-%d %H:%M:%S'))
+
+
+def deposit_events(rows):
+    """Successful deposits -> ledger event dicts (event_id doubles as cash flow tx_id)"""
+    return [
+        {
+            'event_id': f"deposit:{d.get('id') or d['txId']}",
+            'time_ms': d['insertTime'],
+            'source': 'DEPOSIT',
+            'asset': d['coin'],
+            'delta': float(d['amount'])
+        }
+        for d in rows if d.get('status') in DEPOSIT_CREDITED
+    ]
+
+
+def withdraw_events(rows):
+    """Completed withdrawals -> ledger event dicts (amount + network fee leave the account)"""
+    return [
+        {
+            'event_id': f"withdraw:{w['id']}",
+            'time_ms': withdraw_time_ms(w),
+            'source': 'WITHDRAW',
+            'asset': w['coin'],
+            'delta': -(float(w['amount']) + float(w.get('transactionFee', 0)))
+        }
+        for w in rows if w.get('status') == WITHDRAW_COMPLETED
+    ]
+
+
+class HistoryReconstructor:
+    """Resumable fetch → replay → value pipeline"""
+
+    def __init__(self, source, kline_source, interval=3600, chunk_size=500, now=None):
+        """
+        Args:
+            source: BinanceHistorySource or RecordedHistorySource
+            kline_source: Object with get_prices(symbol, start, end, interval_seconds)
+            interval: Snapshot interval in seconds (bucket size)
+            chunk_size: Buckets valued and inserted per transaction
+            now: Upper bound of the reconstruction (default: get_clock().now())
+        """
+        self.source = source
+        self.kline_source = kline_source
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.now = now or get_clock().now()
+        self._symbol_assets = None
+        self._last_prices = {}  # {asset: price} of the latest kline seen, for gaps
+
+    # ------------------------------------------------------------------
+    # Step 1: incremental fetch into ledger_events
+    # ------------------------------------------------------------------
+
+    @property
+    def symbol_assets(self):
+        """{symbol: (base, quote)} for every listed pair (including delisted)"""
+        if self._symbol_assets is None:
+            self._symbol_assets = {
+                s['symbol']: (s['baseAsset'], s['quoteAsset'])
+                for s in self.source.exchange_info()['symbols']
+            }
+        return self._symbol_assets
+
+    def default_symbols(self):
+        """Pairs likely traded: held or deposited assets against the usual quotes"""
+        assets = {
+            b['asset'] for b in self.source.account()['balances']
+            if float(b['free']) + float(b['locked']) > 0
+        }
+        assets |= {
+            asset for (asset,) in db.session.query(LedgerEvent.asset)
+            .filter(LedgerEvent.source == 'DEPOSIT').distinct()
+        }
+        quotes = QUOTE_ASSETS + ['BTC', 'ETH', 'BNB']
+        return sorted(
+            f"{asset}{quote}" for asset in assets for quote in quotes
+            if asset != quote and f"{asset}{quote}" in self.symbol_assets
+        )
+
+    def _insert_events(self, events):
+        """Insert ledger events, ignoring already known event ids"""
+        if events:
+            db.session.execute(insert(LedgerEvent).prefix_with('OR IGNORE'), events)
+        return len(events)
+
+    def _fetch_windows(self, cursor_name, since, fetch, to_events):
+        """Walk [cursor or since, now] in HISTORY_WINDOW slices, one commit per slice"""
+        start_ms = SyncCursor.get(cursor_name, to_epoch_ms(since))
+        now_ms = to_epoch_ms(self.now)
+        count = 0
+
+        while start_ms < now_ms:
+            end_ms = min(start_ms + int(HISTORY_WINDOW.total_seconds() * 1000), now_ms)
+            count += self._insert_events(to_events(fetch_history_window(fetch, start_ms, end_ms)))
+            SyncCursor.set(cursor_name, end_ms)
+            db.session.commit()
+            start_ms = end_ms
+
+        return count
+
+    def fetch_deposits(self, since):
+        return self._fetch_windows('history:deposits', since, self.source.deposits, deposit_events)
+
+    def fetch_withdrawals(self, since):
+        return self._fetch_windows('history:withdrawals', since, self.source.withdrawals, withdraw_events)
+
+    def fetch_trades(self, symbol):
+        """Page through one symbol's trades from the stored trade id"""
+        base, quote = self.symbol_assets[symbol]
+        cursor_name = f"history:trades:{symbol}"
+        from_id = SyncCursor.get(cursor_name, 0)
+        count = 0
+
+        while True:
+            trades = self.source.trades(symbol, from_id)
+            if not trades:
+                break
+
+            events = []
+            for t in trades:
+                sign = 1 if t['isBuyer'] else -1
+                prefix = f"trade:{symbol}:{t['id']}"
+                events.append({'event_id': f"{prefix}:base", 'time_ms': t['time'], 'source': 'TRADE',
+                               'asset': base, 'delta': sign * float(t['qty'])})
+                events.append({'event_id': f"{prefix}:quote", 'time_ms': t['time'], 'source': 'TRADE',
+                               'asset': quote, 'delta': -sign * float(t['quoteQty'])})
+                if float(t.get('commission', 0)):
+                    events.append({'event_id': f"{prefix}:fee", 'time_ms': t['time'], 'source': 'TRADE',
+                                   'asset': t['commissionAsset'], 'delta': -float(t['commission'])})
+
+            count += self._insert_events(events)
+            from_id = trades[-1]['id'] + 1
+            SyncCursor.set(cursor_name, from_id)
+            db.session.commit()
+
+            if len(trades) < TRADES_PER_REQUEST:
+                break
+
+        return count
+
+    def fetch_events(self, since, symbols=None):
+        """
+        Step 1 - pull history into ledger_events
+
+        Args:
+            since: Datetime where history starts (used on the first run only)
+            symbols: Trading pairs to pull trades for (default: default_symbols())
+
+        Returns:
+            int: Number of events fetched
+        """
+        count = self.fetch_deposits(since) + self.fetch_withdrawals(since)
+        for symbol in symbols or self.default_symbols():
+            if symbol in self.symbol_assets:
+                count += self.fetch_trades(symbol)
+        logger.info(f"📥 Fetched {count} ledger events")
+        return count
+
+    # ------------------------------------------------------------------
+    # Step 2: replay ledger events into holdings per bucket
+    # ------------------------------------------------------------------
+
+    def _iter_events(self, page_size=5000):
+        """Ledger events ordered by time, paged so commits can happen in between"""
+        last = (-1, -1)
+        while True:
+            page = db.session.query(
+                LedgerEvent.id, LedgerEvent.time_ms, LedgerEvent.source,
+                LedgerEvent.asset, LedgerEvent.delta, LedgerEvent.event_id
+            ).filter(
+                (LedgerEvent.time_ms > last[0]) |
+                ((LedgerEvent.time_ms == last[0]) & (LedgerEvent.id > last[1]))
+            ).order_by(LedgerEvent.time_ms, LedgerEvent.id).limit(page_size).all()
+
+            if not page:
+                return
+            yield from page
+            last = (page[-1].time_ms, page[-1].id)
+
+    def replay(self, start, end):
+        """
+        Step 2 - holdings at every bucket in [start, end]
+        (the `end` bucket only carries the last cash flows, it is not snapshotted)
+
+        Yields:
+            (bucket datetime, {asset: quantity}, [cash flow events since previous bucket])
+        """
+        events = self._iter_events()
+        pending = next(events, None)
+        holdings = {}
+        bucket = start
+
+        while bucket <= end:
+            bucket_ms = to_epoch_ms(bucket)
+            flows = []
+            while pending is not None and pending.time_ms < bucket_ms:
+                holdings[pending.asset] = holdings.get(pending.asset, 0.0) + pending.delta
+                if pending.source in ('DEPOSIT', 'WITHDRAW'):
+                    flows.append(pending)
+                pending = next(events, None)
+
+            yield bucket, {a: q for a, q in holdings.items() if q > 1e-12}, flows
+            bucket += timedelta(seconds=self.interval)
+
+    # ------------------------------------------------------------------
+    # Step 3: value the timeline and bulk-insert
+    # ------------------------------------------------------------------
+
+    def _floor(self, dt):
+        """Start of the bucket containing dt"""
+        ms = to_epoch_ms(dt)
+        return from_epoch_ms(ms - ms % (self.interval * 1000))
+
+    def _bounds(self):
+        """
+        [start, end) of the reconstruction, fixed on the first run:
+        from the first ledger event to the first live snapshot (or now)
+        """
+        start_ms = SyncCursor.get('history:start')
+        end_ms = SyncCursor.get('history:end')
+
+        if start_ms is None or end_ms is None:
+            first_event = db.session.query(db.func.min(LedgerEvent.time_ms)).scalar()
+            if first_event is None:
+                return None, None
+
+            start = self._floor(from_epoch_ms(first_event)) + timedelta(seconds=self.interval)
+
+            first_snapshot = Snapshot.query.order_by(Snapshot.timestamp.asc()).first()
+            end = PerformanceTracker.timestamp_to_datetime(first_snapshot.timestamp) \
+                if first_snapshot else self._floor(self.now)
+
+            start_ms, end_ms = to_epoch_ms(start), to_epoch_ms(end)
+            SyncCursor.set('history:start', start_ms)
+            SyncCursor.set('history:end', end_ms)
+            db.session.commit()
+
+        return from_epoch_ms(start_ms), from_epoch_ms(end_ms)
+
+    def _chunk_prices(self, chunk):
+        """Bulk-fetch one kline series per non-stable asset held in the chunk"""
+        assets = {a for _, holdings, flows in chunk for a in holdings}
+        assets |= {f.asset for _, _, flows in chunk for f in flows}
+        start = chunk[0][0] - timedelta(seconds=self.interval)
+        end = chunk[-1][0]
+
+        prices = {}
+        for asset in assets - set(STABLECOINS):
+            symbol = price_symbol(asset, self.symbol_assets)
+            if symbol:
+                prices[asset] = self.kline_source.get_prices(symbol, start, end, self.interval)
+        return prices
+
+    def _price(self, prices, asset, at):
+        """
+        USD price of an asset at a bucket datetime (buckets are priced in order)
+
+        Returns:
+            The kline price, else the last one seen for the asset (None if
+            none yet); 0.0 for an asset without a USD route, like value_balances
+        """
+        if asset in STABLECOINS:
+            return 1.0
+        series = prices.get(asset)
+        if series is None:
+            return 0.0
+        price = series.get(at)
+        if price is None:
+            return self._last_prices.get(asset)
+        self._last_prices[asset] = price
+        return price
+
+    def _write_chunk(self, chunk, end):
+        """Value a chunk of buckets and insert snapshots + cash flows in one transaction"""
+        prices = self._chunk_prices(chunk)
+        snapshots = []
+        cash_flows = []
+
+        for bucket, holdings, flows in chunk:
+            # Flows happened during the previous bucket: value them at its open
+            flow_bucket = bucket - timedelta(seconds=self.interval)
+            for flow in flows:
+                price = self._price(prices, flow.asset, flow_bucket)
+                if not price:
+                    logger.warning(f"⚠️  No price for {flow.asset} at {flow_bucket}, skipping {flow.event_id}")
+                    continue
+                cash_flows.append({
+                    'timestamp': PerformanceTracker.datetime_to_timestamp(from_epoch_ms(flow.time_ms)),
+                    'amount_usd': round(flow.delta * price, 2),
+                    'type': flow.source,
+                    'tx_id': flow.event_id
+                })
+
+            # The `end` bucket belongs to live history: only its cash flows are kept
+            if bucket < end:
+                held = {asset: self._price(prices, asset, bucket) for asset in holdings}
+                unpriced = sorted(asset for asset, price in held.items() if price is None)
+                if unpriced:
+                    # A partial total would show a drawdown that reverses on the next bucket
+                    logger.warning(f"⚠️  No price yet for {', '.join(unpriced)} at {bucket}, bucket skipped")
+                    continue
+                total = sum(quantity * held[asset] for asset, quantity in holdings.items())
+                if total > 0:
+                    snapshots.append({
+                        'timestamp': PerformanceTracker.datetime_to_timestamp(bucket),
+                        'total_value_usd': int(total)
+                    })
+
+        if snapshots:
+            db.session.execute(insert(Snapshot), snapshots)
+        if cash_flows:
+            db.session.execute(insert(CashFlow).prefix_with('OR IGNORE'), cash_flows)
+        if snapshots or cash_flows:
+            portfolio_summary.rebuild()  # OR IGNORE: inserted count unknown
+
+        SyncCursor.set('history:bucket', to_epoch_ms(chunk[-1][0]))
+        db.session.commit()
+        return len(snapshots)
+
+    def build_snapshots(self):
+        """
+        Steps 2+3 - replay, value and insert chunk by chunk (resumable)
+
+        Returns:
+            int: Number of snapshots inserted
+        """
+        start, end = self._bounds()
+        if start is None:
+            logger.warning("No ledger events, nothing to reconstruct")
+            return 0
+
+        done_ms = SyncCursor.get('history:bucket', -1)
+        inserted = 0
+        chunk = []
+
+        for bucket, holdings, flows in self.replay(start, end):
+            if to_epoch_ms(bucket) <= done_ms:
+                continue  # Already written by a previous run
+            chunk.append((bucket, holdings, flows))
+            if len(chunk) >= self.chunk_size:
+                inserted += self._write_chunk(chunk, end)
+                chunk = []
+
+        if chunk:
+            inserted += self._write_chunk(chunk, end)
+
+        logger.info(f"🧱 Reconstructed {inserted} snapshots ({start} → {end})")
+        return inserted
+
+    def run(self, since, symbols=None):
+        """
+        Full pipeline, then one pass to recompute the stored TWR/P&L columns
+
+        Returns:
+            dict: {'events': int, 'snapshots': int}
+        """
+        events = self.fetch_events(since, symbols)
+        snapshots = self.build_snapshots()
+        if snapshots:
+            PerformanceTracker(None).recompute_snapshot_metrics()
+        return {'events': events, 'snapshots': snapshots}
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Kline Sources - Historical prices used to value past holdings
+BinanceKlineSource fetches candles in batches, OfflineKlineSource serves
+recorded prices (fixtures, simulations) with the same interface.
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Binance kline intervals, in seconds
+KLINE_INTERVALS = {
+    60: '1m', 180: '3m', 300: '5m', 900: '15m', 1800: '30m',
+    3600: '1h', 7200: '2h', 14400: '4h', 21600: '6h', 28800: '8h',
+    43200: '12h', 86400: '1d'
+}
+
+KLINES_PER_REQUEST = 1000  # Binance maximum
+
+
+def kline_interval_for(seconds):
+    """
+    Largest kline interval whose candles open on every multiple of `seconds`
+
+    Returns:
+        (interval_seconds, interval_name)
+    """
+    for candidate in sorted(KLINE_INTERVALS, reverse=True):
+        if candidate <= seconds and seconds % candidate == 0:
+            return candidate, KLINE_INTERVALS[candidate]
+    return 60, '1m'
+
+
+def to_epoch_ms(dt):
+    """Naive UTC datetime -> epoch milliseconds"""
+    return int((dt - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def from_epoch_ms(ms):
+    """Epoch milliseconds -> naive UTC datetime"""
+    return datetime(1970, 1, 1) + timedelta(milliseconds=ms)
+
+
+class BinanceKlineSource:
+    """Open prices from the Binance klines endpoint"""
+
+    def __init__(self, client):
+        """
+        Args:
+            client: python-binance Client (BinanceTrader.client)
+        """
+        self.client = client
+
+    def get_prices(self, symbol, start, end, interval_seconds):
+        """
+        Open price of every candle in [start, end]
+
+        Args:
+            symbol: Trading pair (e.g. 'BTCUSDT')
+            start, end: Naive UTC datetimes
+            interval_seconds: Candle size (see kline_interval_for)
+
+        Returns:
+            {datetime: float} keyed by candle open time
+        """
+        interval_seconds, interval_name = kline_interval_for(interval_seconds)
+        prices = {}
+        start_ms, end_ms = to_epoch_ms(start), to_epoch_ms(end)
+
+        while start_ms <= end_ms:
+            klines = self.client.get_klines(
+                symbol=symbol,
+                interval=interval_name,
+                startTime=start_ms,
+                endTime=end_ms,
+                limit=KLINES_PER_REQUEST
+            )
+            if not klines:
+                break
+
+            for kline in klines:
+                prices[from_epoch_ms(kline[0])] = float(kline[1])
+
+            start_ms = klines[-1][0] + interval_seconds * 1000
+            if len(klines) < KLINES_PER_REQUEST:
+                break
+
+        return prices
+
+
+class OfflineKlineSource:
+    """Recorded prices: {symbol: {datetime: price}}"""
+
+    def __init__(self, prices):
+        self.prices = prices
+
+    @classmethod
+    def from_json(cls, path):
+        """
+        Load recorded klines: {"BTCUSDT": [[open_time_ms, "open", ...], ...]}
+        (the raw Binance klines payload per symbol)
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+        return cls({
+            symbol: {from_epoch_ms(k[0]): float(k[1]) for k in klines}
+            for symbol, klines in raw.items()
+        })
+
+    def get_prices(self, symbol, start, end, interval_seconds):
+        """Same contract as BinanceKlineSource.get_prices"""
+        return {
+            dt: price
+            for dt, price in self.prices.get(symbol, {}).items()
+            if start <= dt <= end
+        }
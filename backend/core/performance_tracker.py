@@ -4,14 +4,34 @@
 Performance Tracker - TWR (Time-Weighted Return) calculations
 Adapted to use SQLAlchemy models instead of JSON files
 PRESERVED: Original TWR calculation logic
+Reads go through the in-memory SnapshotStore (core/snapshot_store.py)
 """
 
+import functools
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
 from db.models import db, Snapshot, CashFlow
+from core import portfolio_summary, snapshot_store
+from core.snapshot_store import get_snapshot_store
+from utils.clock import get_clock
+from utils import timestamps
+from utils.metrics import METRIC_COMPUTE, horizon_label
 
 logger = logging.getLogger(__name__)
 
+
+def timed_metric(metric):
+    """Record the decorated method's duration in METRIC_COMPUTE, labelled by horizon (days)"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            days = args[0] if args else kwargs.get('days')
+            with METRIC_COMPUTE.time(metric=metric, horizon=horizon_label(days)):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 class PerformanceTracker:
     """
     Performance tracker with TWR calculations
@@ -23,39 +43,40 @@ class PerformanceTracker:
 
     @staticmethod
     def timestamp_to_datetime(timestamp_int):
-        """Convertit un timestamp INTEGER (YYYYMMDDHHMM) en datetime"""
-        if isinstance(timestamp_int, datetime):
-            return timestamp_int
-        timestamp_str = str(timestamp_int)
-        return datetime.strptime(timestamp_str, '%Y%m%d%H%M')
+        """Convertit un timestamp INTEGER (secondes epoch UTC) en datetime"""
+        return timestamps.decode(timestamp_int)
 
     @staticmethod
     def datetime_to_timestamp(dt):
-        """Convertit un datetime en timestamp INTEGER (YYYYMMDDHHMM)"""
-        if isinstance(dt, int):
-            return dt
-        return int(dt.strftime('%Y%m%d%H%M'))
+        """Convertit un datetime en timestamp INTEGER (secondes epoch UTC)"""
+        return timestamps.encode(dt)
 
-    def save_current_snapshot(self, balances=None):
+    def save_current_snapshot(self, balances=None, timestamp=None):
         """
         Save a snapshot of the current portfolio
-        Called by auto-refresh service every 30 minutes
+        Called by auto-refresh service every hour (and when backfilling missed hours)
         Automatically calculates and stores TWR/P&L metrics from inception
 
         Args:
             balances: Dict of balances from last_balance table (required)
+            timestamp: Snapshot datetime (default: now), e.g. the aligned hour boundary.
+                       An explicit timestamp only has to follow the last snapshot: the
+                       5-minute guard would drop a boundary right after a manual snapshot
         """
         try:
             if balances is None:
                 logger.error("balances parameter is required")
                 return False
 
+            snapshot_dt = timestamp or get_clock().now()
+
             # Protection: avoid creating snapshots too close together (5 min minimum)
-            last_snapshot = Snapshot.query.order_by(Snapshot.timestamp.desc()).first()
-            if last_snapshot:
-                last_dt = self.timestamp_to_datetime(last_snapshot.timestamp)
-                time_since_last = (datetime.utcnow() - last_dt).total_seconds()
-                if time_since_last < 300:  # Less than 5 minutes (300 seconds)
+            snapshots, _ = get_snapshot_store().sync()
+            if snapshots:
+                last_dt = self.timestamp_to_datetime(snapshots['timestamp'][len(snapshots) - 1])
+                time_since_last = (snapshot_dt - last_dt).total_seconds()
+                min_gap = 300 if timestamp is None else 1  # 5 minutes, unless stamped on a boundary
+                if time_since_last < min_gap:
                     logger.debug(f"Snapshot skipped: last snapshot was {time_since_last:.0f}s ago")
                     return False
 
@@ -68,8 +89,8 @@ class PerformanceTracker:
             twr_metrics = self.calculate_performance_metrics(days=0)  # 0 = total
             pnl_metrics = self.calculate_simple_pnl(days=None)  # None = total
 
-            # Create snapshot with INTEGER timestamp format YYYYMMDDHHmm
-            timestamp_int = int(datetime.utcnow().strftime('%Y%m%d%H%M'))
+            # Create snapshot with INTEGER timestamp (epoch seconds)
+            timestamp_int = self.datetime_to_timestamp(snapshot_dt)
 
             snapshot = Snapshot(
                 timestamp=timestamp_int,
@@ -80,9 +101,14 @@ class PerformanceTracker:
             )
 
             db.session.add(snapshot)
+            db.session.flush()
+            portfolio_summary.record(snapshots=[snapshot])
             db.session.commit()
+            get_snapshot_store().add(snapshot)
 
-            logger.info(f"Snapshot saved: ${snapshot.total_value_usd} | TWR: {snapshot.twr:+.2f}% | P&L: ${snapshot.pnl:+d}")
+            twr_label = f"{snapshot.twr:+.2f}%" if snapshot.twr is not None else "n/a"
+            pnl_label = f"${snapshot.pnl:+d}" if snapshot.pnl is not None else "n/a"
+            logger.info(f"Snapshot saved: ${snapshot.total_value_usd} | TWR: {twr_label} | P&L: {pnl_label}")
             return True
 
         except Exception as e:
@@ -90,11 +116,164 @@ class PerformanceTracker:
             db.session.rollback()
             return False
 
+    def recompute_snapshot_metrics(self, since=None, batch_size=1000):
+        """
+        Recompute the stored TWR/P&L columns of snapshots in a single pass
+        Used after history is inserted out of band (reconstruction, imports).
+        Matches save_current_snapshot: each snapshot stores the metrics from
+        inception up to the previous snapshot, with the same period rules as
+        calculate_twr (a cash flow belongs to the period starting at or before it).
+
+        Args:
+            since: Datetime - only snapshots at/after it are read from the
+                   database and rewritten; the running state before it is
+                   replayed from the in-memory snapshot store (since=None
+                   recomputes everything from inception)
+            batch_size: Snapshots read/updated per batch
+
+        Returns:
+            int: Number of snapshots updated
+        """
+        since_ts = self.datetime_to_timestamp(since) if since else None
+
+        first = None           # (timestamp, value) of the first snapshot
+        previous = None        # (timestamp, value) of the previous snapshot
+        cumulative_return = 1.0
+        periods = 0
+        period_cf = 0          # Cash flows in [previous, current)
+        net_cash_flow = 0      # Cash flows in [first, previous]
+        updated = 0
+        last_key = None
+
+        seed = self._seed_running_state(since_ts) if since_ts is not None else None
+        if seed:
+            first, previous, cumulative_return, periods, net_cash_flow, previous_id = seed
+            last_key = (previous[0], previous_id)
+
+        # Cash flows before the resume point were folded into the seed
+        query = db.session.query(CashFlow.timestamp, CashFlow.amount_usd)
+        if previous is not None:
+            query = query.filter(CashFlow.timestamp >= previous[0])
+        cash_flows = query.order_by(CashFlow.timestamp).all()
+        period_ptr = 0
+        pnl_ptr = 0
+        if previous is not None:
+            # Flows at the previous snapshot open its period but were already in its P&L
+            while pnl_ptr < len(cash_flows) and cash_flows[pnl_ptr][0] <= previous[0]:
+                pnl_ptr += 1
+
+        while True:
+            query = db.session.query(Snapshot.id, Snapshot.timestamp, Snapshot.total_value_usd)
+            if last_key:
+                query = query.filter(
+                    (Snapshot.timestamp > last_key[0]) |
+                    ((Snapshot.timestamp == last_key[0]) & (Snapshot.id > last_key[1]))
+                )
+            batch = query.order_by(Snapshot.timestamp, Snapshot.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            mappings = []
+            for snapshot_id, timestamp, value in batch:
+                if first is None:
+                    first = (timestamp, value)
+                    # Cash flows before the first snapshot are outside every period
+                    while period_ptr < len(cash_flows) and cash_flows[period_ptr][0] < timestamp:
+                        period_ptr += 1
+                    pnl_ptr = period_ptr
+                    twr, pnl, pnl_percent = None, 0, 0.0
+                else:
+                    # Close the period [previous, current) for TWR
+                    while period_ptr < len(cash_flows) and cash_flows[period_ptr][0] < timestamp:
+                        period_cf += cash_flows[period_ptr][1]
+                        period_ptr += 1
+
+                    # Metrics as seen before this snapshot existed
+                    twr = round((cumulative_return - 1) * 100, 2) if periods > 0 else None
+                    pnl_usd = (previous[1] - first[1]) - net_cash_flow
+                    invested_capital = first[1] + net_cash_flow
+                    pnl = int(pnl_usd)
+                    pnl_percent = round(pnl_usd / invested_capital * 100, 2) if invested_capital > 0 else 0.0
+
+                    adjusted_start = previous[1] + period_cf
+                    if adjusted_start > 0:
+                        cumulative_return *= 1 + (value - adjusted_start) / adjusted_start
+                    periods += 1
+                    period_cf = 0
+
+                # Net cash flow in [first, current] for the next snapshot's P&L
+                while pnl_ptr < len(cash_flows) and cash_flows[pnl_ptr][0] <= timestamp:
+                    net_cash_flow += cash_flows[pnl_ptr][1]
+                    pnl_ptr += 1
+
+                previous = (timestamp, value)
+
+                if since_ts is None or timestamp >= since_ts:
+                    mappings.append({
+                        'id': snapshot_id,
+                        'twr': twr,
+                        'pnl': pnl,
+                        'pnl_percent': pnl_percent
+                    })
+
+            if mappings:
+                db.session.bulk_update_mappings(Snapshot, mappings)
+                updated += len(mappings)
+
+            last_key = (batch[-1][1], batch[-1][0])
+
+        if updated:
+            snapshot_store.invalidate()
+        db.session.commit()
+        logger.info(f"♻️  Recomputed TWR/P&L for {updated} snapshots")
+        return updated
+
+    def _seed_running_state(self, since_ts):
+        """
+        Running state of recompute_snapshot_metrics just before the last snapshot
+        preceding since_ts, replayed from the snapshot store columns with the
+        same arithmetic as the main loop (the stored TWR is rounded, seeding
+        from it would compound the rounding on every call)
+
+        Returns:
+            (first, previous, cumulative_return, periods, net_cash_flow, previous_id),
+            or None when fewer than two snapshots precede since_ts
+        """
+        snapshots, cash_flows = get_snapshot_store().sync()
+        _, anchor = snapshots.span(None, since_ts - 1)
+        if anchor < 2:
+            return None
+        previous = anchor - 2  # The main loop resumes with the snapshot after it
+        snapshot_ts, values = snapshots['timestamp'], snapshots['total_value_usd']
+        cf_ts, amounts = cash_flows['timestamp'], cash_flows['amount_usd']
+
+        # Cash flows before the first snapshot are outside every period
+        cf_lo, cf_hi = cash_flows.span(snapshot_ts[0], None)
+        cumulative_return = 1.0
+        cf_ptr = cf_lo
+        for i in range(1, previous + 1):
+            period_cf = 0
+            while cf_ptr < cf_hi and cf_ts[cf_ptr] < snapshot_ts[i]:
+                period_cf += amounts[cf_ptr]
+                cf_ptr += 1
+            adjusted_start = values[i - 1] + period_cf
+            if adjusted_start > 0:
+                cumulative_return *= 1 + (values[i] - adjusted_start) / adjusted_start
+
+        net_cash_flow = 0
+        for j in range(cf_lo, cf_hi):
+            if cf_ts[j] > snapshot_ts[previous]:
+                break
+            net_cash_flow += amounts[j]
+
+        return ((snapshot_ts[0], values[0]), (snapshot_ts[previous], values[previous]),
+                cumulative_return, previous, net_cash_flow, snapshots['id'][previous])
+
     def get_tracking_stats(self):
-        """Get tracking statistics (days, snapshot count, etc.)"""
+        """Get tracking statistics (days, snapshot count, etc.) from the summary row"""
         try:
-            snapshots = Snapshot.query.order_by(Snapshot.timestamp).all()
-            if not snapshots:
+            summary = portfolio_summary.get_summary()
+            if not summary['snapshot_count']:
                 return {
                     'days': 0,
                     'first_snapshot': None,
@@ -103,15 +282,15 @@ class PerformanceTracker:
                 }
 
             # Convertir les timestamps INTEGER en datetime
-            first_dt = self.timestamp_to_datetime(snapshots[0].timestamp)
-            last_dt = self.timestamp_to_datetime(snapshots[-1].timestamp)
+            first_dt = self.timestamp_to_datetime(summary['first_snapshot_ts'])
+            last_dt = self.timestamp_to_datetime(summary['last_snapshot_ts'])
             days_tracking = (last_dt - first_dt).days
 
             return {
                 'days': days_tracking,
                 'first_snapshot': first_dt,
                 'last_snapshot': last_dt,
-                'total_snapshots': len(snapshots)
+                'total_snapshots': summary['snapshot_count']
             }
 
         except Exception as e:
@@ -133,84 +312,42 @@ class PerformanceTracker:
             start_ts = self.datetime_to_timestamp(start_date)
             end_ts = self.datetime_to_timestamp(end_date)
 
-            # Get snapshots and cash flows for the period
-            snapshots_query = Snapshot.query.filter(
-                Snapshot.timestamp >= start_ts,
-                Snapshot.timestamp <= end_ts
-            ).order_by(Snapshot.timestamp).all()
-
-            cash_flows_query = CashFlow.query.filter(
-                CashFlow.timestamp >= start_ts,
-                CashFlow.timestamp <= end_ts
-            ).order_by(CashFlow.timestamp).all()
-
-            # Convert to dict format (matching original interface)
-            snapshots = [
-                {
-                    'timestamp': self.timestamp_to_datetime(s.timestamp),
-                    'total_value': s.total_value_usd
-                }
-                for s in snapshots_query
-            ]
-
-            cash_flows = [
-                {
-                    'timestamp': self.timestamp_to_datetime(cf.timestamp),
-                    'amount': cf.amount_usd,
-                    'type': cf.type
-                }
-                for cf in cash_flows_query
-            ]
+            # Snapshots and cash flows of the period (bisection over the store columns)
+            snapshots, cash_flows = get_snapshot_store().sync()
+            lo, hi = snapshots.span(start_ts, end_ts)
+            cf_lo, cf_hi = cash_flows.span(start_ts, end_ts)
 
-            if len(snapshots) < 2:
+            if hi - lo < 2:
                 return None
 
-            # Create periods based on cash flows
-            periods = []
-            period_start = snapshots[0]
-
-            # Sort all events by timestamp
-            all_events = []
-            for snapshot in snapshots[1:]:
-                all_events.append(('snapshot', snapshot))
-            for cf in cash_flows:
-                all_events.append(('cash_flow', cf))
-
-            all_events.sort(key=lambda x: x[1]['timestamp'])
-
-            # Create periods
-            current_start = period_start
-            cumulative_cf = 0
-
-            for event_type, event_data in all_events:
-                if event_type == 'cash_flow':
-                    cumulative_cf += event_data['amount']
-                elif event_type == 'snapshot':
-                    # End of period
-                    periods.append({
-                        'start_value': current_start['total_value'],
-                        'end_value': event_data['total_value'],
-                        'cash_flow': cumulative_cf,
-                        'start_time': current_start['timestamp'],
-                        'end_time': event_data['timestamp']
-                    })
-                    # New period
-                    current_start = event_data
-                    cumulative_cf = 0
+            snapshot_ts, values = snapshots['timestamp'], snapshots['total_value_usd']
+            cf_ts, amounts = cash_flows['timestamp'], cash_flows['amount_usd']
 
-            # Calculate TWR
+            # One period per pair of consecutive snapshots. A cash flow belongs
+            # to the period it falls in; one at the exact time of a snapshot
+            # belongs to the period starting with that snapshot.
             cumulative_return = 1.0
-            for period in periods:
+            start_value = values[lo]
+            cf_ptr = cf_lo
+
+            for i in range(lo + 1, hi):
+                cumulative_cf = 0
+                while cf_ptr < cf_hi and cf_ts[cf_ptr] < snapshot_ts[i]:
+                    cumulative_cf += amounts[cf_ptr]
+                    cf_ptr += 1
+
                 # Adjusted value after cash flow (at beginning of period)
-                adjusted_start = period['start_value'] + period['cash_flow']
+                adjusted_start = start_value + cumulative_cf
 
                 # Skip if adjusted start is negative or zero (withdrawal of entire portfolio)
                 if adjusted_start > 0:
                     # TWR formula: (End Value - Adjusted Start) / Adjusted Start
                     # = (End - (Start + CF)) / (Start + CF)
-                    period_return = (period['end_value'] - adjusted_start) / adjusted_start
+                    period_return = (values[i] - adjusted_start) / adjusted_start
                     cumulative_return *= (1 + period_return)
 
+                start_value = values[i]
+
             twr = cumulative_return - 1
             return twr
 
@@ -218,6 +355,7 @@ class PerformanceTracker:
             logger.error(f"Error calculating TWR: {e}")
             return None
 
+    @timed_metric('twr')
     def calculate_performance_metrics(self, days):
         """
         Calculate all performance metrics for a period
@@ -226,18 +364,17 @@ class PerformanceTracker:
         """
         try:
             # Get first and last snapshots
-            first_snapshot = Snapshot.query.order_by(Snapshot.timestamp.asc()).first()
-            last_snapshot = Snapshot.query.order_by(Snapshot.timestamp.desc()).first()
-
-            if not first_snapshot or not last_snapshot:
+            snapshots, _ = get_snapshot_store().sync()
+            if not snapshots:
                 return None
+            first, last = 0, len(snapshots) - 1
 
             # Convertir les timestamps en datetime
-            end_date = self.timestamp_to_datetime(last_snapshot.timestamp)
+            end_date = self.timestamp_to_datetime(snapshots['timestamp'][last])
 
             # Special case: days=0 means from the beginning
             if days == 0:
-                start_date = self.timestamp_to_datetime(first_snapshot.timestamp)
+                start_date = self.timestamp_to_datetime(snapshots['timestamp'][first])
                 actual_days = (end_date - start_date).days
                 if actual_days == 0:
                     actual_days = 1  # Avoid division by zero
@@ -263,14 +400,15 @@ class PerformanceTracker:
                 'twr_annualized': twr_annualized,
                 'start_date': start_date,
                 'end_date': end_date,
-                'start_value': first_snapshot.total_value_usd if days == 0 else None,
-                'end_value': last_snapshot.total_value_usd
+                'start_value': snapshots['total_value_usd'][first] if days == 0 else None,
+                'end_value': snapshots['total_value_usd'][last]
             }
 
         except Exception as e:
             logger.error(f"Error calculating metrics for {days}d: {e}")
             return None
 
+    @timed_metric('pnl')
     def calculate_simple_pnl(self, days=None):
         """
         Calculate simple P&L based on snapshots and cash flows
@@ -292,9 +430,10 @@ class PerformanceTracker:
         """
         try:
             # Get the last snapshot (current value)
-            last_snapshot = Snapshot.query.order_by(Snapshot.timestamp.desc()).first()
+            snapshots, cash_flows = get_snapshot_store().sync()
+            snapshot_ts, values = snapshots['timestamp'], snapshots['total_value_usd']
 
-            if not last_snapshot:
+            if not snapshots:
                 logger.warning("No snapshots available for P&L calculation")
                 return {
                     'pnl_usd': 0,
@@ -306,39 +445,30 @@ class PerformanceTracker:
                     'total_withdrawals': 0,
                     'net_cash_flow': 0,
                     'period_days': 0,
-                    'period_start': datetime.utcnow(),
-                    'period_end': datetime.utcnow()
+                    'period_start': get_clock().now(),
+                    'period_end': get_clock().now()
                 }
 
-            current_value = last_snapshot.total_value_usd
-            end_date = self.timestamp_to_datetime(last_snapshot.timestamp)
+            last = len(snapshots) - 1
+            current_value = values[last]
+            end_date = self.timestamp_to_datetime(snapshot_ts[last])
 
             if days is None or days == 0:
                 # Total: from first snapshot to last snapshot
-                first_snapshot = Snapshot.query.order_by(Snapshot.timestamp.asc()).first()
-                start_date = self.timestamp_to_datetime(first_snapshot.timestamp)
-                initial_value = first_snapshot.total_value_usd
+                start_date = self.timestamp_to_datetime(snapshot_ts[0])
+                initial_value = values[0]
                 actual_days = (end_date - start_date).days
             else:
-                # Period: from X days ago to last snapshot
-                start_date = end_date - timedelta(days=days)
-
-                # Convertir en INTEGER pour la requête SQL
-                start_ts = self.datetime_to_timestamp(start_date)
-
-                # Find closest snapshot to start date
-                start_snapshot = Snapshot.query.filter(
-                    Snapshot.timestamp >= start_ts
-                ).order_by(Snapshot.timestamp.asc()).first()
+                # Period: from X days ago to last snapshot (epoch seconds)
+                start_index = snapshots.first_at_or_after(snapshot_ts[last] - days * 86400)
 
-                if start_snapshot:
-                    initial_value = start_snapshot.total_value_usd
-                    start_date = self.timestamp_to_datetime(start_snapshot.timestamp)
+                if start_index is not None:
+                    initial_value = values[start_index]
+                    start_date = self.timestamp_to_datetime(snapshot_ts[start_index])
                 else:
                     # No snapshot in period, use first available
-                    first_snapshot = Snapshot.query.order_by(Snapshot.timestamp.asc()).first()
-                    initial_value = first_snapshot.total_value_usd if first_snapshot else 0
-                    start_date = self.timestamp_to_datetime(first_snapshot.timestamp) if first_snapshot else end_date
+                    initial_value = values[0]
+                    start_date = self.timestamp_to_datetime(snapshot_ts[0])
 
                 actual_days = days
 
@@ -347,14 +477,12 @@ class PerformanceTracker:
             end_ts = self.datetime_to_timestamp(end_date)
 
             # Get cash flows in period
-            cash_flows = CashFlow.query.filter(
-                CashFlow.timestamp >= start_ts,
-                CashFlow.timestamp <= end_ts
-            ).all()
+            cf_lo, cf_hi = cash_flows.span(start_ts, end_ts)
+            amounts = cash_flows['amount_usd'][cf_lo:cf_hi]
 
             # Calculate net deposits (positive) and withdrawals (negative)
-            total_deposits = sum(cf.amount_usd for cf in cash_flows if cf.amount_usd > 0)
-            total_withdrawals = sum(abs(cf.amount_usd) for cf in cash_flows if cf.amount_usd < 0)
+            total_deposits = sum(amount for amount in amounts if amount > 0)
+            total_withdrawals = sum(abs(amount) for amount in amounts if amount < 0)
             net_cash_flow = total_deposits - total_withdrawals
 
             # P&L calculation
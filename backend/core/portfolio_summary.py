@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Portfolio Summary - Materialized first/last snapshot, counts and cash flow totals
+One row (portfolio_summary, id=1) folded forward in the same transaction as
+every snapshot / cash flow insert, so GET /stats reads a single row whatever
+the history size. Updates are SQL expressions (count = count + n, ...) and
+stay correct with several writers. rebuild() recomputes the row from the
+tables: used when it is missing, after INSERT OR IGNORE batches (inserted
+count unknown) and by `flask --app app repair-summary`.
+"""
+import logging
+from sqlalchemy import case, func, select, update
+from db.models import db, Snapshot, CashFlow, PortfolioSummary
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_ID = 1
+
+
+def _latest_snapshot_id():
+    return select(Snapshot.id).order_by(Snapshot.timestamp.desc(), Snapshot.id.desc()).limit(1).scalar_subquery()
+
+
+def _latest_cashflow_id():
+    return select(func.max(CashFlow.id)).scalar_subquery()
+
+
+def record(snapshots=(), cash_flows=()):
+    """
+    Fold rows just inserted (flushed, not committed) into the summary
+
+    Args:
+        snapshots: Inserted snapshots (Snapshot objects or dicts with 'timestamp')
+        cash_flows: Inserted cash flows (CashFlow objects or dicts with 'amount_usd')
+    """
+    def field(row, name):
+        return row[name] if isinstance(row, dict) else getattr(row, name)
+
+    values = {}
+    if snapshots:
+        first_ts = min(field(s, 'timestamp') for s in snapshots)
+        last_ts = max(field(s, 'timestamp') for s in snapshots)
+        values.update(
+            snapshot_count=PortfolioSummary.snapshot_count + len(snapshots),
+            first_snapshot_ts=case(
+                ((PortfolioSummary.first_snapshot_ts.is_(None)) | (PortfolioSummary.first_snapshot_ts > first_ts),
+                 first_ts),
+                else_=PortfolioSummary.first_snapshot_ts),
+            last_snapshot_ts=case(
+                ((PortfolioSummary.last_snapshot_ts.is_(None)) | (PortfolioSummary.last_snapshot_ts < last_ts),
+                 last_ts),
+                else_=PortfolioSummary.last_snapshot_ts),
+            latest_snapshot_id=_latest_snapshot_id()
+        )
+    if cash_flows:
+        amounts = [field(cf, 'amount_usd') for cf in cash_flows]
+        values.update(
+            cashflow_count=PortfolioSummary.cashflow_count + len(amounts),
+            total_deposits_usd=PortfolioSummary.total_deposits_usd + sum(a for a in amounts if a > 0),
+            total_withdrawals_usd=PortfolioSummary.total_withdrawals_usd + sum(abs(a) for a in amounts if a < 0),
+            latest_cashflow_id=_latest_cashflow_id()
+        )
+    if not values:
+        return
+
+    result = db.session.execute(
+        update(PortfolioSummary).where(PortfolioSummary.id == SUMMARY_ID).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        rebuild()  # No summary yet: the aggregates already include the new rows
+
+
+def rebuild():
+    """
+    Recompute the summary row from the tables (committed by the caller)
+
+    Returns:
+        PortfolioSummary: The rebuilt row
+    """
+    snapshot_count, first_ts, last_ts = db.session.execute(
+        select(func.count(Snapshot.id), func.min(Snapshot.timestamp), func.max(Snapshot.timestamp))
+    ).one()
+    cashflow_count, deposits, withdrawals, latest_cashflow_id = db.session.execute(
+        select(
+            func.count(CashFlow.id),
+            func.coalesce(func.sum(case((CashFlow.amount_usd > 0, CashFlow.amount_usd), else_=0)), 0),
+            func.coalesce(func.sum(case((CashFlow.amount_usd < 0, -CashFlow.amount_usd), else_=0)), 0),
+            func.max(CashFlow.id)
+        )
+    ).one()
+
+    summary = db.session.get(PortfolioSummary, SUMMARY_ID)
+    if summary is None:
+        summary = PortfolioSummary(id=SUMMARY_ID)
+        db.session.add(summary)
+    summary.snapshot_count = snapshot_count
+    summary.first_snapshot_ts = first_ts
+    summary.last_snapshot_ts = last_ts
+    summary.latest_snapshot_id = db.session.execute(select(_latest_snapshot_id())).scalar()
+    summary.cashflow_count = cashflow_count
+    summary.total_deposits_usd = float(deposits)
+    summary.total_withdrawals_usd = float(withdrawals)
+    summary.latest_cashflow_id = latest_cashflow_id
+    db.session.flush()
+    return summary
+
+
+def get_summary():
+    """
+    Current summary as a dict (single-row read; rebuilt if missing)
+
+    Returns:
+        dict: snapshot_count, first_snapshot_ts, last_snapshot_ts, latest_snapshot_id,
+              cashflow_count, total_deposits_usd, total_withdrawals_usd, latest_cashflow_id
+    """
+    row = db.session.execute(select(PortfolioSummary.__table__).where(PortfolioSummary.id == SUMMARY_ID)).mappings().first()
+    if row is None:
+        rebuild()
+        db.session.commit()
+        return get_summary()
+    return {key: value for key, value in row.items() if key != 'id'}
+
+
+def ensure():
+    """Create the row on databases written before the summary existed (app start-up)"""
+    if db.session.get(PortfolioSummary, SUMMARY_ID) is None:
+        summary = rebuild()
+        db.session.commit()
+        logger.info(f"🧮 Portfolio summary built: {summary.snapshot_count} snapshots, "
+                    f"{summary.cashflow_count} cash flows")
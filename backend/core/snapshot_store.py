@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Snapshot Store - Snapshots and cash flows kept in memory as compact column arrays
+Snapshots never change once written (except when a recompute rewrites their
+stored metrics), so each process loads both tables once into typed arrays
+sorted by timestamp and serves range queries by bisection instead of
+hydrating ORM objects on every request.
+
+Memory per snapshot: 6 columns x 8 bytes (id, timestamp, value as int64;
+twr, pnl, pnl_percent as float64, NaN = NULL) = 48 bytes, plus array
+over-allocation (~6%). A hydrated Snapshot ORM object costs about 1.2 KB
+(instance __dict__, identity map entry, InstanceState, boxed Python values):
+`python -m benchmarks.run` reports both under 'memory'. Cash flows cost 24
+bytes each (id, timestamp, amount).
+
+Coherence: before each read, the store fetches rows with an id above the
+highest one it holds (one indexed query per table, empty in the steady
+state), so snapshots written by other workers show up on their next read.
+Writers in this process append their row directly after commit. Rewrites of
+existing rows (recompute_snapshot_metrics) bump a generation counter in
+sync_cursors, which makes every process reload on its next read.
+"""
+import logging
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from sqlalchemy import select
+from db.models import db, Snapshot, CashFlow, SyncCursor
+from utils import timestamps
+
+logger = logging.getLogger(__name__)
+
+GENERATION_CURSOR = 'snapshot_store:generation'
+LOAD_CHUNK_SIZE = 10000
+
+# (column, array typecode) - 'd' columns store NULL as NaN
+SNAPSHOT_COLUMNS = (('id', 'q'), ('timestamp', 'q'), ('total_value_usd', 'q'),
+                    ('twr', 'd'), ('pnl', 'd'), ('pnl_percent', 'd'))
+CASH_FLOW_COLUMNS = (('id', 'q'), ('timestamp', 'q'), ('amount_usd', 'd'))
+
+NAN = float('nan')
+
+
+def nullable(value):
+    """Stored float (NaN = NULL) -> value or None"""
+    return None if math.isnan(value) else value
+
+
+class ColumnTable:
+    """One table as parallel arrays sorted by (timestamp, id)"""
+
+    def __init__(self, spec):
+        """
+        Args:
+            spec: ((column, typecode), ...) - must include 'id' and 'timestamp'
+        """
+        self.spec = spec
+        self.columns = {name: array(code) for name, code in spec}
+        self.size = 0  # Rows readers may see (set after every column is extended)
+        self.max_id = 0
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def nbytes(self):
+        """Bytes allocated by the column buffers"""
+        return sum(col.buffer_info()[1] * col.itemsize for col in self.columns.values())
+
+    def span(self, start_ts=None, end_ts=None):
+        """
+        Row slice with start_ts <= timestamp <= end_ts (bounds optional, epoch seconds)
+
+        Returns:
+            (lo, hi): Python slice bounds into every column
+        """
+        timestamps, n = self.columns['timestamp'], self.size
+        lo = 0 if start_ts is None else bisect_left(timestamps, start_ts, 0, n)
+        hi = n if end_ts is None else bisect_right(timestamps, end_ts, lo, n)
+        return lo, hi
+
+    def first_at_or_after(self, ts):
+        """Index of the first row with timestamp >= ts (None if there is none)"""
+        i = bisect_left(self.columns['timestamp'], ts, 0, self.size)
+        return i if i < self.size else None
+
+    def merge(self, rows):
+        """
+        Add rows (tuples in spec order, sorted by timestamp then id, ids above max_id)
+
+        Rows after the current last timestamp are appended in place: readers
+        holding this table keep seeing their first `size` rows. Anything
+        older is merged into a new table, returned in place of this one.
+
+        Returns:
+            ColumnTable holding the rows (self or a new table)
+        """
+        if not rows:
+            return self
+        if self.size and rows[0][1] < self.columns['timestamp'][self.size - 1]:
+            table = ColumnTable(self.spec)
+            names = [name for name, _ in self.spec]
+            existing = zip(*(self.columns[name][:self.size] for name in names))
+            merged = sorted([*existing, *rows], key=lambda row: (row[1], row[0]))
+            table._extend(merged)
+            return table
+        self._extend(rows)
+        return self
+
+    def _extend(self, rows):
+        for position, (name, code) in enumerate(self.spec):
+            if code == 'd':
+                self.columns[name].extend(NAN if row[position] is None else row[position] for row in rows)
+            else:
+                self.columns[name].extend(row[position] for row in rows)
+        self.max_id = max(self.max_id, max(row[0] for row in rows))
+        self.size += len(rows)
+
+
+class SnapshotStore:
+    """Process-wide snapshot and cash flow columns of one database"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.snapshots = ColumnTable(SNAPSHOT_COLUMNS)
+        self.cash_flows = ColumnTable(CASH_FLOW_COLUMNS)
+        self.generation = None  # Not loaded yet
+        self.loads = 0
+
+    def sync(self):
+        """
+        Catch up with the database (requires app context)
+
+        Returns:
+            (snapshots, cash_flows): ColumnTables to read from; their visible
+            rows never change, later writes go to new rows or new tables
+        """
+        with self._lock:
+            # Queried, not session.get(): the identity map would hide other processes' bumps
+            generation = db.session.query(SyncCursor.value).filter(SyncCursor.name == GENERATION_CURSOR).scalar() or 0
+            if generation != self.generation:
+                snapshots, cash_flows = ColumnTable(SNAPSHOT_COLUMNS), ColumnTable(CASH_FLOW_COLUMNS)
+                self.loads += 1
+            else:
+                snapshots, cash_flows = self.snapshots, self.cash_flows
+
+            snapshots = self._fetch(Snapshot, snapshots)
+            cash_flows = self._fetch(CashFlow, cash_flows)
+
+            if generation != self.generation:
+                logger.info(f"🗃️  Snapshot store loaded: {len(snapshots)} snapshots, "
+                            f"{len(cash_flows)} cash flows ({self.nbytes(snapshots, cash_flows) / 1024:.0f} KB)")
+            self.snapshots, self.cash_flows, self.generation = snapshots, cash_flows, generation
+            return snapshots, cash_flows
+
+    @staticmethod
+    def _fetch(model, table):
+        """Merge the rows with an id above table.max_id"""
+        query = select(*[getattr(model, name) for name, _ in table.spec])\
+            .where(model.id > table.max_id)\
+            .order_by(model.timestamp, model.id)
+        result = db.session.execute(query.execution_options(yield_per=LOAD_CHUNK_SIZE))
+        for rows in result.partitions(LOAD_CHUNK_SIZE):
+            if rows[-1][1] >= timestamps.LEGACY_MIN:  # Not migrated yet (legacy values sort last)
+                rows = [(row[0], timestamps.normalize(row[1]), *row[2:]) for row in rows]
+            table = table.merge(rows)
+        return table
+
+    def add(self, row):
+        """
+        Append a row this process just committed (Snapshot or CashFlow)
+
+        Only taken when it directly follows the rows held (id = max_id + 1):
+        otherwise another writer may own the ids in between and the next
+        sync fetches everything in order.
+        """
+        with self._lock:
+            name = 'snapshots' if isinstance(row, Snapshot) else 'cash_flows'
+            table = getattr(self, name)
+            if self.generation is None or row.id != table.max_id + 1:
+                return
+            setattr(self, name, table.merge([tuple(getattr(row, column) for column, _ in table.spec)]))
+
+    def nbytes(self, snapshots=None, cash_flows=None):
+        """Bytes held by the column buffers"""
+        snapshots = self.snapshots if snapshots is None else snapshots
+        cash_flows = self.cash_flows if cash_flows is None else cash_flows
+        return snapshots.nbytes() + cash_flows.nbytes()
+
+
+def snapshot_dicts(snapshots, lo, hi):
+    """Rows [lo, hi) of a snapshot table in the Snapshot.to_dict format"""
+    columns = [snapshots[name][lo:hi] for name, _ in SNAPSHOT_COLUMNS]
+    columns[1] = timestamps.iso_many(columns[1])
+    return [
+        {
+            'id': snapshot_id,
+            'timestamp': iso,
+            'total_value_usd': float(value),
+            'twr': round(twr, 4) if not math.isnan(twr) else None,
+            'pnl': nullable(pnl),
+            'pnl_percent': round(pnl_percent, 4) if not math.isnan(pnl_percent) else None
+        }
+        for snapshot_id, iso, value, twr, pnl, pnl_percent in zip(*columns)
+    ]
+
+
+def invalidate():
+    """Make every process reload its store (existing rows rewritten; committed by the caller)"""
+    SyncCursor.set(GENERATION_CURSOR, SyncCursor.get(GENERATION_CURSOR, 0) + 1)
+
+
+def get_snapshot_store(app=None):
+    """The app's SnapshotStore (created on first use)"""
+    from flask import current_app
+
+    extensions = (app or current_app).extensions
+    store = extensions.get('snapshot_store')
+    if store is None:
+        store = extensions.setdefault('snapshot_store', SnapshotStore())
+    return store
+
+
+def init_app(app):
+    """Create the app's store (loaded by the first read, not at start-up)"""
+    return get_snapshot_store(app)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Lightweight schema migrations for existing SQLite databases
+db.create_all() only creates missing tables, so columns added to existing
+models are applied here (idempotent, run at start-up).
+
+Timestamp columns written as YYYYMMDDHHMM by older versions are rewritten
+to epoch seconds online: short transactions of MIGRATION_BATCH_SIZE rows,
+so other workers keep reading and writing in between. Rows are converted
+oldest first; converted values (~1.7e9) sort below legacy ones (~2e11), so
+ORDER BY timestamp stays chronological throughout, and readers decode both
+formats (utils.timestamps).
+"""
+import logging
+import time
+from sqlalchemy import inspect, text
+from utils import timestamps
+
+logger = logging.getLogger(__name__)
+
+# (table, column, DDL type, unique index name or None)
+ADDED_COLUMNS = [
+    ('cash_flows', 'tx_id', 'VARCHAR(100)', 'ix_cash_flows_tx_id'),
+]
+
+# (table, column) holding utils.timestamps values
+TIMESTAMP_COLUMNS = [
+    ('snapshots', 'timestamp'),
+    ('cash_flows', 'timestamp'),
+    ('last_balance', 'timestamp'),
+    ('portfolio_summary', 'first_snapshot_ts'),
+    ('portfolio_summary', 'last_snapshot_ts'),
+]
+
+MIGRATION_BATCH_SIZE = 2000
+
+
+def upgrade_schema(db):
+    """
+    Add columns missing from tables created by older versions
+
+    Args:
+        db: Flask-SQLAlchemy instance (inside an app context)
+    """
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+
+    with db.engine.begin() as conn:
+        for table, column, ddl_type, unique_index in ADDED_COLUMNS:
+            if table not in tables:
+                continue
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            if column in existing:
+                continue
+
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl_type}'))
+            if unique_index:
+                conn.execute(text(f'CREATE UNIQUE INDEX IF NOT EXISTS {unique_index} ON {table} ({column})'))
+            logger.info(f"🔧 Schema upgraded: {table}.{column}")
+
+
+def migrate_timestamps(db, batch_size=MIGRATION_BATCH_SIZE):
+    """
+    Rewrite legacy YYYYMMDDHHMM timestamps as epoch seconds (idempotent)
+
+    Several workers may run this at once: each row is updated only if it
+    still holds the legacy value that was read.
+
+    Args:
+        db: Flask-SQLAlchemy instance (inside an app context)
+        batch_size: Rows converted per transaction
+
+    Returns:
+        int: Rows converted by this call
+    """
+    tables = set(inspect(db.engine).get_table_names())
+    total = 0
+    for table, column in TIMESTAMP_COLUMNS:
+        if table not in tables:
+            continue
+        select_batch = text(f'SELECT id, {column} FROM {table} WHERE {column} >= :legacy '
+                            f'ORDER BY {column}, id LIMIT :limit')
+        update_row = text(f'UPDATE {table} SET {column} = :new WHERE id = :id AND {column} = :old')
+
+        started = time.perf_counter()
+        converted = 0
+        while True:
+            with db.engine.begin() as conn:
+                rows = conn.execute(select_batch, {'legacy': timestamps.LEGACY_MIN, 'limit': batch_size}).all()
+                if not rows:
+                    break
+                conn.execute(update_row, [
+                    {'id': row_id, 'old': value, 'new': timestamps.from_legacy(value)} for row_id, value in rows
+                ])
+            converted += len(rows)
+
+        if converted:
+            logger.info(f"🔧 Timestamps migrated to epoch seconds: {table}.{column}, {converted} rows "
+                        f"in {time.perf_counter() - started:.2f}s")
+        total += converted
+    return total
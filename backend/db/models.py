@@ -3,9 +3,10 @@
 SQLAlchemy models for portfolio database
 """
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from db.read_replica import RoutingSession
+from utils import timestamps
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class Snapshot(db.Model):
@@ -13,7 +14,7 @@ class Snapshot(db.Model):
     __tablename__ = 'snapshots'
 
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.Integer, nullable=False, index=True)  # YYYYMMDDHHmm
+    timestamp = db.Column(db.Integer, nullable=False, index=True)  # Epoch seconds, UTC (utils.timestamps)
     total_value_usd = db.Column(db.Integer, nullable=False)  # Dollars (no cents)
     
     # Performance metrics (calculated from inception)
@@ -23,15 +24,8 @@ class Snapshot(db.Model):
 
     def to_dict(self):
         """Convert to dictionary for API response"""
-        # Convert timestamp 202512210145 to ISO string "2025-12-21T01:45:00"
-        timestamp_str = str(self.timestamp)
-        dt = datetime(
-            year=int(timestamp_str[0:4]),
-            month=int(timestamp_str[4:6]),
-            day=int(timestamp_str[6:8]),
-            hour=int(timestamp_str[8:10]),
-            minute=int(timestamp_str[10:12])
-        )
+        # Convert timestamp 1766281500 to ISO string "2025-12-21T01:45:00"
+        dt = timestamps.decode(self.timestamp)
 
         return {
             'id': self.id,
@@ -48,21 +42,15 @@ class CashFlow(db.Model):
     __tablename__ = 'cash_flows'
 
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.Integer, nullable=False, index=True)  # YYYYMMDDHHmm
-    amount_usd = db.Column(db.Integer, nullable=False)  # Dollars (no cents)
+    timestamp = db.Column(db.Integer, nullable=False, index=True)  # Epoch seconds, UTC (utils.timestamps)
+    amount_usd = db.Column(db.Float, nullable=False)  # Dollars (cents kept, SQLite stores REAL in old INTEGER columns)
     type = db.Column(db.String(20), nullable=False)  # 'DEPOSIT' or 'WITHDRAW'
+    tx_id = db.Column(db.String(100), unique=True, nullable=True)  # Binance id for imported flows (dedupe)
 
     def to_dict(self):
         """Convert to dictionary for API response"""
         # Convert timestamp
-        timestamp_str = str(self.timestamp)
-        dt = datetime(
-            year=int(timestamp_str[0:4]),
-            month=int(timestamp_str[4:6]),
-            day=int(timestamp_str[6:8]),
-            hour=int(timestamp_str[8:10]),
-            minute=int(timestamp_str[10:12])
-        )
+        dt = timestamps.decode(self.timestamp)
 
         return {
             'id': self.id,
@@ -77,7 +65,7 @@ class LastBalance(db.Model):
     __tablename__ = 'last_balance'
 
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.Integer, nullable=False, index=True)  # YYYYMMDDHHmm (consistent with other tables)
+    timestamp = db.Column(db.Integer, nullable=False, index=True)  # Epoch seconds, UTC (consistent with other tables)
     asset = db.Column(db.String(20), unique=True, nullable=False, index=True)
     balance = db.Column(db.Float, nullable=False)
     usd_value = db.Column(db.Float, nullable=False)
@@ -86,14 +74,7 @@ class LastBalance(db.Model):
     def to_dict(self):
         """Convert to dictionary for API response"""
         # Convert timestamp
-        timestamp_str = str(self.timestamp)
-        dt = datetime(
-            year=int(timestamp_str[0:4]),
-            month=int(timestamp_str[4:6]),
-            day=int(timestamp_str[6:8]),
-            hour=int(timestamp_str[8:10]),
-            minute=int(timestamp_str[10:12])
-        )
+        dt = timestamps.decode(self.timestamp)
 
         return {
             'asset': self.asset,
@@ -102,3 +83,53 @@ class LastBalance(db.Model):
             'percentage': round(self.percentage, 4),
             'timestamp': dt.isoformat()
         }
+
+
+class LedgerEvent(db.Model):
+    """Raw balance change pulled from Binance history (trades, deposits, withdrawals)"""
+    __tablename__ = 'ledger_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(100), unique=True, nullable=False)  # e.g. 'trade:BTCUSDT:42:base'
+    time_ms = db.Column(db.BigInteger, nullable=False, index=True)  # Epoch milliseconds (event ordering)
+    source = db.Column(db.String(20), nullable=False)  # 'TRADE', 'DEPOSIT' or 'WITHDRAW'
+    asset = db.Column(db.String(20), nullable=False)
+    delta = db.Column(db.Float, nullable=False)  # Quantity change (negative = outflow)
+
+
+class SyncCursor(db.Model):
+    """Persisted position of an incremental sync (resumable jobs)"""
+    __tablename__ = 'sync_cursors'
+
+    name = db.Column(db.String(100), primary_key=True)  # e.g. 'trades:BTCUSDT'
+    value = db.Column(db.BigInteger, nullable=False)  # Last id / epoch ms processed
+
+    @classmethod
+    def get(cls, name, default=None):
+        """Read a cursor value (default if never stored)"""
+        cursor = db.session.get(cls, name)
+        return cursor.value if cursor else default
+
+    @classmethod
+    def set(cls, name, value):
+        """Store a cursor value (committed by the caller)"""
+        cursor = db.session.get(cls, name)
+        if cursor:
+            cursor.value = value
+        else:
+            db.session.add(cls(name=name, value=value))
+
+
+class PortfolioSummary(db.Model):
+    """Materialized totals of snapshots and cash flows (single row, kept up to date on write)"""
+    __tablename__ = 'portfolio_summary'
+
+    id = db.Column(db.Integer, primary_key=True)  # Always 1
+    snapshot_count = db.Column(db.Integer, nullable=False, default=0)
+    first_snapshot_ts = db.Column(db.Integer, nullable=True)  # Epoch seconds
+    last_snapshot_ts = db.Column(db.Integer, nullable=True)  # Epoch seconds
+    latest_snapshot_id = db.Column(db.Integer, nullable=True)  # Snapshot with the latest timestamp
+    cashflow_count = db.Column(db.Integer, nullable=False, default=0)
+    total_deposits_usd = db.Column(db.Float, nullable=False, default=0.0)
+    total_withdrawals_usd = db.Column(db.Float, nullable=False, default=0.0)  # Positive
+    latest_cashflow_id = db.Column(db.Integer, nullable=True)
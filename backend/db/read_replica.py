@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Read Replica - In-memory copy of the SQLite database serving API reads
+With READ_REPLICA=true each worker keeps a copy of the database file in
+memory, taken with the sqlite3 backup API. GET /api/... requests (and
+POST /api/batch) read from it, so they no longer wait on the refresh
+thread's write locks nor pay page-cache misses. Every write, and every
+background job, still goes to the file.
+
+Refresh: a thread copies the file into a fresh in-memory database and then
+swaps it in (double buffering): requests already reading the previous copy
+finish on it unchanged. It wakes after every commit of this process, and
+every READ_REPLICA_POLL_INTERVAL seconds compares `PRAGMA data_version`,
+which changes when another worker commits. A request starting while the
+copy is older than this process's last commit reads the file, so a POST
+followed by a GET always sees its own write. Writes from other workers
+become visible within the poll interval.
+
+Cost: one copy of the database per worker in RAM (two during a swap), and
+a full copy per refresh (0.5 ms for a year of hourly snapshots; `python -m
+benchmarks.read_replica` compares latencies with and without the replica).
+"""
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.orm import Session as BaseSession
+from sqlalchemy.pool import QueuePool
+from utils.metrics import READ_REPLICA_REFRESH, READ_REPLICA_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 0.5  # seconds
+POOL_SIZE = 5  # pooled connections to the current copy
+BACKUP_RETRY_SLEEP = 0.005  # seconds between backup attempts while a writer holds the lock
+
+_names = itertools.count(1)
+
+
+class _ReplicaConnection(sqlite3.Connection):
+    """sqlite3 connection remembering which copy it reads"""
+    uri = None
+    fresh = True  # Not checked out yet
+
+
+class RoutingSession(Session):
+    """db.session class: statements go to the replica engine stored in session.info, if any"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('read_replica')
+        if bind is None and replica is not None:
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReadReplica:
+    """Double-buffered in-memory copy of one SQLite file"""
+
+    def __init__(self, path, poll_interval=DEFAULT_POLL_INTERVAL):
+        """
+        Args:
+            path: SQLite database file
+            poll_interval: Seconds between data_version checks (other processes' commits)
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self.engine = create_engine('sqlite://', creator=self._connect, poolclass=QueuePool,
+                                    pool_size=POOL_SIZE, max_overflow=20)
+        event.listen(self.engine, 'checkout', self._checkout)
+        self.stats = {'refreshes': 0, 'last_refresh_ms': None, 'bytes': 0}
+
+        self._prefix = f"portfolio-replica-{os.getpid()}-{id(self)}"
+        self._uri = None  # Current copy (None until the first refresh)
+        self._holder = None  # Connection keeping the current copy alive
+        self._source = None
+        self._version = None
+        self._commits = 0  # Commits of this process
+        self._synced = 0  # Commits included in the current copy
+        self._lock = threading.Lock()  # Connecting vs swapping
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        """New read-only connection to the current copy (engine creator)"""
+        # Under the lock: a copy whose last connection closed is gone, and
+        # connecting to its name would create an empty database
+        with self._lock:
+            conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False, factory=_ReplicaConnection)
+            conn.uri = self._uri
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        """Pooled connections to a previous copy are replaced (the pool retries with a new one)"""
+        if dbapi_connection.fresh:
+            # Just connected: its copy is at least as recent as the one route()
+            # checked, even if a swap happened since (rejecting it could exhaust
+            # the pool's reconnection attempts while copies swap quickly)
+            dbapi_connection.fresh = False
+            return
+        if dbapi_connection.uri != self._uri:
+            raise exc.DisconnectionError('read replica refreshed')
+
+    def refresh(self, force=False):
+        """Copy the file again if it changed since the last copy"""
+        if self._source is None:
+            self._source = sqlite3.connect(self.path, check_same_thread=False)
+        commits = self._commits
+        version = self._source.execute('PRAGMA data_version').fetchone()[0]
+        if force or version != self._version:
+            started = time.perf_counter()
+            uri = f"file:{self._prefix}-{next(_names)}?mode=memory&cache=shared"
+            copy = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._source.backup(copy, sleep=BACKUP_RETRY_SLEEP)
+
+            with self._lock:
+                previous = self._holder
+                self._uri, self._holder, self._version = uri, copy, version
+                if previous is not None:
+                    previous.close()  # Freed once the last connection reading it closes too
+
+            seconds = time.perf_counter() - started
+            page_count, page_size = (copy.execute(f'PRAGMA {p}').fetchone()[0] for p in ('page_count', 'page_size'))
+            self.stats.update(refreshes=self.stats['refreshes'] + 1, last_refresh_ms=round(seconds * 1000, 3),
+                              bytes=page_count * page_size)
+            READ_REPLICA_REFRESH.observe(seconds)
+        self._synced = commits
+
+    def notify_commit(self):
+        """A session of this process committed: the copy is stale until the next refresh"""
+        self._commits += 1
+        self._wake.set()
+
+    def route(self):
+        """Engine for a read-only request (None: no copy yet, or it lacks a commit of this process)"""
+        if self._uri is None or self._synced < self._commits:
+            return None
+        return self.engine
+
+    def start(self):
+        """Take the first copy and start the refresh thread"""
+        self.refresh(force=True)
+        self._thread = threading.Thread(target=self._run, name='read-replica', daemon=True)
+        self._thread.start()
+        logger.info(f"🪞 Read replica ready: {self.stats['bytes'] / 1024:.0f} KB copied "
+                    f"in {self.stats['last_refresh_ms']:.1f} ms")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"❌ Read replica refresh failed: {e}")
+
+
+def get_read_replica(app=None):
+    """The app's ReadReplica (None when disabled)"""
+    return (app or current_app).extensions.get('read_replica')
+
+
+def _after_commit(session):
+    if not has_app_context() or session.info.get('read_replica') is not None:
+        return
+    replica = get_read_replica()
+    if replica is not None:
+        replica.notify_commit()
+
+
+def init_app(app, db):
+    """
+    Start the replica and route read-only API requests to it (READ_REPLICA)
+
+    Returns:
+        ReadReplica or None (disabled, or the database is not an SQLite file)
+    """
+    if not app.config.get('READ_REPLICA'):
+        return None
+    with app.app_context():
+        url = db.engine.url
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        logger.warning("⚠️  READ_REPLICA needs an SQLite database file, disabled")
+        return None
+
+    replica = ReadReplica(url.database, app.config.get('READ_REPLICA_POLL_INTERVAL', DEFAULT_POLL_INTERVAL))
+    app.extensions['read_replica'] = replica.start()
+    if not event.contains(BaseSession, 'after_commit', _after_commit):
+        event.listen(BaseSession, 'after_commit', _after_commit)
+
+    @app.before_request
+    def _route_reads():
+        if not request.path.startswith('/api/'):
+            return
+        if request.method != 'GET' and request.endpoint != 'batch.run_batch':
+            return
+        engine = replica.route()
+        READ_REPLICA_REQUESTS.inc(target='replica' if engine is not None else 'file')
+        if engine is not None:
+            db.session.info['read_replica'] = engine
+
+    return replica
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Async Refresh - asyncio balance refresh engine (REFRESH_ENGINE=asyncio)
+Balance updates run as a three-stage pipeline on one event loop thread
+instead of a scheduler job making blocking REST calls:
+
+    fetch (per account, AsyncClient) -> value -> write (executor thread)
+
+Stages are connected by bounded asyncio queues: a slow database makes the
+fetchers wait instead of piling up valuations. The writer drains everything
+queued into one batch and keeps only the latest valuation per account, then
+hands it to a single-thread executor (SQLite has one writer), so the loop
+never blocks on a commit. Fetches keep their own fixed-rate deadlines.
+
+The app refreshes one account, but RefreshPipeline takes any number of
+sources: their requests are multiplexed on the same loop and connection pool
+(`python -m benchmarks.refresh_engines` compares throughput with the threaded
+engine against the fake exchange). Snapshots, cash flow ingestion and
+registered jobs stay on the scheduler of AutoRefreshService.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.binance_async import AsyncBinanceTrader
+from db.models import db
+from services.auto_refresh import AutoRefreshService
+from services.session_manager import session_manager
+from utils.clock import get_clock
+from utils.metrics import REFRESH_DURATION, REFRESH_ERRORS
+from utils import query_stats
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 64  # items waiting between two stages
+
+
+class RefreshPipeline:
+    """fetch -> value -> write stages connected by bounded asyncio queues"""
+
+    def __init__(self, sources, store, interval, clock=None, executor=None, queue_size=QUEUE_SIZE):
+        """
+        Args:
+            sources: {name: object with async fetch() -> (account, tickers) and value(account, tickers)}
+            store: Callable({name: (balances, started)}) writing one batch, run in the executor
+            interval: Seconds between fetches of each source (0 = back to back)
+            clock: Clock with monotonic() and a `speed` (default: get_clock())
+            executor: Executor running `store` (default: a single thread)
+            queue_size: Capacity of each queue between stages
+        """
+        self.sources = sources
+        self.store = store
+        self.interval = interval
+        self.clock = clock or get_clock()
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='refresh-write')
+        self.queue_size = queue_size
+        self.stats = {
+            'fetches': 0, 'fetch_errors': 0, 'missed': 0,
+            'writes': 0, 'written': 0, 'coalesced': 0, 'write_errors': 0,
+            'last_fetch_ms': None, 'last_write_ms': None
+        }
+
+    async def run(self, stopping):
+        """
+        Run until `stopping` (asyncio.Event) is set
+
+        Fetches in progress are abandoned; a batch already in the executor
+        finishes there.
+        """
+        fetched = asyncio.Queue(self.queue_size)
+        valued = asyncio.Queue(self.queue_size)
+        fetchers = [asyncio.create_task(self._fetch_loop(name, source, fetched, stopping))
+                    for name, source in self.sources.items()]
+        stages = [asyncio.create_task(self._value_loop(fetched, valued)),
+                  asyncio.create_task(self._write_loop(valued))]
+
+        await stopping.wait()
+        for task in fetchers + stages:
+            task.cancel()
+        await asyncio.gather(*fetchers, *stages, return_exceptions=True)
+
+    async def _wait(self, stopping, seconds):
+        """Sleep `seconds` of clock time, returning early when stopping"""
+        try:
+            await asyncio.wait_for(stopping.wait(), max(0, seconds) / self.clock.speed)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _fetch_loop(self, name, source, fetched, stopping):
+        due = self.clock.monotonic()
+        while not stopping.is_set():
+            started = time.perf_counter()
+            try:
+                account, tickers = await source.fetch()
+                seconds = time.perf_counter() - started
+                REFRESH_DURATION.observe(seconds, phase='fetch')
+                self.stats.update(fetches=self.stats['fetches'] + 1, last_fetch_ms=round(seconds * 1000, 3))
+                await fetched.put((name, source, account, tickers, started))
+            except Exception as e:
+                self.stats['fetch_errors'] += 1
+                REFRESH_ERRORS.inc()
+                logger.error(f"❌ Async balance fetch failed ({name}): {e}")
+
+            # Fixed-rate deadlines: the fetch time does not shift the next one
+            now = self.clock.monotonic()
+            due += self.interval
+            if due <= now:
+                if self.interval:
+                    late = int((now - due) // self.interval) + 1
+                    self.stats['missed'] += late
+                    due += late * self.interval
+                else:
+                    due = now
+            await self._wait(stopping, due - now)
+
+    async def _value_loop(self, fetched, valued):
+        while True:
+            name, source, account, tickers, started = await fetched.get()
+            value_started = time.perf_counter()
+            try:
+                balances = source.value(account, tickers)
+            except Exception as e:
+                REFRESH_ERRORS.inc()
+                logger.error(f"❌ Async balance valuation failed ({name}): {e}")
+                continue
+            REFRESH_DURATION.observe(time.perf_counter() - value_started, phase='value')
+            await valued.put((name, balances, started))
+
+    async def _write_loop(self, valued):
+        loop = asyncio.get_running_loop()
+        while True:
+            name, balances, started = await valued.get()
+            batch = {name: (balances, started)}
+            while not valued.empty():  # Everything already valued goes in the same transaction
+                name, balances, started = valued.get_nowait()
+                self.stats['coalesced'] += name in batch  # Only the latest valuation of an account is written
+                batch[name] = (balances, started)
+
+            write_started = time.perf_counter()
+            try:
+                await loop.run_in_executor(self.executor, self.store, batch)
+            except Exception as e:
+                self.stats['write_errors'] += 1
+                REFRESH_ERRORS.inc()
+                logger.error(f"❌ Async balance write failed: {e}")
+                continue
+            self.stats.update(writes=self.stats['writes'] + 1, written=self.stats['written'] + len(batch),
+                              last_write_ms=round((time.perf_counter() - write_started) * 1000, 3))
+
+
+class AsyncRefreshService(AutoRefreshService):
+    """AutoRefreshService whose balance updates run on a RefreshPipeline"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pipeline = None
+        self._loop = None
+        self._thread = None
+        self._stopping = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='refresh-write')
+
+    def _start_balance_refresh(self):
+        """Start the event loop thread (called once this process is the leader)"""
+        self._loop = asyncio.new_event_loop()
+        self._stopping = asyncio.Event()
+        self._thread = threading.Thread(target=self._run_loop, name='async-refresh', daemon=True)
+        self._thread.start()
+        logger.info(f"✅ Async balance pipeline started (interval: {self.balance_interval}s)")
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        trader = await self._connect()
+        if trader is None:
+            return
+        self.pipeline = RefreshPipeline({'account': trader}, self._write_batch, self.balance_interval,
+                                        clock=self.clock, executor=self._executor)
+        try:
+            await self.pipeline.run(self._stopping)
+        finally:
+            await trader.close()
+
+    async def _connect(self):
+        """AsyncBinanceTrader from the session credentials, retried every interval (None once stopping)"""
+        while not self._stopping.is_set():
+            try:
+                credentials = session_manager.get_credentials()
+                if credentials is None:
+                    raise RuntimeError("SessionManager not initialized. Call initialize() first.")
+                return await AsyncBinanceTrader.create(**credentials)
+            except Exception as e:
+                REFRESH_ERRORS.inc()
+                logger.error(f"❌ Async refresh could not connect to Binance: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.balance_interval / self.clock.speed)
+            except asyncio.TimeoutError:
+                pass
+        return None
+
+    def _write_batch(self, batch):
+        """Executor thread: store each account's valuation (one account in the app)"""
+        with self.app.app_context(), self._maybe_profile('refresh-cycle'), \
+                query_stats.collect('cycle: balance refresh'):
+            try:
+                for balances, started in batch.values():
+                    self._store_balances(balances, started)
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def thread_status(self):
+        status = super().thread_status()
+        status['balance'] = bool(self._thread and self._thread.is_alive())
+        return status
+
+    def job_stats(self):
+        stats = super().job_stats()
+        if self.pipeline is not None:
+            stats['balance'] = {'engine': 'asyncio', 'interval': self.balance_interval, **self.pipeline.stats}
+        return stats
+
+    def stop(self):
+        """Stop the pipeline (a write in progress finishes), then the scheduler"""
+        if self._thread is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._stopping.set)
+            except RuntimeError:
+                pass  # Loop already closed (connection never succeeded before stop)
+            self._thread.join(timeout=5)
+        self._executor.shutdown(wait=True)
+        super().stop()
@@ -1,30 +1,55 @@
 #!/usr/bin/env python3
 """
 Auto-Refresh Service
-Background service with two separate loops:
-- 30s: Update last_balance table from Binance API
-- 1h: Create snapshot from last_balance with TWR/P&L calculations
+Background jobs run by the elected leader on a shared Scheduler:
+- balance (30s): Update last_balance table from Binance API
+- snapshot (1h): Create snapshot from last_balance with TWR/P&L calculations
+  (aligned on wall-clock boundaries, missed hours are backfilled on start-up)
+- cashflow (10min): Import new deposits/withdrawals from Binance as cash flows (optional)
+- jobs added by other modules with services.scheduler.register_job()
+
+With several Gunicorn workers, only the elected leader runs the jobs.
+REFRESH_ENGINE=asyncio moves the balance updates to an asyncio pipeline
+(services.async_refresh), the other jobs stay on the scheduler.
 """
 import logging
-import threading
+import os
 import time
-from datetime import datetime
+from contextlib import nullcontext
 from services.session_manager import session_manager
 from core.performance_tracker import PerformanceTracker
-from db.models import db, LastBalance
+from services.leader_election import LeaderElection
+from services.price_board import get_price_board
+from services.scheduler import Scheduler, OVERLAP_QUEUE, registered_jobs
+from services.snapshot_scheduler import SnapshotScheduler
+from services.cashflow_ingester import CashFlowIngester
+from core.klines import BinanceKlineSource, to_epoch_ms
+from core.history_reconstruction import BinanceHistorySource
+from db.models import db, Snapshot, LastBalance
+from utils.clock import get_clock
+from utils.metrics import REFRESH_DURATION, REFRESH_ERRORS
+from utils.profiling import get_profiler
+from utils import query_stats
 
 logger = logging.getLogger(__name__)
 
+CASHFLOW_JITTER = 30  # seconds - spreads history polls of hosts sharing an API key
+
 
 class AutoRefreshService:
     """
     Background service for automatic portfolio refresh and snapshot creation
-    Runs two separate threads:
-    - Balance update thread: Every 30 seconds
-    - Snapshot thread: Every 1 hour
+    Schedules its jobs on a Scheduler (one dispatcher thread, one worker
+    thread per run):
+    - balance: every 30 seconds
+    - snapshot: every hour, on the hour
+    - cashflow: every 10 minutes (optional)
     """
 
-    def __init__(self, app, balance_interval=30, snapshot_interval=3600):
+    def __init__(self, app, balance_interval=30, snapshot_interval=3600,
+                 leader_election=None, leader_retry_interval=5,
+                 clock=None, kline_source=None, max_backfill=720,
+                 cashflow_interval=None, cashflow_since=None):
         """
         Initialize auto-refresh service
 
@@ -32,124 +57,282 @@ class AutoRefreshService:
             app: Flask application instance
             balance_interval: Balance update interval in seconds (default: 30)
             snapshot_interval: Snapshot interval in seconds (default: 3600 = 1 hour)
+            leader_election: Optional LeaderElection, jobs only run while leader
+            leader_retry_interval: Seconds between leadership attempts (default: 5)
+            clock: Clock with now()/monotonic()/sleep() (default: get_clock())
+            kline_source: Historical prices for backfill (default: Binance klines)
+            max_backfill: Maximum number of missed snapshots to backfill (default: 720)
+            cashflow_interval: Cash flow ingestion interval in seconds (None = disabled)
+            cashflow_since: Datetime the first ingestion starts from (default: now)
         """
         self.app = app
         self.balance_interval = balance_interval
         self.snapshot_interval = snapshot_interval
+        self.leader_election = leader_election
+        self.leader_retry_interval = leader_retry_interval
+        self.clock = clock or get_clock()
+        self.kline_source = kline_source
+        self.max_backfill = max_backfill
+        self.cashflow_interval = cashflow_interval
+        self.cashflow_since = cashflow_since
         self.balance_refresh_count = 0
         self.snapshot_count = 0
         self.running = False
-        self.balance_thread = None
-        self.snapshot_thread = None
+        self.scheduler = Scheduler(clock=self.clock, name='auto-refresh')
         self.last_balance_update = None
         self.last_snapshot_time = None
+        self._snapshot_scheduler = None  # Built by the first snapshot run (backfill)
+        self._last_boundary = None
+        self._ingester = None
 
     def start(self):
-        """Start the auto-refresh service with both threads"""
+        """Start the scheduler (jobs are added once this process is the leader)"""
         if self.running:
             logger.warning("Auto-refresh service already running")
             return
 
         self.running = True
+        self.scheduler.start()
 
-        # Start balance update thread
-        self.balance_thread = threading.Thread(target=self._balance_update_loop, daemon=True)
-        self.balance_thread.start()
-        logger.info(f"✅ Balance update thread started (interval: {self.balance_interval}s)")
+        if self.leader_election is None:
+            self._add_jobs()
+            return
 
-        # Start snapshot thread
-        self.snapshot_thread = threading.Thread(target=self._snapshot_loop, daemon=True)
-        self.snapshot_thread.start()
-        logger.info(f"✅ Snapshot thread started (interval: {self.snapshot_interval}s)")
+        # Retry leadership in the background (failover when the leader dies)
+        self.scheduler.add('leader', self._try_lead, self.leader_retry_interval, run_at_start=True)
+
+    @property
+    def is_leader(self):
+        """True if this process runs the refresh jobs"""
+        return self.running and (self.leader_election is None or self.leader_election.is_leader)
+
+    def thread_status(self):
+        """{job name: scheduled and dispatcher alive} for the jobs this process runs"""
+        alive = self.scheduler.is_alive()
+        names = ['balance', 'snapshot', 'cashflow', 'leader'] + list(registered_jobs())
+        return {name: alive and name in self.scheduler.jobs for name in names}
+
+    def job_stats(self):
+        """{job name: run statistics} (GET /api/admin/jobs)"""
+        return self.scheduler.stats()
+
+    def last_refresh_age(self):
+        """Seconds since the last successful balance update (None before the first)"""
+        if self.last_balance_update is None:
+            return None
+        return (self.clock.now() - self.last_balance_update).total_seconds()
+
+    def _try_lead(self):
+        """Leader job: once the lock is acquired, replace itself with the refresh jobs"""
+        if self.leader_election.try_acquire():
+            logger.info(f"👑 Leader elected for auto-refresh (pid {os.getpid()})")
+            self.scheduler.remove('leader')
+            self._add_jobs()
+
+    def _add_jobs(self):
+        """Schedule the balance, snapshot, cash flow and registered jobs"""
+        self._start_balance_refresh()
+
+        # First run right away (backfill), then on every boundary; a boundary
+        # reached during a long backfill runs as soon as it ends
+        self.scheduler.add('snapshot', self._snapshot_job, self.snapshot_interval,
+                           align=True, overlap=OVERLAP_QUEUE, run_at_start=True)
+        logger.info(f"✅ Snapshot job scheduled (interval: {self.snapshot_interval}s)")
+
+        if self.cashflow_interval:
+            self.scheduler.add('cashflow', self._cashflow_job, self.cashflow_interval,
+                               jitter=min(CASHFLOW_JITTER, self.cashflow_interval / 10), run_at_start=True)
+            logger.info(f"✅ Cash flow ingestion job scheduled (interval: {self.cashflow_interval}s)")
+
+        for name, (func, interval, options) in registered_jobs().items():
+            self.scheduler.add(name, self._in_app_context(name, func), interval, **options)
+            logger.info(f"✅ Job {name} scheduled (interval: {interval}s)")
+
+    def _start_balance_refresh(self):
+        """Balance updates: a scheduler job (the asyncio engine overrides this)"""
+        self.scheduler.add('balance', self._balance_job, self.balance_interval, run_at_start=True)
+        logger.info(f"✅ Balance update job scheduled (interval: {self.balance_interval}s)")
+
+    def _in_app_context(self, name, func):
+        """Wrap a registered job: app context and per-cycle SQL statistics"""
+        def run():
+            with self.app.app_context(), query_stats.collect(f'job: {name}'):
+                func()
+        return run
 
     def stop(self):
-        """Stop the auto-refresh service"""
+        """Stop the auto-refresh service (waits up to 5 s for runs in progress)"""
         self.running = False
-        if self.balance_thread:
-            self.balance_thread.join(timeout=5)
-        if self.snapshot_thread:
-            self.snapshot_thread.join(timeout=5)
+        self.scheduler.stop(timeout=5)
+        if self.leader_election:
+            self.leader_election.release()
         logger.info("🛑 Auto-refresh service stopped")
 
-    def _balance_update_loop(self):
-        """Balance update loop - runs every 10 seconds"""
-        while self.running:
-            try:
-                with self.app.app_context():
-                    self._update_last_balance()
-
-                # Sleep for interval
-                time.sleep(self.balance_interval)
-
-            except Exception as e:
-                logger.error(f"❌ Balance update error: {e}")
-                time.sleep(self.balance_interval)
-
-    def _snapshot_loop(self):
-        """Snapshot creation loop - runs every 30 minutes"""
-        while self.running:
-            try:
-                with self.app.app_context():
-                    self._create_snapshot()
+    def _balance_job(self):
+        """Balance update job - runs every balance_interval seconds"""
+        with self.app.app_context(), self._maybe_profile('refresh-cycle'), \
+                query_stats.collect('cycle: balance refresh'):
+            self._update_last_balance()
+
+    def _maybe_profile(self, name):
+        """Sampled cProfile capture of one cycle (no-op unless profiling is enabled)"""
+        profiler = get_profiler(self.app)
+        return profiler.maybe(name) if profiler else nullcontext()
+
+    def _snapshot_job(self):
+        """Snapshot job - backfill on the first run, then one snapshot per interval boundary"""
+        if self._snapshot_scheduler is None:
+            self._backfill_snapshots()
+            return
 
-                # Sleep for interval
-                time.sleep(self.snapshot_interval)
+        # The scheduler never runs an aligned job before its boundary: the
+        # current bucket is the boundary this run was scheduled for
+        boundary = self._snapshot_scheduler.floor(self.clock.now())
+        if boundary == self._last_boundary:
+            return
+        self._last_boundary = boundary
+        with self.app.app_context(), query_stats.collect('cycle: snapshot'):
+            self._create_snapshot(timestamp=boundary)
 
-            except Exception as e:
-                logger.error(f"❌ Snapshot creation error: {e}")
-                time.sleep(self.snapshot_interval)
+    def _backfill_snapshots(self):
+        """Create the first snapshot of a fresh install, or fill the gaps left by downtime"""
+        started = self.clock.now()  # Buckets up to this one are covered
+        try:
+            with self.app.app_context(), query_stats.collect('cycle: snapshot backfill'):
+                self._snapshot_scheduler = self._build_scheduler()
+                if Snapshot.query.first() is None:
+                    # Fresh install: don't wait for the first boundary, but stamp the
+                    # snapshot on the current one so the next bucket follows it
+                    self._create_snapshot(timestamp=self._snapshot_scheduler.floor(started))
+                else:
+                    # Fill the gaps left by downtime before resuming the schedule
+                    self._snapshot_scheduler.backfill(PerformanceTracker(None))
+        except Exception as e:
+            logger.error(f"❌ Snapshot backfill error: {e}")
+        finally:
+            self._snapshot_scheduler = self._snapshot_scheduler or \
+                SnapshotScheduler(self.snapshot_interval, clock=self.clock)
+            self._last_boundary = self._snapshot_scheduler.floor(started)
+
+    def _cashflow_job(self):
+        """Cash flow ingestion job - imports new deposits/withdrawals"""
+        with self.app.app_context(), query_stats.collect('cycle: cash flow ingestion'):
+            self._ingester = self._ingester or self._build_ingester()
+            self._ingester.ingest()
+
+    def _build_ingester(self):
+        """CashFlowIngester wired to the trader's client"""
+        trader = session_manager.get_trader()
+        return CashFlowIngester(
+            BinanceHistorySource(trader.client),
+            self.kline_source or BinanceKlineSource(trader.client),
+            trader.all_symbols,
+            clock=self.clock,
+            since=self.cashflow_since
+        )
+
+    def _build_scheduler(self):
+        """SnapshotScheduler wired to the trader's symbols and klines"""
+        kline_source = self.kline_source
+        symbols = []
+        if session_manager.is_initialized():
+            trader = session_manager.get_trader()
+            symbols = trader.all_symbols
+            if kline_source is None:
+                kline_source = BinanceKlineSource(trader.client)
+
+        return SnapshotScheduler(
+            self.snapshot_interval,
+            clock=self.clock,
+            kline_source=kline_source,
+            symbols=symbols,
+            max_backfill=self.max_backfill
+        )
 
     def _update_last_balance(self):
         """Fetch balances from Binance and update last_balance table"""
+        started = time.perf_counter()
         try:
             trader = session_manager.get_trader()
             balances_data = trader.get_all_balances_usd(min_value=0.0)
+            self._store_balances(balances_data, started)
 
-            if not balances_data:
-                logger.warning("No balances received from Binance")
-                return
+        except Exception as e:
+            REFRESH_ERRORS.inc()
+            logger.error(f"Error updating last_balance: {e}")
+            db.session.rollback()
+
+    def _store_balances(self, balances_data, started):
+        """
+        Write a valuation to last_balance and the price board (requires app context)
 
-            # Calculate total USD value for percentages
-            total_usd = sum(data['usd_value'] for data in balances_data.values())
+        Args:
+            balances_data: {asset: {'balance', 'price', 'usd_value'}}
+            started: perf_counter() at the start of the cycle (phase='total')
+        """
+        if not balances_data:
+            logger.warning("No balances received from Binance")
+            return
 
-            # Update or insert each asset in last_balance table
-            timestamp_int = int(datetime.utcnow().strftime('%Y%m%d%H%M'))
+        write_started = time.perf_counter()
 
-            for asset, data in balances_data.items():
-                percentage = (data['usd_value'] / total_usd * 100) if total_usd > 0 else 0
+        # Calculate total USD value for percentages
+        total_usd = sum(data['usd_value'] for data in balances_data.values())
 
-                last_balance = LastBalance.query.filter_by(asset=asset).first()
+        # Update or insert each asset in last_balance table
+        timestamp_int = PerformanceTracker.datetime_to_timestamp(self.clock.now())
 
-                if last_balance:
-                    # Update existing
-                    last_balance.balance = data['balance']
-                    last_balance.usd_value = data['usd_value']
-                    last_balance.percentage = percentage
-                    last_balance.timestamp = timestamp_int
-                else:
-                    # Insert new
-                    last_balance = LastBalance(
-                        asset=asset,
-                        balance=data['balance'],
-                        usd_value=data['usd_value'],
-                        percentage=percentage,
-                        timestamp=timestamp_int
-                    )
-                    db.session.add(last_balance)
+        for asset, data in balances_data.items():
+            percentage = (data['usd_value'] / total_usd * 100) if total_usd > 0 else 0
 
-            db.session.commit()
+            last_balance = LastBalance.query.filter_by(asset=asset).first()
 
-            self.last_balance_update = datetime.utcnow()
-            self.balance_refresh_count += 1
+            if last_balance:
+                # Update existing
+                last_balance.balance = data['balance']
+                last_balance.usd_value = data['usd_value']
+                last_balance.percentage = percentage
+                last_balance.timestamp = timestamp_int
+            else:
+                # Insert new
+                last_balance = LastBalance(
+                    asset=asset,
+                    balance=data['balance'],
+                    usd_value=data['usd_value'],
+                    percentage=percentage,
+                    timestamp=timestamp_int
+                )
+                db.session.add(last_balance)
+
+        db.session.commit()
+
+        # Publish to the shared board so API workers can skip SQLite
+        board = get_price_board(self.app)
+        if board:
+            board.publish({
+                asset: {
+                    **data,
+                    'percentage': (data['usd_value'] / total_usd * 100) if total_usd > 0 else 0
+                }
+                for asset, data in balances_data.items()
+            }, updated_at=to_epoch_ms(self.clock.now()) / 1000)
 
-            logger.info(f"📊 Balance update #{self.balance_refresh_count}: ${total_usd:.2f} ({len(balances_data)} assets)")
+        finished = time.perf_counter()
+        REFRESH_DURATION.observe(finished - write_started, phase='write')
+        REFRESH_DURATION.observe(finished - started, phase='total')
 
-        except Exception as e:
-            logger.error(f"Error updating last_balance: {e}")
-            db.session.rollback()
+        self.last_balance_update = self.clock.now()
+        self.balance_refresh_count += 1
+
+        logger.info(f"📊 Balance update #{self.balance_refresh_count}: ${total_usd:.2f} ({len(balances_data)} assets)")
+
+    def _create_snapshot(self, timestamp=None):
+        """
+        Read last_balance and create snapshot with TWR/P&L calculations
 
-    def _create_snapshot(self):
-        """Read last_balance and create snapshot with TWR/P&L calculations"""
+        Args:
+            timestamp: Snapshot datetime (default: now)
+        """
         try:
             # Get balances from last_balance table
             last_balances = LastBalance.query.all()
@@ -167,14 +350,13 @@ class AutoRefreshService:
                 for lb in last_balances
             }
 
-            # Use PerformanceTracker to create snapshot with TWR/P&L
-            trader = session_manager.get_trader()
-            tracker = PerformanceTracker(trader)
+            # Use PerformanceTracker to create snapshot with TWR/P&L (database only)
+            tracker = PerformanceTracker(None)
 
-            success = tracker.save_current_snapshot(balances=balances)
+            success = tracker.save_current_snapshot(balances=balances, timestamp=timestamp)
 
             if success:
-                self.last_snapshot_time = datetime.utcnow()
+                self.last_snapshot_time = self.clock.now()
                 self.snapshot_count += 1
                 logger.info(f"📸 Snapshot #{self.snapshot_count} created from last_balance")
             else:
@@ -201,7 +383,26 @@ def start_auto_refresh(app):
         balance_interval = app.config.get('BALANCE_UPDATE_INTERVAL', 30)
         snapshot_interval = app.config.get('SNAPSHOT_INTERVAL', 3600)
 
-        auto_refresh_service = AutoRefreshService(app, balance_interval, snapshot_interval)
+        # Every worker starts the service, only the lock holder runs the loops
+        lock_file = app.config.get('LEADER_LOCK_FILE')
+        leader_election = LeaderElection(lock_file) if lock_file else None
+
+        service_class = AutoRefreshService
+        engine = app.config.get('REFRESH_ENGINE', 'threads')
+        if engine == 'asyncio':
+            from services.async_refresh import AsyncRefreshService
+            service_class = AsyncRefreshService
+        elif engine != 'threads':
+            logger.warning(f"⚠️  Unknown REFRESH_ENGINE {engine!r}, using threads")
+
+        auto_refresh_service = service_class(
+            app, balance_interval, snapshot_interval,
+            leader_election=leader_election,
+            leader_retry_interval=app.config.get('LEADER_RETRY_INTERVAL', 5),
+            max_backfill=app.config.get('SNAPSHOT_BACKFILL_MAX', 720),
+            cashflow_interval=app.config.get('CASHFLOW_SYNC_INTERVAL') if app.config.get('CASHFLOW_AUTO_INGEST') else None,
+            cashflow_since=app.config.get('CASHFLOW_INGEST_SINCE')
+        )
         auto_refresh_service.start()
 
     return auto_refresh_service
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Cash Flow Ingester - Import deposits/withdrawals from Binance automatically
+Pages through deposit and withdraw history from a persisted cursor, values each
+flow at its own timestamp (1m kline), inserts new flows in one batch (deduped
+by tx_id) and recomputes stored TWR/P&L only for the snapshots after the
+earliest new flow.
+"""
+import logging
+from sqlalchemy import insert
+from core.binance_trader import STABLECOINS, price_symbol
+from core.history_reconstruction import (
+    HISTORY_WINDOW, DEPOSIT_PENDING, WITHDRAW_PENDING,
+    deposit_events, withdraw_events, withdraw_time_ms, fetch_history_window
+)
+from core.klines import to_epoch_ms, from_epoch_ms
+from core import portfolio_summary
+from core.performance_tracker import PerformanceTracker
+from db.models import db, CashFlow, SyncCursor
+from utils.clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+
+class CashFlowIngester:
+    """Incremental deposit/withdraw history → cash_flows"""
+
+    def __init__(self, source, kline_source, symbols, clock=None, since=None):
+        """
+        Args:
+            source: BinanceHistorySource (or RecordedHistorySource)
+            kline_source: Object with get_prices(symbol, start, end, interval_seconds)
+            symbols: Tradable symbols used to price non-stable assets
+            clock: Clock with now() (default: get_clock())
+            since: Datetime to start from on the first run (default: now,
+                   so flows entered by hand before activation are not duplicated)
+        """
+        self.source = source
+        self.kline_source = kline_source
+        self.symbols = set(symbols or [])
+        self.clock = clock or get_clock()
+        self.since = since
+
+    def _pages(self, cursor_name, fetch):
+        """
+        Fetch [cursor, now] in HISTORY_WINDOW slices (split further when a
+        slice returns a full page, see fetch_history_window)
+
+        Returns:
+            (rows, next cursor) - the cursor stops at the oldest pending flow
+            so it is picked up again once it completes
+        """
+        now_ms = to_epoch_ms(self.clock.now())
+        start_ms = SyncCursor.get(cursor_name, to_epoch_ms(self.since) if self.since else now_ms)
+        rows = []
+
+        while start_ms < now_ms:
+            end_ms = min(start_ms + int(HISTORY_WINDOW.total_seconds() * 1000), now_ms)
+            rows.extend(fetch_history_window(fetch, start_ms, end_ms))
+            start_ms = end_ms
+
+        return rows, start_ms
+
+    def _usd_price(self, asset, time_ms):
+        """Open price of the 1m candle containing time_ms (None if unknown)"""
+        if asset in STABLECOINS:
+            return 1.0
+        symbol = price_symbol(asset, self.symbols)
+        if not symbol:
+            return None
+
+        minute = from_epoch_ms(time_ms - time_ms % 60000)
+        prices = self.kline_source.get_prices(symbol, minute, minute, 60)
+        return prices.get(minute)
+
+    def ingest(self):
+        """
+        Import new deposits and withdrawals (requires app context)
+
+        Returns:
+            int: Number of cash flows inserted
+        """
+        deposits, deposit_cursor = self._pages('cashflows:deposits', self.source.deposits)
+        withdrawals, withdraw_cursor = self._pages('cashflows:withdrawals', self.source.withdrawals)
+
+        # Don't move past flows that may still complete
+        pending = [d['insertTime'] for d in deposits if d.get('status') in DEPOSIT_PENDING]
+        if pending:
+            deposit_cursor = min(deposit_cursor, min(pending))
+        pending = [withdraw_time_ms(w) for w in withdrawals if w.get('status') in WITHDRAW_PENDING]
+        if pending:
+            withdraw_cursor = min(withdraw_cursor, min(pending))
+
+        events = deposit_events(deposits) + withdraw_events(withdrawals)
+        known = {
+            tx_id for (tx_id,) in db.session.query(CashFlow.tx_id)
+            .filter(CashFlow.tx_id.in_([e['event_id'] for e in events]))
+        } if events else set()
+
+        rows = []
+        for event in events:
+            if event['event_id'] in known:
+                continue
+            price = self._usd_price(event['asset'], event['time_ms'])
+            if price is None:
+                # Retried next run, like pending flows (the kline may not be published yet)
+                logger.warning(f"⚠️  No USD price for {event['asset']}, deferring {event['event_id']}")
+                if event['source'] == 'DEPOSIT':
+                    deposit_cursor = min(deposit_cursor, event['time_ms'])
+                else:
+                    withdraw_cursor = min(withdraw_cursor, event['time_ms'])
+                continue
+            rows.append({
+                'timestamp': PerformanceTracker.datetime_to_timestamp(from_epoch_ms(event['time_ms'])),
+                'amount_usd': round(event['delta'] * price, 2),
+                'type': event['source'],
+                'tx_id': event['event_id']
+            })
+
+        if rows:
+            db.session.execute(insert(CashFlow).prefix_with('OR IGNORE'), rows)
+            portfolio_summary.rebuild()  # OR IGNORE: inserted count unknown
+        SyncCursor.set('cashflows:deposits', deposit_cursor)
+        SyncCursor.set('cashflows:withdrawals', withdraw_cursor)
+        db.session.commit()
+
+        if rows:
+            earliest = PerformanceTracker.timestamp_to_datetime(min(r['timestamp'] for r in rows))
+            logger.info(f"💰 Ingested {len(rows)} cash flows since {earliest}")
+            # Only snapshots after the earliest new flow can change
+            PerformanceTracker(None).recompute_snapshot_metrics(since=earliest)
+
+        return len(rows)
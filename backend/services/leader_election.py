@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Leader Election - Advisory file lock shared by every Gunicorn worker
+Only the worker holding the lock runs the background refresh/snapshot loops.
+The kernel drops the lock when the holder dies, so a waiting worker takes over.
+"""
+import logging
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """Non-blocking advisory lock on a file (one holder per host)"""
+
+    def __init__(self, lock_path):
+        """
+        Args:
+            lock_path: Path of the lock file (must be shared by all workers)
+        """
+        self.lock_path = str(lock_path)
+        self._fd = None
+
+    @property
+    def is_leader(self):
+        """True if this process currently holds the lock"""
+        return self._fd is not None
+
+    def try_acquire(self):
+        """
+        Try to become leader without blocking
+
+        Returns:
+            bool: True if this process holds the lock
+        """
+        if self._fd is not None:
+            return True
+
+        if fcntl is None:
+            # No advisory locks available: assume a single process
+            logger.warning("⚠️  fcntl unavailable, leader election disabled")
+            self._fd = -1
+            return True
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        # Record the holder for debugging (cat the lock file)
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        """Give up leadership (closing the descriptor drops the lock)"""
+        if self._fd is None:
+            return
+        if self._fd >= 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
+
+
+@contextmanager
+def file_lock(lock_path):
+    """
+    Blocking exclusive lock, used to serialize start-up work across workers
+    (e.g. schema creation when N workers boot at the same time)
+    """
+    if fcntl is None:
+        yield
+        return
+
+    fd = os.open(str(lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
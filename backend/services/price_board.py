@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Price Board - Latest valuation shared by all worker processes
+The auto-refresh leader publishes every balance update into a fixed-layout
+memory-mapped file; API workers read it without touching SQLite.
+
+Layout (little-endian):
+    header  : magic (8s) | seq (Q) | count (I) | capacity (I) | updated_at (d)
+    records : asset (16s) | balance (d) | price (d) | usd_value (d) | percentage (d)
+
+Consistency uses a seqlock: the writer makes `seq` odd while it rewrites the
+records and even again when done. A reader retries if `seq` was odd or
+changed while it was copying the records out.
+
+The default board file is named after the database, so two apps on one host
+never share a board. A board older than PRICE_BOARD_MAX_AGE (default: three
+balance intervals) is stale: the leader died or its refreshes fail, readers
+fall back to the database.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from utils.clock import get_clock
+from utils.timestamps import EPOCH
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PFBOARD1'
+HEADER = struct.Struct('<8sQIId')
+RECORD = struct.Struct('<16sdddd')
+SEQ = struct.Struct('<Q')
+SEQ_OFFSET = 8
+
+
+class PriceBoard:
+    """Single-writer / multi-reader seqlock board backed by a shared file"""
+
+    def __init__(self, path, capacity=512, max_age=None, clock=None):
+        """
+        Args:
+            path: Board file (tmpfs such as /dev/shm is ideal)
+            capacity: Maximum number of asset records
+            max_age: Seconds after which read() ignores a publication (None = never)
+            clock: Clock dating the publications (default: get_clock())
+        """
+        self.path = str(path)
+        self.capacity = capacity
+        self.max_age = max_age
+        self.clock = clock
+        self.size = HEADER.size + capacity * RECORD.size
+        self._mm = None
+        self._writable = False
+
+    def _open(self, writable):
+        """Map the board file, creating it for the writer"""
+        if self._mm is not None and (self._writable or not writable):
+            return True
+
+        if writable:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size != self.size:
+                    os.ftruncate(fd, self.size)
+                mm = mmap.mmap(fd, self.size, access=mmap.ACCESS_WRITE)
+            finally:
+                os.close(fd)
+            if mm[:8] != MAGIC:
+                HEADER.pack_into(mm, 0, MAGIC, 0, 0, self.capacity, 0.0)
+        else:
+            if not os.path.exists(self.path):
+                return False
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                if os.fstat(fd).st_size < HEADER.size:
+                    return False
+                mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+            if mm[:8] != MAGIC:
+                mm.close()
+                return False
+
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = mm
+        self._writable = writable
+        return True
+
+    def publish(self, balances, updated_at=None):
+        """
+        Publish the latest valuation (writer side, auto-refresh leader only)
+
+        Args:
+            balances: {asset: {'balance', 'price', 'usd_value', 'percentage'}}
+            updated_at: Epoch seconds of the valuation (default: now)
+        """
+        self._open(writable=True)
+        mm = self._mm
+
+        if len(balances) > self.capacity:
+            logger.warning(f"⚠️  Price board full ({len(balances)} > {self.capacity} assets), readers use the database")
+            balances = {}
+
+        seq = SEQ.unpack_from(mm, SEQ_OFFSET)[0]
+        if seq % 2:
+            seq += 1  # A previous writer died mid-update
+        SEQ.pack_into(mm, SEQ_OFFSET, seq + 1)
+
+        offset = HEADER.size
+        for asset, data in balances.items():
+            RECORD.pack_into(
+                mm, offset,
+                asset.encode('ascii', 'replace')[:16],
+                data['balance'],
+                data.get('price', 0.0),
+                data['usd_value'],
+                data.get('percentage', 0.0)
+            )
+            offset += RECORD.size
+
+        HEADER.pack_into(
+            mm, 0, MAGIC, seq + 1, len(balances), self.capacity,
+            updated_at if updated_at is not None else time.time()
+        )
+        SEQ.pack_into(mm, SEQ_OFFSET, seq + 2)
+
+    def read(self, retries=100):
+        """
+        Read a consistent copy of the board (any process)
+
+        Returns:
+            dict: {'updated_at': float, 'balances': [...]} or None if the board
+                  is missing, empty, stale or never stabilised (caller falls back to DB)
+        """
+        if not self._open(writable=False):
+            return None
+        mm = self._mm
+
+        for attempt in range(retries):
+            if attempt:
+                time.sleep(0)  # Let the writer finish (yields under gevent)
+
+            magic, seq, count, capacity, updated_at = HEADER.unpack_from(mm, 0)
+            if seq % 2:
+                continue
+
+            records = [
+                RECORD.unpack_from(mm, HEADER.size + i * RECORD.size)
+                for i in range(min(count, capacity))
+            ]
+
+            if SEQ.unpack_from(mm, SEQ_OFFSET)[0] != seq:
+                continue
+
+            if seq == 0 or not records:
+                return None
+
+            if self.max_age is not None:
+                age = ((self.clock or get_clock()).now() - EPOCH).total_seconds() - updated_at
+                if age > self.max_age:
+                    logger.debug(f"Price board stale ({age:.0f}s old), falling back to database")
+                    return None
+
+            return {
+                'updated_at': updated_at,
+                'balances': [
+                    {
+                        'asset': asset.rstrip(b'\0').decode('ascii'),
+                        'balance': balance,
+                        'price': price,
+                        'usd_value': usd_value,
+                        'percentage': percentage
+                    }
+                    for asset, balance, price, usd_value, percentage in records
+                ]
+            }
+
+        logger.warning("⚠️  Price board busy, falling back to database")
+        return None
+
+    def close(self):
+        """Unmap the board file"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+# Per-process board instance (one mapping per worker)
+_price_board = None
+
+
+def default_board_path(database_uri):
+    """Board file of a database: tmpfs when available, named after the database URI"""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    digest = hashlib.sha1(database_uri.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(directory, f'portfolio-price-board-{digest}.bin')
+
+
+def get_price_board(app):
+    """
+    Get this process's PriceBoard for the app configuration
+
+    Returns:
+        PriceBoard or None if disabled (PRICE_BOARD_FILE empty)
+    """
+    global _price_board
+
+    path = app.config.get('PRICE_BOARD_FILE')
+    if path is None:
+        path = default_board_path(app.config['SQLALCHEMY_DATABASE_URI'])
+    if not path:
+        return None
+
+    if _price_board is None or _price_board.path != str(path):
+        max_age = app.config.get('PRICE_BOARD_MAX_AGE') or 3 * app.config.get('BALANCE_UPDATE_INTERVAL', 30)
+        _price_board = PriceBoard(path, app.config.get('PRICE_BOARD_CAPACITY', 512), max_age=max_age)
+
+    return _price_board
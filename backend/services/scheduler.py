@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Scheduler - Periodic background jobs on one dispatcher thread
+Jobs wait in a priority queue ordered by deadline. The dispatcher sleeps on a
+condition until the earliest one is due, so stop() and newly added jobs wake
+it immediately instead of after a full interval. Each run executes in its own
+worker thread, so a slow snapshot never delays the next balance refresh.
+
+Deadlines are kept on a fixed grid (previous deadline + interval, measured on
+the monotonic clock), so the job's own run time does not make it drift.
+Aligned jobs (align=True) run on wall-clock multiples of their interval
+(e.g. every hour at :00 UTC) and never before the boundary.
+
+Per job:
+- overlap: what happens when a deadline arrives while the previous run is
+  still going. 'skip' drops it (counted as missed), 'queue' runs once more as
+  soon as the current run finishes, 'concurrent' starts another run.
+- jitter: random delay of up to `jitter` seconds added to each run (spreads
+  calls to Binance when several hosts share an API key); the grid is unchanged.
+- stats: runs, failures, run time, lateness and missed deadlines
+  (GET /api/admin/jobs, portfolio_job_* metrics).
+
+Other modules add jobs with register_job(); the auto-refresh service
+schedules them next to its own while this process is the leader.
+"""
+import heapq
+import itertools
+import logging
+import random
+import threading
+from utils.clock import get_clock
+from utils.metrics import JOB_DURATION, JOB_FAILURES, JOB_MISSED
+from utils.timestamps import EPOCH
+
+logger = logging.getLogger(__name__)
+
+OVERLAP_SKIP = 'skip'
+OVERLAP_QUEUE = 'queue'
+OVERLAP_CONCURRENT = 'concurrent'
+OVERLAP_POLICIES = (OVERLAP_SKIP, OVERLAP_QUEUE, OVERLAP_CONCURRENT)
+
+# Jobs added by other modules: {name: (func, interval, options)}
+_registry = {}
+
+
+def register_job(name, func, interval, **options):
+    """
+    Add a periodic job run by the elected leader next to the auto-refresh jobs
+    (call at import time, before start_auto_refresh)
+
+    Args:
+        name: Unique job name (stats, metrics and logs)
+        func: Callable without arguments, run inside an app context
+        interval: Seconds between runs
+        **options: Scheduler.add options (align, jitter, overlap, run_at_start)
+
+    Returns:
+        func (usable as a plain call or after the function definition)
+    """
+    if name in _registry:
+        raise ValueError(f"Job {name!r} already registered")
+    _registry[name] = (func, interval, options)
+    return func
+
+
+def registered_jobs():
+    """{name: (func, interval, options)} of the jobs added with register_job()"""
+    return dict(_registry)
+
+
+class Job:
+    """A periodic job and its statistics"""
+
+    def __init__(self, name, func, interval, align=False, jitter=0, overlap=OVERLAP_SKIP, run_at_start=False):
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"overlap must be one of {OVERLAP_POLICIES}, got {overlap!r}")
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.align = align
+        self.jitter = jitter
+        self.overlap = overlap
+        self.run_at_start = run_at_start
+
+        self.runs = 0
+        self.failures = 0
+        self.missed = 0
+        self.running = 0
+        self.last_error = None
+        self.last_started = None  # Wall-clock datetime
+        # Durations and lags are real seconds, also under a simulated clock
+        self.last_duration = None
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.max_lag = 0.0  # Between a deadline and the start of its run
+
+        self.removed = False
+        self._due = None  # Grid deadline: epoch seconds if aligned, else monotonic seconds
+        self._deadline = None  # Monotonic time of the next run (due + jitter)
+        self._pending = False  # 'queue' policy: run again after the current run
+
+    def stats(self, now):
+        """JSON-friendly statistics (now: scheduler monotonic time)"""
+        ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None  # noqa: E731
+        return {
+            'interval': self.interval,
+            'align': self.align,
+            'overlap': self.overlap,
+            'jitter': self.jitter,
+            'running': self.running,
+            'runs': self.runs,
+            'failures': self.failures,
+            'missed': self.missed,
+            'last_started': self.last_started.isoformat() if self.last_started else None,
+            'last_duration_ms': ms(self.last_duration),
+            'avg_duration_ms': ms(self.total_duration / self.runs) if self.runs else None,
+            'max_duration_ms': ms(self.max_duration),
+            'max_lag_ms': ms(self.max_lag),
+            'next_run_in': round(self._deadline - now, 3) if self._deadline is not None and not self.removed else None,
+            'last_error': self.last_error
+        }
+
+
+class Scheduler:
+    """Runs Jobs at their deadlines from a single dispatcher thread"""
+
+    def __init__(self, clock=None, name='scheduler', seed=None):
+        """
+        Args:
+            clock: Clock with now()/monotonic() and a `speed` (default: get_clock())
+            name: Dispatcher thread name
+            seed: Seed of the jitter generator (tests, simulations)
+        """
+        self.clock = clock or get_clock()
+        self.name = name
+        self.jobs = {}
+        self._queue = []  # (deadline, sequence, job)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._random = random.Random(seed)
+        self._running = False
+        self._thread = None
+        self._workers = set()
+
+    @property
+    def running(self):
+        return self._running
+
+    def add(self, name, func, interval, **options):
+        """
+        Schedule `func` every `interval` seconds
+
+        Args:
+            name: Unique job name
+            func: Callable without arguments (exceptions are logged and counted)
+            interval: Seconds between runs
+            **options: align, jitter, overlap, run_at_start (see Job)
+
+        Returns:
+            Job
+        """
+        job = Job(name, func, interval, **options)
+        with self._cond:
+            if name in self.jobs:
+                raise ValueError(f"Job {name!r} already scheduled")
+            self.jobs[name] = job
+            if job.run_at_start:
+                self._push(job, self.clock.monotonic())
+            else:
+                self._schedule_next(job)
+            self._cond.notify()
+        return job
+
+    def remove(self, name):
+        """Unschedule a job (a run in progress finishes)"""
+        with self._cond:
+            job = self.jobs.pop(name, None)
+            if job is not None:
+                job.removed = True
+                job._pending = False
+                self._cond.notify()
+        return job
+
+    def start(self):
+        """Start the dispatcher thread"""
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """
+        Stop dispatching and wait up to `timeout` seconds for runs in progress
+        (the dispatcher wakes up at once, whatever the intervals)
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            workers = list(self._workers)
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        for worker in workers:
+            worker.join(timeout=timeout)
+
+    def is_alive(self):
+        """True while the dispatcher thread runs"""
+        return bool(self._thread and self._thread.is_alive())
+
+    def stats(self):
+        """{job name: statistics} of the scheduled jobs"""
+        with self._cond:
+            now = self.clock.monotonic()
+            return {name: job.stats(now) for name, job in self.jobs.items()}
+
+    # Deadlines (called with the condition held)
+
+    def _push(self, job, deadline):
+        job._deadline = deadline
+        heapq.heappush(self._queue, (deadline, next(self._sequence), job))
+
+    def _now_due(self, job):
+        """Current time in the job's grid: epoch seconds if aligned, else monotonic"""
+        if job.align:
+            return (self.clock.now() - EPOCH).total_seconds()
+        return self.clock.monotonic()
+
+    def _schedule_next(self, job):
+        """Advance the job's grid deadline past now, counting the deadlines skipped"""
+        now = self._now_due(job)
+        if job._due is None:
+            job._due = now - now % job.interval + job.interval if job.align else now + job.interval
+        else:
+            job._due += job.interval
+            if job._due <= now:
+                late = int((now - job._due) // job.interval) + 1
+                job._due += late * job.interval
+                self._missed(job, late, 'late')
+
+        jitter = self._random.uniform(0, job.jitter) if job.jitter else 0
+        self._push(job, self.clock.monotonic() + (job._due - now) + jitter)
+
+    def _missed(self, job, count, reason):
+        job.missed += count
+        JOB_MISSED.inc(count, job=job.name, reason=reason)
+        logger.warning(f"⏭️  Job {job.name}: {count} deadline(s) missed ({reason})")
+
+    # Dispatcher
+
+    def _run(self):
+        with self._cond:
+            while self._running:
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+
+                deadline, _, job = self._queue[0]
+                delay = deadline - self.clock.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay / self.clock.speed)
+                    continue
+
+                heapq.heappop(self._queue)
+                if job.removed or job._deadline != deadline:
+                    continue  # Removed or rescheduled since it was queued
+
+                if job.align and job._due is not None:
+                    early = job._due - self._now_due(job)
+                    if early > 0:  # Monotonic and wall clocks disagree: wait for the boundary
+                        self._push(job, self.clock.monotonic() + early)
+                        continue
+
+                self._dispatch(job, deadline)
+                self._schedule_next(job)
+
+    def _dispatch(self, job, deadline):
+        """Start a run, or apply the overlap policy"""
+        if job.running and job.overlap != OVERLAP_CONCURRENT:
+            if job.overlap == OVERLAP_QUEUE and not job._pending:
+                job._pending = True
+            else:
+                self._missed(job, 1, 'overlap')
+            return
+
+        job.running += 1
+        worker = threading.Thread(target=self._work, args=(job, deadline), name=f"job-{job.name}", daemon=True)
+        self._workers.add(worker)
+        worker.start()
+
+    def _work(self, job, deadline):
+        """Worker thread: run the job (again while a queued run is pending)"""
+        while True:
+            self._execute(job, deadline)
+            with self._cond:
+                if job._pending and self._running and not job.removed:
+                    job._pending = False
+                    deadline = self.clock.monotonic()
+                    continue
+                job.running -= 1
+                self._workers.discard(threading.current_thread())
+                return
+
+    def _execute(self, job, deadline):
+        started = self.clock.monotonic()
+        job.max_lag = max(job.max_lag, (started - deadline) / self.clock.speed)
+        job.last_started = self.clock.now()
+        status = 'ok'
+        try:
+            job.func()
+        except Exception as e:
+            status = 'error'
+            job.failures += 1
+            job.last_error = str(e)
+            JOB_FAILURES.inc(job=job.name)
+            logger.error(f"❌ Job {job.name} failed: {e}")
+
+        seconds = (self.clock.monotonic() - started) / self.clock.speed
+        job.runs += 1
+        job.last_duration = seconds
+        job.total_duration += seconds
+        job.max_duration = max(job.max_duration, seconds)
+        JOB_DURATION.observe(seconds, job=job.name, status=status)
@@ -2,44 +2,111 @@
 """
 Session Manager - Singleton for Binance Client
 Manages a single instance of BinanceTrader across the application
+The client can be created lazily: initialize(lazy=True) only keeps the
+credentials and the first get_trader() connects (python-binance import, ping,
+exchange info), so workers answer /health without waiting for Binance.
+A failed connection is not retried before a backoff (doubling from
+CONNECT_RETRY_MIN to CONNECT_RETRY_MAX seconds): callers get the cached error
+at once instead of each waiting for the timeouts and retries again.
 """
 import logging
+import threading
+import time
 from core.binance_trader import BinanceTrader
 
 logger = logging.getLogger(__name__)
 
+CONNECT_RETRY_MIN = 5  # seconds before the first retry after a failed connection
+CONNECT_RETRY_MAX = 300
+
 
 class SessionManager:
     """Singleton manager for BinanceTrader instance"""
 
     _instance = None
     _trader = None
+    _credentials = None
+    _lock = threading.Lock()
+    # Last failed connection: (monotonic time of the next attempt, backoff, error)
+    _failure = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(SessionManager, cls).__new__(cls)
         return cls._instance
 
-    def initialize(self, api_key, api_secret, testnet=False):
-        """Initialize BinanceTrader with API credentials"""
-        if self._trader is None:
+    def initialize(self, api_key, api_secret, testnet=False, api_url=None, lazy=False, **trader_options):
+        """
+        Initialize BinanceTrader with API credentials
+
+        Args:
+            api_url: Optional endpoint override
+            lazy: Only store the credentials; connect on the first get_trader()
+            **trader_options: HTTP settings passed to BinanceTrader (timeout, max_retries,
+                              pool_size, hedge_percentile)
+        """
+        if self._trader is not None:
+            return True
+        self._credentials = (api_key, api_secret, testnet, api_url, trader_options)
+        self._failure = None
+        if lazy:
+            return True
+        return self._connect() is not None
+
+    def _connect(self):
+        """Create the trader from the stored credentials (None on failure, retried after a backoff)"""
+        with self._lock:
+            if self._trader is not None or self._credentials is None or self._backing_off():
+                return self._trader
+            api_key, api_secret, testnet, api_url, trader_options = self._credentials
             try:
-                self._trader = BinanceTrader(api_key, api_secret, testnet)
+                self._trader = BinanceTrader(api_key, api_secret, testnet, api_url=api_url, **trader_options)
+                self._failure = None
                 logger.info("✅ BinanceTrader initialized successfully")
-                return True
             except Exception as e:
-                logger.error(f"❌ Failed to initialize BinanceTrader: {e}")
-                return False
-        return True
+                backoff = min(self._failure[1] * 2, CONNECT_RETRY_MAX) if self._failure else CONNECT_RETRY_MIN
+                self._failure = (time.monotonic() + backoff, backoff, e)
+                logger.error(f"❌ Failed to initialize BinanceTrader (retry in {backoff}s): {e}")
+            return self._trader
+
+    def _backing_off(self):
+        """True while the last failed connection's backoff runs"""
+        return self._failure is not None and time.monotonic() < self._failure[0]
+
+    def get_credentials(self):
+        """
+        Settings given to initialize() (for clients other than BinanceTrader)
+
+        Returns:
+            {api_key, api_secret, testnet, api_url, **trader_options} or None
+        """
+        if self._credentials is None:
+            return None
+        api_key, api_secret, testnet, api_url, trader_options = self._credentials
+        return {'api_key': api_key, 'api_secret': api_secret, 'testnet': testnet, 'api_url': api_url,
+                **trader_options}
+
+    def set_trader(self, trader):
+        """Use an existing trader (offline stubs for benchmarks and simulations)"""
+        self._trader = trader
 
     def get_trader(self):
-        """Get the BinanceTrader instance"""
-        if self._trader is None:
+        """Get the BinanceTrader instance (connects first when initialized lazily)"""
+        trader = self._trader or self._connect()
+        if trader is None:
+            if self._failure is not None:
+                retry_in = max(0.0, self._failure[0] - time.monotonic())
+                raise RuntimeError(f"SessionManager could not connect to Binance "
+                                   f"(next attempt in {retry_in:.0f}s): {self._failure[2]}")
             raise RuntimeError("SessionManager not initialized. Call initialize() first.")
-        return self._trader
+        return trader
 
     def is_initialized(self):
-        """Check if trader is initialized"""
+        """Check if trader is initialized (or configured to connect on first use)"""
+        return self._trader is not None or self._credentials is not None
+
+    def is_connected(self):
+        """Check if the Binance client has been created"""
         return self._trader is not None
 
 
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Snapshot Scheduler - Wall-clock aligned snapshots with missed-snapshot backfill
+Snapshots are taken on interval boundaries (e.g. every hour at :00 UTC).
+On start-up, buckets missed during downtime are backfilled by valuing the
+last known holdings (last_balance) at historical kline prices (an asset
+without a kline at a bucket keeps its last known price).
+"""
+import logging
+from datetime import datetime, timedelta
+from core.binance_trader import STABLECOINS, price_symbol
+from core.performance_tracker import PerformanceTracker
+from db.models import Snapshot, LastBalance
+from utils.clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class SnapshotScheduler:
+    """Aligns snapshots on `interval` boundaries and fills gaps"""
+
+    def __init__(self, interval=3600, clock=None, kline_source=None, symbols=None, max_backfill=720):
+        """
+        Args:
+            interval: Snapshot interval in seconds (boundaries are multiples since epoch)
+            clock: Clock with now()/sleep() (default: get_clock())
+            kline_source: Object with get_prices(symbol, start, end, interval_seconds)
+            symbols: Tradable symbols used to pick each asset's price pair
+            max_backfill: Maximum number of missed buckets to backfill
+        """
+        self.interval = interval
+        self.clock = clock or get_clock()
+        self.kline_source = kline_source
+        self.symbols = set(symbols or [])
+        self.max_backfill = max_backfill
+
+    def floor(self, dt):
+        """Start of the bucket containing dt"""
+        seconds = int((dt - EPOCH).total_seconds())
+        return EPOCH + timedelta(seconds=seconds - seconds % self.interval)
+
+    def next_boundary(self, now=None):
+        """First boundary strictly after now"""
+        now = now or self.clock.now()
+        return self.floor(now) + timedelta(seconds=self.interval)
+
+    def sleep_until(self, boundary):
+        """Sleep until the boundary is reached on the clock"""
+        self.clock.sleep((boundary - self.clock.now()).total_seconds())
+
+    def missing_buckets(self, last_snapshot_dt, now=None):
+        """
+        Buckets with no snapshot between the last snapshot and now (inclusive of
+        the current bucket), oldest first, capped to the `max_backfill` most recent
+
+        Args:
+            last_snapshot_dt: Datetime of the latest snapshot (None = no history)
+        """
+        if last_snapshot_dt is None:
+            return []
+
+        now = now or self.clock.now()
+        bucket = self.floor(last_snapshot_dt) + timedelta(seconds=self.interval)
+        current = self.floor(now)
+
+        buckets = []
+        while bucket <= current:
+            buckets.append(bucket)
+            bucket += timedelta(seconds=self.interval)
+
+        if len(buckets) > self.max_backfill:
+            logger.warning(f"⚠️  {len(buckets)} missed snapshots, backfilling the last {self.max_backfill}")
+            buckets = buckets[-self.max_backfill:]
+
+        return buckets
+
+    def _historical_prices(self, assets, start, end):
+        """
+        Batch-fetch one price series per held asset
+
+        Returns:
+            {asset: {datetime: price}} (stablecoins and unpriceable assets omitted)
+        """
+        prices = {}
+        for asset in assets:
+            if asset in STABLECOINS:
+                continue
+            symbol = price_symbol(asset, self.symbols)
+            if not symbol:
+                continue
+            try:
+                prices[asset] = self.kline_source.get_prices(symbol, start, end, self.interval)
+            except Exception as e:
+                logger.error(f"Error fetching klines for {symbol}: {e}")
+        return prices
+
+    def value_holdings(self, holdings, bucket, prices, last_prices):
+        """
+        Value {asset: quantity} at a bucket timestamp
+
+        An asset without a kline at the bucket keeps its last known price:
+        leaving it out would undervalue the snapshot and show a loss that
+        reverses on the next priced bucket.
+
+        Args:
+            last_prices: {asset: price} known before this bucket, updated in place
+
+        Returns:
+            {asset: {'balance', 'usd_value'}} in PerformanceTracker format,
+            or None when an asset has never been priced
+        """
+        balances = {}
+        for asset, quantity in holdings.items():
+            if asset in STABLECOINS:
+                price = 1.0
+            else:
+                series = prices.get(asset)
+                price = series.get(bucket) if series else None
+                if price is None:
+                    price = last_prices.get(asset)
+                    if price is None:
+                        return None
+                last_prices[asset] = price
+            balances[asset] = {'balance': quantity, 'usd_value': quantity * price}
+        return balances
+
+    def backfill(self, tracker):
+        """
+        Create the snapshots missed since the latest one (requires app context)
+
+        Args:
+            tracker: PerformanceTracker used to store snapshots with TWR/P&L
+
+        Returns:
+            int: Number of snapshots created
+        """
+        if self.kline_source is None:
+            return 0
+
+        last_snapshot = Snapshot.query.order_by(Snapshot.timestamp.desc()).first()
+        if not last_snapshot:
+            return 0
+
+        buckets = self.missing_buckets(PerformanceTracker.timestamp_to_datetime(last_snapshot.timestamp))
+        if not buckets:
+            return 0
+
+        # Last known holdings (quantities survive downtime, prices do not)
+        last_balances = LastBalance.query.all()
+        holdings = {lb.asset: lb.balance for lb in last_balances}
+        # Prices of the last refresh, carried forward over kline gaps
+        last_prices = {lb.asset: lb.usd_value / lb.balance for lb in last_balances if lb.balance > 0}
+        if not holdings:
+            logger.warning("No balances in last_balance table, cannot backfill snapshots")
+            return 0
+
+        logger.info(f"⏪ Backfilling {len(buckets)} missed snapshots ({buckets[0]} → {buckets[-1]})")
+        prices = self._historical_prices(holdings.keys(), buckets[0], buckets[-1])
+
+        created = 0
+        for bucket in buckets:
+            balances = self.value_holdings(holdings, bucket, prices, last_prices)
+            if balances is None:
+                logger.warning(f"⚠️  No price for every held asset at {bucket}, bucket not backfilled")
+                continue
+            if balances and tracker.save_current_snapshot(balances=balances, timestamp=bucket):
+                created += 1
+
+        logger.info(f"⏪ Backfilled {created}/{len(buckets)} snapshots")
+        return created
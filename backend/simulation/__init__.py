@@ -0,0 +1 @@
+"""Offline simulation tools (fake exchange, accelerated runs)"""
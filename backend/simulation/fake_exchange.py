@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Fake Exchange - Local stand-in for the Binance REST API and user data stream
+Serves the endpoints BinanceTrader and the history/cash flow services call
+(ping, time, exchangeInfo, account, ticker/price, klines, myTrades,
+userDataStream, deposit/withdraw history) from a deterministic random-walk
+market, with configurable latency, X-MBX-USED-WEIGHT-1M headers, rate limits
+and error injection.
+
+Usage (from the backend folder):
+    python -m simulation.fake_exchange --port 8765 --assets 50 --latency-ms 80
+    BINANCE_API_URL=http://localhost:8765 BINANCE_API_KEY=x BINANCE_API_SECRET=x python app.py
+"""
+import argparse
+import base64
+import calendar
+import hashlib
+import json
+import logging
+import math
+import random
+import secrets
+import socket
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from core.klines import KLINE_INTERVALS, to_epoch_ms
+from utils.clock import SystemClock
+
+logger = logging.getLogger(__name__)
+
+# A few recognisable assets first, then SIM000, SIM001, ...
+KNOWN_ASSETS = {
+    'BTC': 60000.0, 'ETH': 3000.0, 'BNB': 550.0, 'SOL': 150.0, 'XRP': 0.55,
+    'ADA': 0.45, 'DOGE': 0.12, 'AVAX': 30.0, 'DOT': 6.5, 'LINK': 14.0,
+    'LTC': 80.0, 'TRX': 0.12, 'ATOM': 7.0, 'UNI': 8.0, 'NEAR': 5.0
+}
+QUOTE = 'USDT'
+INTERVAL_SECONDS = {name: seconds for seconds, name in KLINE_INTERVALS.items()}
+INTERVAL_SECONDS['1w'] = 7 * 86400
+
+# Request weight per endpoint (Binance values)
+WEIGHTS = {
+    '/api/v3/ping': 1, '/api/v3/time': 1, '/api/v3/exchangeInfo': 20,
+    '/api/v3/account': 20, '/api/v3/klines': 2, '/api/v3/myTrades': 20,
+    '/api/v3/userDataStream': 2, '/sapi/v1/capital/deposit/hisrec': 1,
+    '/sapi/v1/capital/withdraw/history': 1
+}
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+class FakeMarket:
+    """Assets, random-walk prices and account state of the fake exchange"""
+
+    def __init__(self, assets=20, seed=42, clock=None, step_seconds=60,
+                 daily_volatility=0.03, history_days=30, stable_balance=1000.0, held=None):
+        """
+        Args:
+            assets: Number of non-stable assets (each traded against USDT)
+            held: How many of them the account holds (default: all)
+            seed: Random seed (same seed = same prices and balances)
+            clock: Clock with now() driving prices and server time (default: SystemClock)
+            step_seconds: Resolution of the price walk (60 = 1m klines are exact)
+            daily_volatility: Standard deviation of daily log returns
+            history_days: Prices exist from this many days before start
+            stable_balance: USDT held by the account
+        """
+        self.clock = clock or SystemClock()
+        self.step = step_seconds
+        self._rng = random.Random(seed)
+        self._sigma = daily_volatility * math.sqrt(step_seconds / 86400)
+        self._origin = to_epoch_ms(self.clock.now()) // 1000 // step_seconds * step_seconds - history_days * 86400
+        self._lock = threading.Lock()
+
+        names = list(KNOWN_ASSETS)[:assets] + [f"SIM{i:03d}" for i in range(max(0, assets - len(KNOWN_ASSETS)))]
+        self.assets = names
+        self._walks = {}
+        self.balances = {QUOTE: stable_balance}
+        for i, name in enumerate(names):
+            start = KNOWN_ASSETS.get(name) or math.exp(self._rng.uniform(math.log(0.01), math.log(500)))
+            self._walks[f"{name}{QUOTE}"] = (random.Random(self._rng.random()), array('d', [start]))
+            # Positions worth $300-$5000 so they pass the default dust filter
+            position = round(self._rng.uniform(300, 5000) / start, 8)
+            if held is None or i < held:
+                self.balances[name] = position
+
+        self.deposits = []
+        self.withdrawals = []
+
+    @property
+    def symbols(self):
+        return list(self._walks)
+
+    def now_ms(self):
+        return to_epoch_ms(self.clock.now())
+
+    def _walk(self, symbol, seconds):
+        """(prices, index of `seconds`), extending the walk as time passes"""
+        rng, prices = self._walks[symbol]
+        index = max(0, int(seconds - self._origin) // self.step)
+        if index >= len(prices):
+            with self._lock:
+                while len(prices) <= index:
+                    prices.append(prices[-1] * math.exp(rng.gauss(0, self._sigma)))
+        return prices, index
+
+    def price_at(self, symbol, seconds):
+        """Walk value at `seconds` (epoch)"""
+        prices, index = self._walk(symbol, seconds)
+        return prices[index]
+
+    def price(self, symbol):
+        return self.price_at(symbol, self.now_ms() / 1000)
+
+    def klines(self, symbol, interval, start_ms=None, end_ms=None, limit=500):
+        """Candles in Binance's list format, open times aligned on the interval"""
+        now_ms = self.now_ms()
+        span = interval * 1000
+        end_ms = min(end_ms if end_ms is not None else now_ms, now_ms)
+        if start_ms is None:
+            start_ms = end_ms - span * (limit - 1)
+        first = -(-start_ms // span) * span
+
+        candles = []
+        for open_ms in range(first, end_ms + 1, span):
+            if len(candles) >= limit:
+                break
+            prices, last = self._walk(symbol, (open_ms + span - 1) // 1000)
+            path = prices[self._walk(symbol, open_ms // 1000)[1]:last + 1]
+            candles.append([
+                open_ms, _fmt(path[0]), _fmt(max(path)), _fmt(min(path)), _fmt(path[-1]),
+                '1000.00000000', open_ms + span - 1, _fmt(1000 * path[-1]), 100,
+                '500.00000000', _fmt(500 * path[-1]), '0'
+            ])
+        return candles
+
+    def deposit(self, asset, amount, status=1):
+        """Credit the account and record a deposit (status 1 = success)"""
+        now = self.now_ms()
+        if status == 1:
+            self.balances[asset] = self.balances.get(asset, 0) + amount
+        self.deposits.append({
+            'id': secrets.token_hex(8), 'txId': secrets.token_hex(16), 'coin': asset,
+            'amount': _fmt(amount), 'status': status, 'insertTime': now, 'completeTime': now
+        })
+
+    def withdraw(self, asset, amount, fee=0.0, status=6):
+        """Debit the account and record a withdrawal (status 6 = completed)"""
+        now = self.now_ms()
+        if status == 6:
+            self.balances[asset] = self.balances.get(asset, 0) - amount - fee
+        self.withdrawals.append({
+            'id': secrets.token_hex(8), 'txId': secrets.token_hex(16), 'coin': asset,
+            'amount': _fmt(amount), 'transactionFee': _fmt(fee), 'status': status,
+            'applyTime': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now / 1000)),
+            'completeTime': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now / 1000))
+        })
+
+
+class ExchangeError(Exception):
+    """Error answered to the client as {'code', 'msg'}"""
+
+    def __init__(self, status, code, msg, headers=None):
+        super().__init__(msg)
+        self.status, self.code, self.msg = status, code, msg
+        self.headers = headers or {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # Headers and body are separate writes: avoid the 40 ms delayed-ACK stall
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method):
+        exchange = self.server.exchange
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            params.update({k: v[-1] for k, v in parse_qs(self.rfile.read(length).decode()).items()})
+
+        if url.path.startswith('/ws/') and self.headers.get('Upgrade', '').lower() == 'websocket':
+            return exchange.serve_user_stream(self, url.path[len('/ws/'):])
+
+        exchange.wait_latency()
+        try:
+            weight = exchange.charge(url.path, params)
+            exchange.maybe_fail()
+            body = exchange.handle(method, url.path, params)
+            self._send(200, body, weight)
+        except ExchangeError as e:
+            self._send(e.status, {'code': e.code, 'msg': e.msg}, exchange.used_weight(), e.headers)
+
+    def _send(self, status, body, weight, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('X-MBX-USED-WEIGHT-1M', str(weight))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 128  # Many concurrent clients connect at once (benchmarks.refresh_engines)
+
+
+class FakeExchange:
+    """HTTP/WebSocket server in front of a FakeMarket"""
+
+    def __init__(self, market=None, host='127.0.0.1', port=0, latency_ms=0, jitter_ms=0,
+                 slow_rate=0.0, slow_ms=0, error_rate=0.0, error_statuses=(500, 503, 429), weight_limit=6000,
+                 stream_interval=5.0, seed=42):
+        """
+        Args:
+            market: FakeMarket (default: 20 assets on the system clock)
+            port: TCP port (0 = pick a free one, see .url)
+            latency_ms / jitter_ms: Added delay per request (uniform jitter)
+            slow_rate / slow_ms: Fraction of requests delayed by slow_ms more (latency tail)
+            error_rate: Fraction of requests answered with one of error_statuses
+            weight_limit: Request weight per minute before answering 429
+            stream_interval: Seconds between user stream account updates
+        """
+        self.market = market or FakeMarket(seed=seed)
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.slow_rate = slow_rate
+        self.slow = slow_ms / 1000
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.weight_limit = weight_limit
+        self.stream_interval = stream_interval
+        self.listen_keys = set()
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._weight_lock = threading.Lock()
+        self._weight_minute = None
+        self._weight = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.exchange = self
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"🧪 Fake exchange listening on {self.url} ({len(self.market.assets)} assets)")
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    # --- Request pipeline ---
+
+    def wait_latency(self):
+        delay = self.latency + (self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0)
+        if self.slow_rate and self._rng.random() < self.slow_rate:
+            delay += self.slow
+        if delay > 0:
+            time.sleep(delay)
+
+    def charge(self, path, params):
+        """Add the request's weight to the current minute (429 above the limit)"""
+        if path == '/api/v3/ticker/price':
+            weight = 2 if 'symbol' in params else 4
+        else:
+            weight = WEIGHTS.get(path, 1)
+
+        minute = self.market.now_ms() // 60000
+        with self._weight_lock:
+            self.requests += 1
+            if minute != self._weight_minute:
+                self._weight_minute, self._weight = minute, 0
+            self._weight += weight
+            used = self._weight
+
+        if used > self.weight_limit:
+            retry_after = 60 - (self.market.now_ms() // 1000) % 60
+            raise ExchangeError(429, -1003, f"Too much request weight used; current limit is {self.weight_limit} "
+                                f"request weight per 1 MINUTE.", {'Retry-After': str(retry_after)})
+        return used
+
+    def used_weight(self):
+        with self._weight_lock:
+            return self._weight
+
+    def maybe_fail(self):
+        if self.error_rate and self._rng.random() < self.error_rate:
+            status = self._rng.choice(self.error_statuses)
+            if status == 429:
+                raise ExchangeError(429, -1003, 'Too many requests; injected error.', {'Retry-After': '1'})
+            raise ExchangeError(status, -1000, 'An unknown error occurred while processing the request.')
+
+    def handle(self, method, path, params):
+        market = self.market
+
+        if path == '/api/v3/ping':
+            return {}
+        if path == '/api/v3/time':
+            return {'serverTime': market.now_ms()}
+        if path == '/api/v3/exchangeInfo':
+            return self._exchange_info()
+        if path == '/api/v3/account':
+            return {
+                'makerCommission': 10, 'takerCommission': 10, 'canTrade': True,
+                'canWithdraw': True, 'canDeposit': True, 'updateTime': market.now_ms(),
+                'accountType': 'SPOT', 'permissions': ['SPOT'],
+                'balances': [
+                    {'asset': asset, 'free': _fmt(qty), 'locked': '0.00000000'}
+                    for asset, qty in market.balances.items()
+                ]
+            }
+        if path == '/api/v3/ticker/price':
+            return self._ticker(params)
+        if path == '/api/v3/klines':
+            symbol = self._symbol(params.get('symbol'))
+            interval = INTERVAL_SECONDS.get(params.get('interval'))
+            if interval is None:
+                raise ExchangeError(400, -1120, 'Invalid interval.')
+            return market.klines(
+                symbol, interval,
+                int(params['startTime']) if 'startTime' in params else None,
+                int(params['endTime']) if 'endTime' in params else None,
+                min(int(params.get('limit', 500)), 1000)
+            )
+        if path == '/api/v3/myTrades':
+            self._symbol(params.get('symbol'))
+            return []
+        if path == '/api/v3/userDataStream':
+            if method == 'POST':
+                key = secrets.token_hex(32)
+                self.listen_keys.add(key)
+                return {'listenKey': key}
+            if params.get('listenKey') not in self.listen_keys:
+                raise ExchangeError(400, -1125, 'This listenKey does not exist.')
+            if method == 'DELETE':
+                self.listen_keys.discard(params['listenKey'])
+            return {}
+        if path == '/sapi/v1/capital/deposit/hisrec':
+            return _in_window(market.deposits, 'insertTime', params)
+        if path == '/sapi/v1/capital/withdraw/history':
+            return _in_window(market.withdrawals, None, params)
+
+        raise ExchangeError(404, -1000, f"Unknown endpoint {method} {path}")
+
+    def _exchange_info(self):
+        return {
+            'timezone': 'UTC',
+            'serverTime': self.market.now_ms(),
+            'rateLimits': [{'rateLimitType': 'REQUEST_WEIGHT', 'interval': 'MINUTE',
+                            'intervalNum': 1, 'limit': self.weight_limit}],
+            'symbols': [
+                {'symbol': symbol, 'status': 'TRADING', 'baseAsset': symbol[:-len(QUOTE)],
+                 'quoteAsset': QUOTE, 'baseAssetPrecision': 8, 'quoteAssetPrecision': 8,
+                 'orderTypes': ['LIMIT', 'MARKET'], 'isSpotTradingAllowed': True, 'filters': []}
+                for symbol in self.market.symbols
+            ]
+        }
+
+    def _symbol(self, symbol):
+        if symbol not in self.market.symbols:
+            raise ExchangeError(400, -1121, 'Invalid symbol.')
+        return symbol
+
+    def _ticker(self, params):
+        if 'symbol' in params:
+            symbol = self._symbol(params['symbol'])
+            return {'symbol': symbol, 'price': _fmt(self.market.price(symbol))}
+        if 'symbols' in params:
+            try:
+                symbols = json.loads(params['symbols'])
+            except ValueError:
+                raise ExchangeError(400, -1100, "Illegal characters found in parameter 'symbols'.")
+        else:
+            symbols = self.market.symbols
+        return [{'symbol': self._symbol(s), 'price': _fmt(self.market.price(s))} for s in symbols]
+
+    # --- User data stream ---
+
+    def serve_user_stream(self, handler, listen_key):
+        """WebSocket handshake, then an outboundAccountPosition event every stream_interval"""
+        if listen_key not in self.listen_keys:
+            handler.send_error(404, 'Unknown listenKey')
+            return
+
+        accept = base64.b64encode(hashlib.sha1(
+            (handler.headers['Sec-WebSocket-Key'] + WS_GUID).encode()).digest()).decode()
+        handler.send_response(101, 'Switching Protocols')
+        handler.send_header('Upgrade', 'websocket')
+        handler.send_header('Connection', 'Upgrade')
+        handler.send_header('Sec-WebSocket-Accept', accept)
+        handler.end_headers()
+        handler.close_connection = True
+
+        try:
+            while not self._stopped.is_set() and listen_key in self.listen_keys:
+                now = self.market.now_ms()
+                event = {
+                    'e': 'outboundAccountPosition', 'E': now, 'u': now,
+                    'B': [{'a': asset, 'f': _fmt(qty), 'l': '0.00000000'}
+                          for asset, qty in self.market.balances.items()]
+                }
+                handler.wfile.write(_ws_frame(json.dumps(event).encode()))
+                handler.wfile.flush()
+                self._stopped.wait(self.stream_interval)
+        except (BrokenPipeError, ConnectionResetError, socket.timeout):
+            pass
+
+
+def _fmt(value):
+    return f"{value:.8f}"
+
+
+def _in_window(rows, time_key, params):
+    """History rows inside [startTime, endTime] (withdrawals use applyTime)"""
+    start = int(params.get('startTime', 0))
+    end = int(params.get('endTime', 2 ** 63))
+
+    def row_ms(row):
+        if time_key:
+            return row[time_key]
+        return calendar.timegm(time.strptime(row['applyTime'], '%Y-%m-%d %H:%M:%S')) * 1000
+
+    return [row for row in rows if start <= row_ms(row) <= end]
+
+
+def _ws_frame(payload):
+    """Unmasked final text frame (server -> client)"""
+    length = len(payload)
+    if length < 126:
+        header = bytes([0x81, length])
+    elif length < 65536:
+        header = bytes([0x81, 126]) + length.to_bytes(2, 'big')
+    else:
+        header = bytes([0x81, 127]) + length.to_bytes(8, 'big')
+    return header + payload
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--assets', type=int, default=20, help='Number of non-stable assets listed')
+    parser.add_argument('--held', type=int, help='Number of them held (default: all)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--volatility', type=float, default=0.03, help='Daily volatility of the price walk')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='Fraction of requests delayed by --slow-ms')
+    parser.add_argument('--slow-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failing')
+    parser.add_argument('--weight-limit', type=int, default=6000, help='Request weight allowed per minute')
+    opts = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    market = FakeMarket(assets=opts.assets, seed=opts.seed, daily_volatility=opts.volatility, held=opts.held)
+    exchange = FakeExchange(market, host=opts.host, port=opts.port, latency_ms=opts.latency_ms,
+                            jitter_ms=opts.jitter_ms, slow_rate=opts.slow_rate, slow_ms=opts.slow_ms,
+                            error_rate=opts.error_rate,
+                            weight_limit=opts.weight_limit, seed=opts.seed)
+    try:
+        exchange.start()._thread.join()
+    except KeyboardInterrupt:
+        exchange.stop()
+
+
+if __name__ == '__main__':
+    main()
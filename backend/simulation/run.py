@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Accelerated simulation - Run the real AutoRefreshService loops on a SimulatedClock
+The backend talks to the local fake exchange (random-walk prices on the same
+clock) and a throwaway SQLite database. Every simulated day the runner records
+database growth, API latency and process memory, so drift over months shows up
+in minutes.
+
+Usage (from the backend folder):
+    python -m simulation.run --days 30 --speed 1000
+    python -m simulation.run --days 365 --speed 20000 --balance-interval 300 -o sim.json
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.harness import measure  # noqa: E402
+from simulation.fake_exchange import FakeExchange, FakeMarket  # noqa: E402
+from utils.clock import SimulatedClock, set_clock  # noqa: E402
+
+# Routes timed at every sample (read-only)
+PROBES = [
+    '/api/performance/twr/0',
+    '/api/performance/pnl/0',
+    '/api/performance/stats',
+    '/api/performance/twr-history?days=30',
+    '/api/performance/snapshots',
+    '/api/portfolio/balances',
+]
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def sample(app, db_path, clock, started):
+    """One measurement point"""
+    from db.models import Snapshot, CashFlow
+
+    with app.app_context():
+        snapshots = Snapshot.query.count()
+        cash_flows = CashFlow.query.count()
+
+    client = app.test_client()
+    latency = {
+        path: measure(lambda: client.get(path), min_time=0.05, max_repeats=3)['median']
+        for path in PROBES
+    }
+    return {
+        'sim_time': clock.now().isoformat(),
+        'sim_days': round((clock.now() - started).total_seconds() / 86400, 3),
+        'wall_s': round(clock.elapsed() / clock.speed, 2),
+        'snapshots': snapshots,
+        'cash_flows': cash_flows,
+        'db_bytes': os.path.getsize(db_path),
+        'rss_bytes': rss_bytes(),
+        'latency_s': latency
+    }
+
+
+def run(opts):
+    from app import create_app
+    from services import auto_refresh
+
+    started = datetime.utcnow().replace(second=0, microsecond=0)
+    clock = SimulatedClock(start=started, speed=opts.speed)
+    set_clock(clock)
+
+    market = FakeMarket(assets=opts.assets, seed=opts.seed, clock=clock)
+    exchange = FakeExchange(market, latency_ms=opts.latency_ms, error_rate=opts.error_rate,
+                            weight_limit=10 ** 9, seed=opts.seed).start()
+    report = {
+        'meta': {
+            'date': started.isoformat(),
+            'days': opts.days,
+            'speed': opts.speed,
+            'assets': opts.assets,
+            'balance_interval': opts.balance_interval,
+            'snapshot_interval': opts.snapshot_interval
+        },
+        'samples': []
+    }
+
+    with tempfile.TemporaryDirectory(prefix='portfolio-sim-') as workdir:
+        db_path = os.path.join(workdir, 'sim.db')
+        app = create_app('development', {
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+            'LEADER_LOCK_FILE': os.path.join(workdir, 'sim.lock'),
+            'PRICE_BOARD_FILE': os.path.join(workdir, 'board.bin'),
+            'BINANCE_API_KEY': 'simulation',
+            'BINANCE_API_SECRET': 'simulation',
+            'BINANCE_API_URL': exchange.url,
+            'BALANCE_UPDATE_INTERVAL': opts.balance_interval,
+            'SNAPSHOT_INTERVAL': opts.snapshot_interval,
+            'CASHFLOW_AUTO_INGEST': opts.deposit_every > 0,
+            'CASHFLOW_INGEST_SINCE': started
+        })
+        service = auto_refresh.start_auto_refresh(app)
+
+        end = started + timedelta(days=opts.days)
+        next_sample = started + timedelta(days=opts.sample_days)
+        next_deposit = started + timedelta(days=opts.deposit_every) if opts.deposit_every > 0 else None
+        try:
+            while clock.now() < end:
+                time.sleep(0.05)
+                now = clock.now()
+                if next_deposit and now >= next_deposit:
+                    market.deposit('USDT', opts.deposit_amount)
+                    next_deposit += timedelta(days=opts.deposit_every)
+                if now >= next_sample:
+                    point = sample(app, db_path, clock, started)
+                    report['samples'].append(point)
+                    next_sample += timedelta(days=opts.sample_days)
+                    print(f"📈 day {point['sim_days']:.1f}: {point['snapshots']} snapshots, "
+                          f"{point['db_bytes'] / 1024:.0f} KiB, RSS {point['rss_bytes'] / 2 ** 20:.1f} MiB, "
+                          f"twr/0 {point['latency_s']['/api/performance/twr/0'] * 1000:.1f} ms", file=sys.stderr)
+        finally:
+            service.stop()
+            exchange.stop()
+
+        report['totals'] = {
+            'balance_refreshes': service.balance_refresh_count,
+            'snapshots_created': service.snapshot_count,
+            'exchange_requests': exchange.requests,
+            'wall_s': round(clock.elapsed() / clock.speed, 2)
+        }
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=float, default=30, help='Simulated days to run')
+    parser.add_argument('--speed', type=float, default=1000, help='Simulated seconds per real second')
+    parser.add_argument('--assets', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--balance-interval', type=int, default=30, help='Simulated seconds between balance refreshes')
+    parser.add_argument('--snapshot-interval', type=int, default=3600, help='Simulated seconds between snapshots')
+    parser.add_argument('--sample-days', type=float, default=1, help='Simulated days between measurements')
+    parser.add_argument('--deposit-every', type=float, default=14, help='Simulated days between deposits (0 = none)')
+    parser.add_argument('--deposit-amount', type=float, default=500)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Fake exchange latency (real milliseconds)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of fake exchange requests failing')
+    parser.add_argument('-o', '--output', default='simulation-results.json', help='JSON output file ("-" = stdout)')
+    opts = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    report = run(opts)
+    payload = json.dumps(report, indent=2, default=str)
+    if opts.output == '-':
+        print(payload)
+    else:
+        with open(opts.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"📄 Results written to {opts.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures - app on a throwaway SQLite database, offline trader, clocks
+Run from the backend folder: python -m pytest -q
+"""
+import os
+import pytest
+from app import create_app
+from benchmarks.synthetic import OfflineTrader
+from services.session_manager import session_manager
+from utils.clock import set_clock
+
+STABLE_BALANCES = {'USDT': {'balance': 1000.0, 'price': 1.0, 'usd_value': 1000.0}}
+
+
+def app_config(directory, **overrides):
+    """create_app overrides isolating an app in `directory` (database, locks, no price board)"""
+    return {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'portfolio.db')}",
+        'LEADER_LOCK_FILE': os.path.join(directory, 'leader.lock'),
+        'PRICE_BOARD_FILE': '',
+        **overrides
+    }
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Development app on an empty database, trader replaced by OfflineTrader (inside an app context)"""
+    app = create_app('development', app_config(str(tmp_path)))
+    session_manager.set_trader(OfflineTrader(dict(STABLE_BALANCES)))
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def install_clock():
+    """Install a process-wide clock for one test: install_clock(clock)"""
+    previous = []
+
+    def install(clock):
+        previous.append(set_clock(clock))
+        return clock
+
+    yield install
+    if previous:
+        set_clock(previous[0])
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Async refresh - RefreshPipeline stages with fake sources on one event loop
+"""
+import asyncio
+import threading
+import time
+from utils.clock import SimulatedClock
+from services.async_refresh import RefreshPipeline
+
+
+class FakeSource:
+    """Source whose fetch takes `latency` seconds; value() numbers the fetches"""
+
+    def __init__(self, latency=0.01, fail_every=0, in_flight=None):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.in_flight = in_flight
+        self.fetches = 0
+
+    async def fetch(self):
+        self.fetches += 1
+        if self.in_flight is not None:
+            self.in_flight['now'] += 1
+            self.in_flight['peak'] = max(self.in_flight['peak'], self.in_flight['now'])
+        try:
+            await asyncio.sleep(self.latency)
+            if self.fail_every and self.fetches % self.fail_every == 0:
+                raise ConnectionError('exchange unreachable')
+            return {'fetch': self.fetches}, {'BTCUSDT': 40000.0}
+        finally:
+            if self.in_flight is not None:
+                self.in_flight['now'] -= 1
+
+    def value(self, account, tickers):
+        return {'USDT': {'balance': account['fetch'], 'price': 1.0, 'usd_value': float(account['fetch'])}}
+
+
+class RecordingStore:
+    """Store callable recording each batch, optionally slow or failing"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+        self.threads = set()
+
+    def __call__(self, batch):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        if self.fail:
+            raise OSError('database is locked')
+        self.batches.append({name: balances['USDT']['balance'] for name, (balances, _) in batch.items()})
+
+
+def run_pipeline(pipeline, seconds):
+    async def main():
+        stopping = asyncio.Event()
+        asyncio.get_running_loop().call_later(seconds, stopping.set)
+        await pipeline.run(stopping)
+        pipeline.executor.shutdown(wait=True)
+
+    asyncio.run(main())
+
+
+def test_sources_are_fetched_concurrently_and_written_off_the_loop():
+    in_flight = {'now': 0, 'peak': 0}
+    sources = {f"a{i}": FakeSource(latency=0.02, in_flight=in_flight) for i in range(10)}
+    store = RecordingStore()
+    pipeline = RefreshPipeline(sources, store, 0)
+    run_pipeline(pipeline, 0.5)
+
+    assert in_flight['peak'] == 10
+    assert store.threads and all(name.startswith('refresh-write') for name in store.threads)
+    written = {name for batch in store.batches for name in batch}
+    assert written == set(sources)
+    assert pipeline.stats['fetches'] >= 10 * 10
+    assert pipeline.stats['written'] + pipeline.stats['coalesced'] <= pipeline.stats['fetches']
+    assert pipeline.stats['fetch_errors'] == pipeline.stats['write_errors'] == 0
+
+
+def test_slow_writes_batch_and_keep_the_latest_valuation():
+    sources = {'a': FakeSource(latency=0.001), 'b': FakeSource(latency=0.001)}
+    store = RecordingStore(delay=0.05)
+    pipeline = RefreshPipeline(sources, store, 0, queue_size=4)
+    run_pipeline(pipeline, 0.6)
+
+    assert pipeline.stats['coalesced'] > 0
+    # A batch already in the executor when stopping finishes there, uncounted
+    assert len(store.batches) - 1 <= pipeline.stats['writes'] <= len(store.batches)
+    # Queues are bounded: fetchers wait for the writer instead of running ahead
+    assert pipeline.stats['fetches'] < len(store.batches) * (2 * 4 + 2) + 2 * 4 + 2
+    for name in sources:
+        values = [batch[name] for batch in store.batches if name in batch]
+        assert values == sorted(values) and len(set(values)) == len(values)
+
+
+def test_fetches_follow_the_clock_interval():
+    # 1 s of clock time per fetch, clock 20x faster: ~50 ms between fetches
+    clock = SimulatedClock(speed=20)
+    source = FakeSource(latency=0.001)
+    store = RecordingStore()
+    pipeline = RefreshPipeline({'a': source}, store, 1, clock=clock)
+    run_pipeline(pipeline, 1)
+
+    assert 16 <= source.fetches <= 21
+    assert pipeline.stats['missed'] <= 2  # A busy test host can make one late
+
+
+def test_failures_are_counted_and_the_pipeline_keeps_going():
+    source = FakeSource(latency=0.001, fail_every=3)
+    pipeline = RefreshPipeline({'a': source}, RecordingStore(), 0)
+    run_pipeline(pipeline, 0.3)
+    assert pipeline.stats['fetch_errors'] >= 5
+    assert pipeline.stats['fetches'] >= 2 * pipeline.stats['fetch_errors'] - 1
+    assert pipeline.stats['written'] > 0
+
+    failing = RecordingStore(fail=True)
+    pipeline = RefreshPipeline({'a': FakeSource(latency=0.001)}, failing, 0)
+    run_pipeline(pipeline, 0.3)
+    assert pipeline.stats['write_errors'] > 0
+    assert pipeline.stats['writes'] == 0
+    # Every valuation went into a failed batch (or was replaced in one)
+    assert pipeline.stats['write_errors'] + pipeline.stats['coalesced'] >= pipeline.stats['fetches'] - 1
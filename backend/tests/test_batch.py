@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Batch API - sub-requests answered like their standalone requests, one read transaction
+"""
+import json
+import threading
+import pytest
+from db.models import CashFlow, db
+from utils import timestamps
+from utils.clock import SimulatedClock, get_clock
+
+PATHS = ['/api/performance/stats', '/api/performance/twr/7', '/api/performance/pnl/30',
+         '/api/performance/snapshots?limit=5', '/api/performance/cashflows']
+
+
+@pytest.fixture
+def client(app, install_clock):
+    install_clock(SimulatedClock(speed=1e-9))  # Frozen: period bounds are the same in every response
+    client = app.test_client()
+    for _ in range(3):
+        assert client.post('/api/performance/cashflows', json={'amount_usd': 100, 'type': 'DEPOSIT'}).status_code == 201
+    return client
+
+
+def test_sub_requests_match_standalone_responses(client):
+    response = client.post('/api/batch', json={'requests': PATHS[:2] + [{'id': 'pnl', 'path': PATHS[2]}] + PATHS[3:]})
+    assert response.status_code == 200
+    responses = response.get_json()['responses']
+
+    assert [r['path'] for r in responses] == PATHS
+    assert [r['id'] for r in responses] == ['0', '1', 'pnl', '3', '4']
+    for sub in responses:
+        standalone = client.get(sub['path'])
+        assert sub['status'] == standalone.status_code
+        assert sub['body'] == standalone.get_json()
+
+
+def test_errors_stay_inside_their_sub_response(client):
+    responses = client.post('/api/batch', json={'requests': ['/api/performance/stats', '/api/nowhere']}) \
+        .get_json()['responses']
+    assert responses[0]['status'] == 200
+    assert responses[1]['status'] == 404 and 'error' in responses[1]['body']
+
+
+@pytest.mark.parametrize('body', [
+    {}, {'requests': []}, {'requests': ['/health']}, {'requests': ['/api/batch']},
+    {'requests': ['/api/performance/stats'] * 51}
+])
+def test_invalid_batches_are_rejected(client, body):
+    assert client.post('/api/batch', json=body).status_code == 400
+
+
+def test_sub_requests_share_one_read_transaction(app, client, monkeypatch):
+    """A cash flow written by another worker during the batch shows up in none or all of its sub-requests"""
+    from api import batch
+
+    dispatch = batch._sub_request
+    writers = []
+
+    def write_in_between(app_, path):
+        result = dispatch(app_, path)
+        if not writers:
+            def writer():
+                with app.app_context():
+                    db.session.add(CashFlow(timestamp=timestamps.encode(get_clock().now()),
+                                            amount_usd=50.0, type='DEPOSIT'))
+                    db.session.commit()  # Waits for the batch's read transaction to end
+            writers.append(threading.Thread(target=writer))
+            writers[0].start()
+            writers[0].join(0.2)
+        return result
+
+    monkeypatch.setattr(batch, '_sub_request', write_in_between)
+    responses = client.post('/api/batch', json={'requests': ['/api/performance/cashflows'] * 2}) \
+        .get_json()['responses']
+    writers[0].join()
+
+    first, second = (json.dumps(r['body'], sort_keys=True) for r in responses)
+    assert first == second
+    assert responses[0]['body']['count'] == 3
+    assert client.get('/api/performance/cashflows').get_json()['count'] == 4
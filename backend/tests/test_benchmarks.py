@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite smoke test - python -m benchmarks.run on tiny histories
+(every endpoint answers below 500 and every benchmark reports a timing per size)
+"""
+import argparse
+import logging
+import pytest
+from benchmarks import run as bench_run
+
+SIZES = [50, 200]
+
+
+@pytest.fixture
+def report():
+    try:
+        yield bench_run.run(argparse.Namespace(sizes=SIZES, cashflow_every=20, repeats=1, min_time=0))
+    finally:
+        logging.disable(logging.NOTSET)  # run() silences metric logging for the process
+
+
+def test_every_benchmark_runs_at_every_size(report):
+    expected = {name for name, _, _, _ in bench_run.ENDPOINTS} | {'save_current_snapshot', 'get_tracking_stats'}
+
+    assert expected <= set(report['benchmarks'])
+    for name, bench in report['benchmarks'].items():
+        assert [point['n'] for point in bench['points']] == SIZES, name
+        assert all(point['median'] >= 0 for point in bench['points']), name
+    assert set(report['sizes']) == set(SIZES)
+    assert all(size['memory']['store_bytes'] > 0 for size in report['sizes'].values())
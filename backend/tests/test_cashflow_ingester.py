@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Cash flow ingestion - incremental import from deposit/withdraw history
+"""
+from datetime import datetime, timedelta
+from core.klines import OfflineKlineSource, to_epoch_ms
+from db.models import CashFlow, SyncCursor
+from services.cashflow_ingester import CashFlowIngester
+from utils.clock import SimulatedClock
+
+SINCE = datetime(2026, 2, 1)
+NOW = datetime(2026, 2, 10)
+
+
+class HistorySource:
+    """In-memory deposit/withdraw history (same contract as BinanceHistorySource)"""
+
+    def __init__(self, deposits=(), withdrawals=()):
+        self.deposit_rows = list(deposits)
+        self.withdrawal_rows = list(withdrawals)
+        self.calls = 0
+
+    def deposits(self, start_ms, end_ms):
+        self.calls += 1
+        return [d for d in self.deposit_rows if start_ms <= d['insertTime'] <= end_ms]
+
+    def withdrawals(self, start_ms, end_ms):
+        self.calls += 1
+        return [w for w in self.withdrawal_rows
+                if start_ms <= to_epoch_ms(datetime.strptime(w['applyTime'], '%Y-%m-%d %H:%M:%S')) <= end_ms]
+
+
+def deposit(id, coin, amount, at, status=1):
+    return {'id': id, 'coin': coin, 'amount': str(amount), 'status': status, 'insertTime': to_epoch_ms(at)}
+
+
+def withdrawal(id, coin, amount, at, fee=0, status=6):
+    return {'id': id, 'coin': coin, 'amount': str(amount), 'transactionFee': str(fee), 'status': status,
+            'applyTime': at.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def ingester(source, prices, now=NOW):
+    return CashFlowIngester(source, OfflineKlineSource(prices), ['BTCUSDT'],
+                            clock=SimulatedClock(now, speed=1e-9), since=SINCE)
+
+
+def cash_flows():
+    return {c.tx_id: (c.type, c.amount_usd) for c in CashFlow.query}
+
+
+def test_flows_are_valued_at_their_minute_and_imported_once(app):
+    btc_at = datetime(2026, 2, 3, 10, 15, 42)
+    source = HistorySource(
+        deposits=[deposit('d1', 'USDT', 500, datetime(2026, 2, 2)), deposit('d2', 'BTC', 0.01, btc_at)],
+        withdrawals=[withdrawal('w1', 'USDT', 100, datetime(2026, 2, 4), fee=1)]
+    )
+    prices = {'BTCUSDT': {datetime(2026, 2, 3, 10, 15): 60000.0}}
+
+    assert ingester(source, prices).ingest() == 3
+    assert cash_flows() == {
+        'deposit:d1': ('DEPOSIT', 500.0),
+        'deposit:d2': ('DEPOSIT', 600.0),  # Open of the 10:15 candle
+        'withdraw:w1': ('WITHDRAW', -101.0),
+    }
+    assert SyncCursor.get('cashflows:deposits') == to_epoch_ms(NOW)
+
+    assert ingester(source, prices).ingest() == 0
+    assert len(cash_flows()) == 3
+
+
+def test_pending_and_unpriced_flows_hold_the_cursor_back(app):
+    pending_at, unpriced_at = datetime(2026, 2, 5), datetime(2026, 2, 6, 12, 0, 30)
+    source = HistorySource(deposits=[
+        deposit('d1', 'USDT', 500, datetime(2026, 2, 2)),
+        deposit('d2', 'USDT', 250, pending_at, status=0),
+    ], withdrawals=[
+        withdrawal('w1', 'BTC', 0.01, unpriced_at),
+    ])
+    prices = {'BTCUSDT': {}}
+
+    assert ingester(source, prices).ingest() == 1
+    assert SyncCursor.get('cashflows:deposits') == to_epoch_ms(pending_at)
+    assert SyncCursor.get('cashflows:withdrawals') == to_epoch_ms(unpriced_at)
+
+    # Later: the deposit is credited and the candle is published
+    source.deposit_rows[1]['status'] = 1
+    prices['BTCUSDT'][datetime(2026, 2, 6, 12)] = 50000.0
+    assert ingester(source, prices, now=NOW + timedelta(hours=1)).ingest() == 2
+    assert cash_flows() == {
+        'deposit:d1': ('DEPOSIT', 500.0),
+        'deposit:d2': ('DEPOSIT', 250.0),
+        'withdraw:w1': ('WITHDRAW', -500.0),
+    }
+
+
+def test_full_pages_are_split(app, monkeypatch):
+    from core import history_reconstruction
+    monkeypatch.setattr(history_reconstruction, 'HISTORY_PER_REQUEST', 10)
+
+    start = datetime(2026, 2, 2)
+    rows = [deposit(f"d{i}", 'USDT', 1, start + timedelta(minutes=i)) for i in range(35)]
+
+    class CappedSource(HistorySource):
+        def deposits(self, start_ms, end_ms):
+            return super().deposits(start_ms, end_ms)[-10:]  # Newest rows only, like Binance
+
+    assert ingester(CappedSource(deposits=rows), {}).ingest() == 35
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Fake exchange - BinanceTrader works against it unchanged, and its rate limit
+and price walk behave like the soak tests expect
+"""
+import json
+import urllib.error
+import urllib.request
+from datetime import datetime
+import pytest
+from core.binance_trader import BinanceTrader
+from simulation.fake_exchange import FakeExchange, FakeMarket
+from utils.clock import SimulatedClock
+
+START = datetime(2024, 1, 1, 12, 0)
+
+
+def frozen_market(**options):
+    return FakeMarket(assets=5, clock=SimulatedClock(START, speed=1e-9), **options)
+
+
+@pytest.fixture
+def exchange():
+    exchange = FakeExchange(frozen_market()).start()
+    yield exchange
+    exchange.stop()
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def test_binance_trader_values_the_fake_account(exchange):
+    market = exchange.market
+    trader = BinanceTrader('key', 'secret', api_url=exchange.url, hedge_percentile=0)
+
+    first = trader.get_all_balances_usd(min_value=0)
+    scoped = trader.get_all_balances_usd(min_value=0)  # Second refresh only asks for the held symbols
+
+    assert set(first) == set(market.balances)
+    for asset, quantity in market.balances.items():
+        price = 1.0 if asset == 'USDT' else market.price(f"{asset}USDT")
+        assert first[asset]['usd_value'] == pytest.approx(quantity * price, rel=1e-6)
+    assert scoped == first
+    assert trader.price_symbols == sorted(f"{asset}USDT" for asset in market.assets)
+
+
+def test_weight_limit_answers_429_with_retry_after():
+    exchange = FakeExchange(frozen_market(), weight_limit=3).start()
+    try:
+        for _ in range(3):
+            get(f"{exchange.url}/api/v3/ping")
+        with pytest.raises(urllib.error.HTTPError) as error:
+            get(f"{exchange.url}/api/v3/ping")
+    finally:
+        exchange.stop()
+
+    assert error.value.code == 429
+    assert 0 < int(error.value.headers['Retry-After']) <= 60
+    assert json.loads(error.value.read())['code'] == -1003
+
+
+def test_same_seed_gives_the_same_klines(exchange):
+    url = f"{exchange.url}/api/v3/klines?symbol=BTCUSDT&interval=1h&limit=24"
+    other = FakeExchange(frozen_market()).start()
+    try:
+        klines = get(url)
+        replayed = get(url.replace(exchange.url, other.url))
+    finally:
+        other.stop()
+
+    assert klines == replayed
+    assert len(klines) == 24
+    assert [k[0] for k in klines] == [klines[0][0] + i * 3600 * 1000 for i in range(24)]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Hedger - concurrent account/ticker calls with a hedged second attempt
+"""
+import threading
+import time
+import pytest
+from core.binance_http import Hedger, MIN_HEDGE_DELAY, MIN_SAMPLES
+
+
+class StallFirst:
+    """Callable whose first invocation stalls until released, later ones answer at once"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            self.release.wait(5)
+            return 'stalled'
+        return self.value
+
+
+@pytest.fixture
+def hedger():
+    hedger = Hedger(percentile=95)
+    yield hedger
+    hedger.shutdown()
+
+
+def train(hedger, name, seconds=0.005, count=MIN_SAMPLES):
+    for _ in range(count):
+        hedger._observe(name, seconds)
+
+
+def test_calls_run_concurrently(hedger):
+    started = time.perf_counter()
+    results = hedger.gather({
+        'account': lambda: time.sleep(0.2) or {'balances': []},
+        'tickers': lambda: time.sleep(0.2) or [{'symbol': 'BTCUSDT', 'price': '1'}],
+    })
+    assert time.perf_counter() - started < 0.35
+    assert results == {'account': {'balances': []}, 'tickers': [{'symbol': 'BTCUSDT', 'price': '1'}]}
+
+
+def test_hedge_delay_follows_the_latency_percentile(hedger):
+    assert hedger.hedge_delay('account') is None  # Still learning
+    train(hedger, 'account', count=MIN_SAMPLES - 1)
+    assert hedger.hedge_delay('account') is None
+
+    for seconds in range(1, 101):
+        hedger._observe('tickers', seconds / 100)
+    assert hedger.hedge_delay('tickers') == pytest.approx(0.96)
+    train(hedger, 'account')
+    assert hedger.hedge_delay('account') == MIN_HEDGE_DELAY  # Floor
+    assert Hedger(percentile=0).hedge_delay('account') is None
+
+
+def test_stalled_call_is_hedged_and_the_hedge_wins(hedger):
+    train(hedger, 'account')
+    account = StallFirst({'balances': [{'asset': 'BTC'}]})
+    try:
+        started = time.perf_counter()
+        results = hedger.gather({'account': account, 'tickers': lambda: []})
+        elapsed = time.perf_counter() - started
+    finally:
+        account.release.set()
+
+    assert results == {'account': {'balances': [{'asset': 'BTC'}]}, 'tickers': []}
+    assert elapsed < 1
+    assert account.calls == 2
+    assert hedger.stats == {'calls': 2, 'hedged': 1, 'hedge_won': 1}
+
+
+def test_unhedged_failure_is_raised(hedger):
+    def fail():
+        raise ConnectionError('reset by peer')
+
+    with pytest.raises(ConnectionError):
+        hedger.gather({'account': fail, 'tickers': lambda: []})
+
+
+def test_failed_primary_is_covered_by_its_hedge(hedger):
+    train(hedger, 'account')
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.1)  # Hedged meanwhile
+            raise ConnectionError('reset by peer')
+        return 'ok'
+
+    assert hedger.gather({'account': flaky}) == {'account': 'ok'}
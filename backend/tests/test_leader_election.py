@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Leader election - one refresh leader among several worker processes
+"""
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from services.leader_election import LeaderElection
+from tests.conftest import STABLE_BALANCES, app_config
+
+SPEED = 3600          # One simulated hour per real second
+SNAPSHOT_INTERVAL = 3600
+WORKERS = 4
+
+
+def test_lock_has_one_holder(tmp_path):
+    lock = tmp_path / 'leader.lock'
+    first, second = LeaderElection(lock), LeaderElection(lock)
+
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    assert first.try_acquire()  # Re-entrant for the holder
+
+    first.release()
+    assert second.try_acquire()
+    assert second.is_leader and not first.is_leader
+    second.release()
+
+
+def _worker(directory, start, origin, lifetime):
+    """
+    One Gunicorn-like worker: app + auto-refresh service on a shared database
+    and lock, killed without cleanup after `lifetime` real seconds
+    """
+    # Every worker shares the same simulated timeline, whenever it boots
+    from utils.clock import SimulatedClock, set_clock
+    from datetime import timedelta
+    set_clock(SimulatedClock(start + timedelta(seconds=(time.time() - origin) * SPEED), speed=SPEED))
+
+    from app import create_app
+    from benchmarks.synthetic import OfflineTrader
+    from services.auto_refresh import start_auto_refresh
+    from services.session_manager import session_manager
+
+    app = create_app('development', app_config(directory, SNAPSHOT_INTERVAL=SNAPSHOT_INTERVAL,
+                                               BALANCE_UPDATE_INTERVAL=60, LEADER_RETRY_INTERVAL=60))
+    session_manager.set_trader(OfflineTrader(dict(STABLE_BALANCES)))
+    start_auto_refresh(app)
+    time.sleep(lifetime)
+    os._exit(0)  # Like a crashed worker: the kernel drops the lock
+
+
+def test_racing_workers_write_one_snapshot_per_bucket(tmp_path):
+    from app import create_app
+    from db.models import Snapshot
+
+    start = datetime(2026, 1, 5, 0, 20)
+    origin = time.time()
+    context = multiprocessing.get_context('spawn')
+    # Staggered deaths: leadership fails over to a survivor several times
+    workers = [
+        context.Process(target=_worker, args=(str(tmp_path), start, origin, 3 + 1.5 * i))
+        for i in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    app = create_app('development', app_config(str(tmp_path)))
+    with app.app_context():
+        timestamps = [ts for (ts,) in Snapshot.query.with_entities(Snapshot.timestamp)]
+
+    buckets = [ts // SNAPSHOT_INTERVAL for ts in timestamps]
+    assert len(timestamps) >= 5
+    assert len(set(buckets)) == len(buckets), f"duplicate snapshot buckets: {sorted(buckets)}"
+    # Every snapshot sits on a boundary (the fresh install one included), and
+    # each new leader backfilled the hours its predecessor missed
+    assert all(ts % SNAPSHOT_INTERVAL == 0 for ts in timestamps)
+    assert sorted(buckets) == list(range(min(buckets), max(buckets) + 1))
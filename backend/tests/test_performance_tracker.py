@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Stored TWR/P&L - incremental recompute matches a full one
+"""
+from benchmarks.synthetic import generate_history
+from core.performance_tracker import PerformanceTracker
+from db.models import db, Snapshot
+
+
+def stored_metrics():
+    return {s.id: (s.twr, s.pnl, s.pnl_percent) for s in Snapshot.query.order_by(Snapshot.id)}
+
+
+def test_recompute_since_matches_a_full_recompute(app):
+    generate_history(1500, cashflow_every=40, with_metrics=False)
+    tracker = PerformanceTracker(None)
+    assert tracker.recompute_snapshot_metrics(batch_size=200) == 1500
+    full = stored_metrics()
+    ordered = sorted(Snapshot.query, key=lambda s: (s.timestamp, s.id))
+
+    for index in (0, 1, 2, 700, 1499):
+        cut = ordered[index].timestamp
+        Snapshot.query.filter(Snapshot.timestamp >= cut).update({'twr': None, 'pnl': None, 'pnl_percent': None})
+        db.session.commit()
+
+        since = PerformanceTracker.timestamp_to_datetime(cut)
+        assert tracker.recompute_snapshot_metrics(since=since, batch_size=200) == 1500 - index
+        partial = stored_metrics()
+        assert partial == full
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Price board - seqlock consistency between a writer and reader processes,
+staleness and per-database files
+"""
+import multiprocessing
+import time
+from datetime import datetime
+from app import create_app
+from services.price_board import PriceBoard, SEQ, SEQ_OFFSET, get_price_board
+from tests.conftest import app_config
+from utils.clock import SimulatedClock
+from utils.timestamps import EPOCH
+
+CAPACITY = 64
+
+
+def generation(n):
+    """Board contents of publication n: every field derived from n, 1 to CAPACITY assets"""
+    return {
+        f"A{i}": {'balance': float(n), 'price': 2.0, 'usd_value': 2.0 * n, 'percentage': float(i)}
+        for i in range(n % CAPACITY + 1)
+    }
+
+
+def _writer(path, seconds):
+    board = PriceBoard(path, CAPACITY)
+    n = 1
+    stop = time.monotonic() + seconds
+    while time.monotonic() < stop:
+        board.publish(generation(n), updated_at=float(n))
+        n += 1
+        if n % 10 == 0:
+            time.sleep(0.0001)  # Short gaps, so readers also get through mid-stream
+    board.close()
+
+
+def test_publish_then_read(tmp_path):
+    writer, reader = PriceBoard(tmp_path / 'board', CAPACITY), PriceBoard(tmp_path / 'board', CAPACITY)
+    assert reader.read() is None  # No board yet
+
+    writer.publish({'BTC': {'balance': 0.5, 'price': 60000.0, 'usd_value': 30000.0, 'percentage': 100.0}},
+                   updated_at=1234.5)
+    assert reader.read() == {
+        'updated_at': 1234.5,
+        'balances': [{'asset': 'BTC', 'balance': 0.5, 'price': 60000.0, 'usd_value': 30000.0, 'percentage': 100.0}]
+    }
+
+    # Over capacity: published empty, readers fall back to the database
+    writer.publish(generation(CAPACITY - 1) | {'EXTRA': generation(1)['A0']})
+    assert reader.read() is None
+
+
+def test_dead_writer_is_detected_and_recovered(tmp_path):
+    writer, reader = PriceBoard(tmp_path / 'board', CAPACITY), PriceBoard(tmp_path / 'board', CAPACITY)
+    writer.publish(generation(3))
+    writer._open(writable=True)
+    SEQ.pack_into(writer._mm, SEQ_OFFSET, SEQ.unpack_from(writer._mm, SEQ_OFFSET)[0] + 1)  # Died mid-update
+
+    assert reader.read(retries=5) is None
+    writer.publish(generation(4))
+    assert len(reader.read()['balances']) == 5
+
+
+def test_readers_never_see_a_torn_board(tmp_path):
+    path = str(tmp_path / 'board')
+    PriceBoard(path, CAPACITY).publish(generation(0), updated_at=0.0)
+    writer = multiprocessing.get_context('spawn').Process(target=_writer, args=(path, 2.0))
+    writer.start()
+
+    board = PriceBoard(path, CAPACITY)
+    generations = set()
+    try:
+        while writer.is_alive():
+            snapshot = board.read(retries=1000)
+            if snapshot is None:
+                continue  # Busy for every retry: callers fall back to the database
+            n = int(snapshot['updated_at'])
+            # Header and every record come from the same publication
+            assert snapshot['balances'] == [
+                {'asset': asset, **values} for asset, values in generation(n).items()
+            ]
+            generations.add(n)
+    finally:
+        writer.join(timeout=10)
+        board.close()
+
+    assert writer.exitcode == 0
+    assert len(generations) > 10  # Reads interleaved with many publications
+
+
+def test_stale_board_is_ignored(tmp_path):
+    clock = SimulatedClock(datetime(2026, 1, 1), speed=1e-9)
+    now = (clock.now() - EPOCH).total_seconds()
+    writer = PriceBoard(tmp_path / 'board', CAPACITY)
+    reader = PriceBoard(tmp_path / 'board', CAPACITY, max_age=90, clock=clock)
+
+    writer.publish(generation(1), updated_at=now - 60)
+    assert reader.read()['updated_at'] == now - 60
+    writer.publish(generation(2), updated_at=now - 120)  # Leader gone for four 30 s intervals
+    assert reader.read() is None
+
+
+def test_default_board_follows_the_database(tmp_path):
+    for name in 'abc':
+        (tmp_path / name).mkdir()
+    apps = [create_app('development', {**app_config(str(tmp_path / name)), 'PRICE_BOARD_FILE': None})
+            for name in 'ab']
+    paths = {get_price_board(app).path for app in apps}
+    assert len(paths) == 2
+    assert get_price_board(apps[0]).max_age == 3 * apps[0].config['BALANCE_UPDATE_INTERVAL']
+    assert get_price_board(create_app('development', app_config(str(tmp_path / 'c')))) is None  # Disabled
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Profiling - collapsed stacks from pstats data stay bounded on dense call graphs
+"""
+import time
+from types import SimpleNamespace
+from utils.profiling import MAX_STACK_NODES, collapsed_stacks
+
+
+def graph_stats(edges, self_times):
+    """
+    pstats-shaped data for a call graph
+
+    Args:
+        edges: {(caller, callee): seconds of callee cumulative time through the edge}
+        self_times: {func: own seconds}, split across callers like the cumulative time
+    """
+    def func(name):
+        return ('app.py', 1, name)
+
+    cumulative = {}
+    for (_, callee), seconds in edges.items():
+        cumulative[callee] = cumulative.get(callee, 0) + seconds
+    stats = {}
+    for name, own in self_times.items():
+        ct = cumulative.get(name, own)
+        callers = {
+            func(caller): (1, 1, own * seconds / ct, seconds)
+            for (caller, callee), seconds in edges.items() if callee == name
+        }
+        stats[func(name)] = (1, 1, own, ct, callers)
+    return SimpleNamespace(stats=stats)
+
+
+def parse(lines):
+    return {line.rsplit(' ', 1)[0]: int(line.rsplit(' ', 1)[1]) for line in lines}
+
+
+def test_time_is_split_along_each_caller():
+    # main -> query (0.3 s) and main -> render (0.1 s); both call execute (0.2 s own in total)
+    stats = graph_stats(
+        {('main', 'query'): 0.3, ('main', 'render'): 0.1, ('query', 'execute'): 0.15, ('render', 'execute'): 0.05},
+        {'main': 0.1, 'query': 0.15, 'render': 0.05, 'execute': 0.2}
+    )
+    stacks = parse(collapsed_stacks(stats))
+    assert stacks == {
+        'main (app.py:1)': 100000,
+        'main (app.py:1);query (app.py:1)': 150000,
+        'main (app.py:1);query (app.py:1);execute (app.py:1)': 150000,
+        'main (app.py:1);render (app.py:1)': 50000,
+        'main (app.py:1);render (app.py:1);execute (app.py:1)': 50000,
+    }
+
+
+def test_dense_call_graph_is_bounded():
+    # 40 layers of 6 functions, each calling every function of the next layer:
+    # 6**40 distinct paths, which a full expansion would never finish
+    layers, width = 40, 6
+    names = [[f"f{layer}_{i}" for i in range(width)] for layer in range(layers)]
+    edges = {('main', name): 1.0 / width for name in names[0]}
+    for layer in range(layers - 1):
+        for caller in names[layer]:
+            for callee in names[layer + 1]:
+                edges[(caller, callee)] = 1.0 / width / width
+    self_times = {'main': 0.0, **{name: 0.01 for layer in names for name in layer}}
+
+    started = time.perf_counter()
+    lines = collapsed_stacks(graph_stats(edges, self_times))
+    assert time.perf_counter() - started < 5
+    assert 0 < len(lines) <= MAX_STACK_NODES
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Scheduler - fixed-rate deadlines, wall-clock alignment, overlap policies,
+prompt wake-ups (SimulatedClock: 600 simulated seconds per real second)
+"""
+import threading
+import time
+from datetime import datetime
+import pytest
+from services import scheduler as scheduler_module
+from services.scheduler import Scheduler
+from utils.clock import SimulatedClock
+
+SPEED = 600
+
+
+@pytest.fixture
+def clock():
+    return SimulatedClock(datetime(2026, 3, 1, 0, 0, 7), speed=SPEED)
+
+
+@pytest.fixture
+def scheduler(clock):
+    scheduler = Scheduler(clock=clock, seed=1)
+    yield scheduler
+    scheduler.stop(timeout=2)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_deadlines_do_not_drift_with_run_time(scheduler, clock):
+    starts = []
+
+    def slow():
+        starts.append(clock.monotonic())
+        clock.sleep(20)  # A third of the interval
+
+    scheduler.add('slow', slow, 60, run_at_start=True)
+    scheduler.start()
+    wait_for(lambda: len(starts) >= 8)
+
+    # Fixed grid: the n-th run starts n intervals after the first, not n * (60 + 20)
+    for n, started in enumerate(starts[:8]):
+        assert started - starts[0] == pytest.approx(60 * n, abs=30)
+
+
+def test_aligned_jobs_run_on_wall_clock_boundaries(scheduler, clock):
+    runs = []
+    scheduler.add('snapshot', lambda: runs.append(clock.now()), 300, align=True)
+    scheduler.start()
+    wait_for(lambda: len(runs) >= 3)
+
+    for run in runs:
+        seconds = run.minute * 60 + run.second + run.microsecond / 1e6
+        assert seconds % 300 < 60  # Just after a 5-minute boundary, never before it
+    assert runs[0].minute == 5  # First boundary after 00:00:07
+
+
+def test_skip_policy_counts_overlapping_deadlines(scheduler, clock):
+    release = threading.Event()
+    job = scheduler.add('balance', lambda: release.wait(5), 30, run_at_start=True)
+    scheduler.start()
+    wait_for(lambda: job.missed >= 3)
+    release.set()
+    wait_for(lambda: job.runs == 1)
+    assert job.running <= 1
+
+
+def test_queue_policy_runs_once_more_after_the_current_run(scheduler, clock):
+    release = threading.Event()
+    runs = []
+
+    def blocked():
+        runs.append(1)
+        if len(runs) == 1:
+            release.wait(5)
+
+    job = scheduler.add('snapshot', blocked, 30, overlap='queue', run_at_start=True)
+    scheduler.start()
+    wait_for(lambda: job.missed >= 1)  # Second overlapping deadline: one run is already queued
+    release.set()
+    wait_for(lambda: job.runs >= 2)
+    assert runs[:2] == [1, 1]
+
+
+def test_concurrent_policy_overlaps_runs(scheduler, clock):
+    release = threading.Event()
+    job = scheduler.add('export', lambda: release.wait(5), 30, overlap='concurrent', run_at_start=True)
+    scheduler.start()
+    wait_for(lambda: job.running >= 3)
+    release.set()
+    wait_for(lambda: job.running == 0)
+    assert job.missed == 0
+
+
+def test_failures_are_counted_and_the_job_keeps_running(scheduler):
+    def fail():
+        raise RuntimeError('Binance down')
+
+    job = scheduler.add('balance', fail, 30, run_at_start=True)
+    scheduler.start()
+    wait_for(lambda: job.failures >= 2)
+    assert job.last_error == 'Binance down'
+    assert scheduler.stats()['balance']['failures'] >= 2
+
+
+def test_add_and_stop_wake_the_dispatcher_at_once():
+    clock = SimulatedClock(speed=1)  # Real time: a day-long wait would block the test
+    scheduler = Scheduler(clock=clock).start()
+    ran = threading.Event()
+    scheduler.add('daily', lambda: None, 86400)
+    scheduler.add('now', ran.set, 86400, run_at_start=True)
+    assert ran.wait(1)
+
+    started = time.monotonic()
+    scheduler.stop()
+    assert time.monotonic() - started < 1
+    assert not scheduler.is_alive()
+
+
+def test_jitter_stays_within_bounds():
+    clock = SimulatedClock(speed=1e-9)  # Practically frozen: deadlines can be recomputed exactly
+    scheduler = Scheduler(clock=clock, seed=7)
+    job = scheduler.add('cashflow', lambda: None, 600, jitter=30)
+    for _ in range(50):
+        scheduler._schedule_next(job)
+        assert 0 <= job._deadline - job._due <= 30
+
+
+def test_invalid_jobs_are_rejected(scheduler, monkeypatch):
+    with pytest.raises(ValueError):
+        scheduler.add('bad', lambda: None, 0)
+    with pytest.raises(ValueError):
+        scheduler.add('bad', lambda: None, 10, overlap='sometimes')
+    scheduler.add('once', lambda: None, 10)
+    with pytest.raises(ValueError):
+        scheduler.add('once', lambda: None, 10)
+
+    monkeypatch.setattr(scheduler_module, '_registry', {})
+    scheduler_module.register_job('cleanup', print, 3600, jitter=5)
+    assert scheduler_module.registered_jobs() == {'cleanup': (print, 3600, {'jitter': 5})}
+    with pytest.raises(ValueError):
+        scheduler_module.register_job('cleanup', print, 3600)
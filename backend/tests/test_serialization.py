@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Serialization - orjson provider output, columnar payloads, negotiated compression
+"""
+import gzip
+import json
+from datetime import datetime
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from benchmarks.synthetic import generate_history
+from tests.conftest import app_config
+from utils import serialization
+
+orjson = pytest.importorskip('orjson')
+
+PAYLOADS = [
+    {'snapshots': [{'id': 1, 'twr': 1.25, 'pnl': None, 'ok': True}], 'count': 1},
+    {'asset': 'Ξ ETH — 1€', 'emoji': '🚀', 'separators': '  ', 'control': '\x01"\\'},
+    {'b': 1, 'a': {'d': [1, 2], 'c': 'x'}, 'at': datetime(2026, 3, 1, 12, 30)},
+    [],
+]
+
+
+@pytest.fixture
+def providers():
+    flask_app = Flask(__name__)
+    return flask_app, serialization.OrjsonProvider(flask_app), DefaultJSONProvider(flask_app)
+
+
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_orjson_responses_match_the_stdlib_provider(providers, payload):
+    flask_app, fast, stdlib = providers
+    with flask_app.app_context():
+        assert fast.response(payload).get_data() == stdlib.response(payload).get_data()
+        flask_app.debug = True  # Indented
+        assert fast.response(payload).get_data() == stdlib.response(payload).get_data()
+
+
+def test_non_ascii_is_kept_when_ensure_ascii_is_off(providers):
+    flask_app, fast, stdlib = providers
+    fast.ensure_ascii = stdlib.ensure_ascii = False
+    with flask_app.app_context():
+        assert fast.response(PAYLOADS[1]).get_data() == stdlib.response(PAYLOADS[1]).get_data()
+
+
+def test_nan_is_written_as_null(providers):
+    _, fast, _ = providers
+    assert json.loads(fast.dumps({'twr': float('nan')})) == {'twr': None}
+
+
+def test_columnar_and_compressed_responses(tmp_path):
+    app = create_app('development', app_config(str(tmp_path)))
+    with app.app_context():
+        generate_history(200)
+    client = app.test_client()
+
+    rows = client.get('/api/performance/snapshots').get_json()
+    columnar = client.get('/api/performance/snapshots?format=columnar').get_json()
+    assert columnar['count'] == rows['count'] == 200
+    assert columnar['total_value_usd'] == [s['total_value_usd'] for s in rows['snapshots']]
+    assert columnar['twr'] == [s['twr'] for s in rows['snapshots']]
+
+    plain = client.get('/api/performance/snapshots')
+    assert 'Content-Encoding' not in plain.headers
+    compressed = client.get('/api/performance/snapshots', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+
+    # Below COMPRESSION_MIN_SIZE: sent as is
+    small = client.get('/health', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Session manager - a failed lazy connection is cached and retried only after its backoff
+"""
+import pytest
+from services import session_manager as session_module
+from services.session_manager import session_manager
+
+
+@pytest.fixture
+def unreachable(monkeypatch):
+    """Lazily initialized manager whose BinanceTrader always fails; returns the list of attempts"""
+    attempts = []
+
+    def failing_trader(*args, **kwargs):
+        attempts.append(args)
+        raise ConnectionError("exchange unreachable")
+
+    monkeypatch.setattr(session_module, 'BinanceTrader', failing_trader)
+    monkeypatch.setattr(session_manager, '_trader', None)
+    monkeypatch.setattr(session_manager, '_failure', None)
+    monkeypatch.setattr(session_manager, '_credentials', None)
+    session_manager.initialize('key', 'secret', lazy=True)
+    return attempts
+
+
+def test_failed_connect_is_not_retried_during_backoff(unreachable):
+    for _ in range(3):
+        with pytest.raises(RuntimeError, match="exchange unreachable"):
+            session_manager.get_trader()
+
+    assert len(unreachable) == 1
+
+
+def test_backoff_doubles_after_each_failed_retry(unreachable, monkeypatch):
+    with pytest.raises(RuntimeError):
+        session_manager.get_trader()
+    next_attempt, backoff, _ = session_manager._failure
+    assert backoff == session_module.CONNECT_RETRY_MIN
+
+    monkeypatch.setattr(session_module.time, 'monotonic', lambda: next_attempt)
+    with pytest.raises(RuntimeError):
+        session_manager.get_trader()
+
+    assert len(unreachable) == 2
+    assert session_manager._failure[1] == 2 * session_module.CONNECT_RETRY_MIN
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Single flight - concurrent identical calls share one execution
+"""
+import threading
+import time
+import pytest
+from utils.singleflight import SingleFlight
+
+CALLERS = 8
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.001)
+
+
+def run_callers(group, key, fn, count=CALLERS):
+    """Start `count` threads calling group.do(key, fn); returns (threads, outcomes)"""
+    outcomes = [None] * count
+
+    def call(i):
+        try:
+            outcomes[i] = group.do(key, fn)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_callers_share_one_execution():
+    group = SingleFlight('test')
+    gate = threading.Event()
+    executions = []
+
+    def compute():
+        executions.append(1)
+        gate.wait(5)
+        return {'twr': [1.5, 2.5]}
+
+    threads, outcomes = run_callers(group, 30, compute)
+    # Every caller but the leader waits on the in-flight call
+    wait_for(lambda: group._calls.get(30) is not None and group._calls[30].waiters == CALLERS - 1)
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(executions) == 1
+    assert all(outcome == {'twr': [1.5, 2.5]} for outcome in outcomes)
+    # Each caller owns its copy
+    assert len({id(outcome) for outcome in outcomes}) == CALLERS
+    assert group.in_flight() == 0
+
+
+def test_distinct_keys_run_concurrently():
+    group = SingleFlight('test')
+    started = threading.Barrier(2, timeout=5)
+
+    def compute(days):
+        started.wait()  # Deadlocks (BrokenBarrierError) unless both keys are in flight together
+        return days
+
+    results = {}
+    threads = [threading.Thread(target=lambda d=d: results.update({d: group.do(d, lambda: compute(d))}))
+               for d in (7, 30)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {7: 7, 30: 30}
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    group = SingleFlight('test')
+    gate = threading.Event()
+
+    def fail():
+        gate.wait(5)
+        raise ValueError('no snapshots')
+
+    threads, outcomes = run_callers(group, 'manual', fail)
+    wait_for(lambda: group._calls.get('manual') is not None and group._calls['manual'].waiters == CALLERS - 1)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+
+    # The next call computes afresh
+    assert group.do('manual', lambda: 'ok') == 'ok'
+    with pytest.raises(KeyError):
+        group.do('manual', lambda: {}['missing'])
+
+
+def test_simultaneous_manual_snapshots_create_one(app, monkeypatch):
+    from api import performance
+    from db.models import Snapshot, LastBalance, db
+
+    db.session.add(LastBalance(asset='USDT', balance=1000.0, usd_value=1000.0, percentage=100.0, timestamp=0))
+    db.session.commit()
+
+    create = performance._create_snapshot
+
+    def slow_create():
+        time.sleep(0.2)  # Keep the first request in flight while the others arrive
+        return create()
+
+    monkeypatch.setattr(performance, '_create_snapshot', slow_create)
+    responses = []
+
+    def click():
+        response = app.test_client().post('/api/performance/snapshots')
+        responses.append((response.status_code, response.get_json()))
+
+    threads = [threading.Thread(target=click) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert Snapshot.query.count() == 1
+    # Every caller got the same answer as the one that created it
+    assert len({str(body) for _, body in responses}) == 1
+    assert {status for status, _ in responses} == {201}
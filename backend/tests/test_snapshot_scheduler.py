@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Snapshot scheduling - boundary alignment and backfill of missed buckets,
+offline (recorded klines) and on a SimulatedClock
+"""
+import time
+from datetime import datetime, timedelta
+from core.klines import OfflineKlineSource
+from core.performance_tracker import PerformanceTracker
+from db.models import db, Snapshot, LastBalance
+from services.auto_refresh import AutoRefreshService
+from services.snapshot_scheduler import SnapshotScheduler
+from utils.clock import SimulatedClock
+
+HOUR = 3600
+START = datetime(2026, 3, 1)
+
+
+def hourly_klines(hours, symbol='BTCUSDT', start=START, first=60000.0, step=100.0):
+    """Offline source with one open price per hour: first, first + step, ..."""
+    return OfflineKlineSource({
+        symbol: {start + timedelta(hours=h): first + step * h for h in range(hours)}
+    })
+
+
+def add_snapshot(dt, value=1000):
+    db.session.add(Snapshot(timestamp=PerformanceTracker.datetime_to_timestamp(dt), total_value_usd=value))
+    db.session.commit()
+
+
+def set_holdings(**quantities):
+    for asset, quantity in quantities.items():
+        db.session.add(LastBalance(asset=asset, balance=quantity, usd_value=0.0, percentage=0.0,
+                                   timestamp=PerformanceTracker.datetime_to_timestamp(START)))
+    db.session.commit()
+
+
+def snapshot_values():
+    return {
+        PerformanceTracker.timestamp_to_datetime(s.timestamp): s.total_value_usd
+        for s in Snapshot.query.order_by(Snapshot.timestamp)
+    }
+
+
+def test_boundaries_are_wall_clock_multiples():
+    hourly = SnapshotScheduler(HOUR)
+    assert hourly.floor(datetime(2026, 3, 1, 10, 59, 59)) == datetime(2026, 3, 1, 10)
+    assert hourly.next_boundary(datetime(2026, 3, 1, 10, 15)) == datetime(2026, 3, 1, 11)
+    # Strictly after: on a boundary, the next one is an interval away
+    assert hourly.next_boundary(datetime(2026, 3, 1, 11)) == datetime(2026, 3, 1, 12)
+
+    quarter = SnapshotScheduler(900)
+    assert quarter.floor(datetime(2026, 3, 1, 10, 44, 1)) == datetime(2026, 3, 1, 10, 30)
+    assert quarter.next_boundary(datetime(2026, 3, 1, 23, 50)) == datetime(2026, 3, 2)
+
+
+def test_missing_buckets_include_the_current_one_and_are_capped():
+    scheduler = SnapshotScheduler(HOUR, max_backfill=3)
+    now = datetime(2026, 3, 1, 5, 30)
+
+    assert scheduler.missing_buckets(None, now) == []
+    assert scheduler.missing_buckets(datetime(2026, 3, 1, 5), now) == []
+    assert scheduler.missing_buckets(datetime(2026, 3, 1, 3, 20), now) == [
+        datetime(2026, 3, 1, 4), datetime(2026, 3, 1, 5)
+    ]
+    # Longer downtime: only the most recent max_backfill buckets
+    assert scheduler.missing_buckets(datetime(2026, 2, 28), now) == [
+        datetime(2026, 3, 1, 3), datetime(2026, 3, 1, 4), datetime(2026, 3, 1, 5)
+    ]
+
+
+def test_backfill_values_last_holdings_at_kline_prices(app):
+    add_snapshot(START)
+    set_holdings(BTC=0.01, USDT=500.0)
+    clock = SimulatedClock(START + timedelta(hours=4, minutes=30), speed=1)
+    scheduler = SnapshotScheduler(HOUR, clock=clock, kline_source=hourly_klines(6), symbols=['BTCUSDT'])
+
+    assert scheduler.backfill(PerformanceTracker(None)) == 4
+    assert snapshot_values() == {
+        START: 1000,
+        START + timedelta(hours=1): 1101,  # 500 + 0.01 * 60100
+        START + timedelta(hours=2): 1102,
+        START + timedelta(hours=3): 1103,
+        START + timedelta(hours=4): 1104,
+    }
+    # Nothing left to fill
+    assert scheduler.backfill(PerformanceTracker(None)) == 0
+
+
+def test_service_backfills_then_snapshots_on_each_boundary(app, install_clock):
+    # Three hours of downtime, then one simulated hour per real second
+    add_snapshot(START)
+    set_holdings(USDT=1000.0)
+    clock = install_clock(SimulatedClock(START + timedelta(hours=3, minutes=40), speed=HOUR))
+    service = AutoRefreshService(app, balance_interval=60, snapshot_interval=HOUR,
+                                 clock=clock, kline_source=hourly_klines(12))
+    service.start()
+    try:
+        deadline = time.monotonic() + 10
+        while clock.now() < START + timedelta(hours=6, minutes=30) and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        service.stop()
+
+    db.session.expire_all()
+    hours = [(dt - START) / timedelta(hours=1) for dt in snapshot_values()]
+    # 1-3 backfilled at start-up, 4-6 taken on their boundaries
+    assert hours[:7] == [0, 1, 2, 3, 4, 5, 6]
+    assert all(hour.is_integer() for hour in hours)
+
+
+def test_fresh_install_snapshot_is_stamped_on_the_current_boundary(app, install_clock):
+    # Started 3 minutes before a boundary: the next bucket must not be dropped
+    set_holdings(USDT=1000.0)
+    LastBalance.query.update({'usd_value': 1000.0})
+    db.session.commit()
+    clock = install_clock(SimulatedClock(START + timedelta(minutes=57), speed=HOUR))
+    service = AutoRefreshService(app, balance_interval=HOUR * 24, snapshot_interval=HOUR, clock=clock,
+                                 kline_source=hourly_klines(12))
+    service._update_last_balance = lambda: None  # Keep the holdings above
+    service.start()
+    try:
+        deadline = time.monotonic() + 10
+        while clock.now() < START + timedelta(hours=3, minutes=30) and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        service.stop()
+
+    db.session.expire_all()
+    hours = [(dt - START) / timedelta(hours=1) for dt in snapshot_values()]
+    assert hours[:4] == [0, 1, 2, 3]
+
+
+def test_boundary_snapshot_follows_a_recent_manual_one(app, install_clock):
+    install_clock(SimulatedClock(START + timedelta(minutes=58), speed=1e-9))
+    tracker = PerformanceTracker(None)
+    balances = {'USDT': {'balance': 1000.0, 'usd_value': 1000.0}}
+
+    assert tracker.save_current_snapshot(balances=balances)  # Manual, at 00:58
+    assert not tracker.save_current_snapshot(balances=balances)  # Within 5 minutes
+    assert tracker.save_current_snapshot(balances=balances, timestamp=START + timedelta(hours=1))
+    assert not tracker.save_current_snapshot(balances=balances, timestamp=START + timedelta(hours=1))
+    assert list(snapshot_values()) == [START + timedelta(minutes=58), START + timedelta(hours=1)]
+
+
+def test_backfill_carries_the_last_price_over_a_kline_gap(app):
+    add_snapshot(START)
+    db.session.add(LastBalance(asset='ETH', balance=1.0, usd_value=2000.0, percentage=50.0,
+                               timestamp=PerformanceTracker.datetime_to_timestamp(START)))
+    set_holdings(BTC=0.01)
+    # ETH has no kline at 01:00 (last refresh price) nor at 03:00 (02:00 price)
+    klines = OfflineKlineSource({
+        'BTCUSDT': {START + timedelta(hours=h): 60000.0 + 100 * h for h in range(6)},
+        'ETHUSDT': {START + timedelta(hours=2): 2100.0, START + timedelta(hours=4): 2200.0},
+    })
+    clock = SimulatedClock(START + timedelta(hours=4, minutes=30), speed=1)
+    scheduler = SnapshotScheduler(HOUR, clock=clock, kline_source=klines, symbols=['BTCUSDT', 'ETHUSDT'])
+
+    assert scheduler.backfill(PerformanceTracker(None)) == 4
+    assert snapshot_values() == {
+        START: 1000,
+        START + timedelta(hours=1): 2601,  # 2000 + 0.01 * 60100
+        START + timedelta(hours=2): 2702,
+        START + timedelta(hours=3): 2703,
+        START + timedelta(hours=4): 2804,
+    }
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Start-up budget - wsgi.py started cold must answer GET /health quickly
+(same measurement as `python -m benchmarks.startup --budget-ms`)
+"""
+import argparse
+import os
+from benchmarks import startup
+
+# Generous for shared CI runners (about 0.8 s on a laptop); override with STARTUP_BUDGET_MS
+BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 2000))
+# Imported on first use only (BINANCE_LAZY_CONNECT, deferred blueprints' dependencies)
+DEFERRED_PACKAGES = ('binance', 'dateparser', 'pyarrow')
+
+
+def test_cold_start_is_healthy_within_budget():
+    report = startup.run(argparse.Namespace(runs=3, fake_exchange=False, latency_ms=0, top=10**6))
+
+    assert report['healthy_median_ms'] <= BUDGET_MS, \
+        f"cold start took {report['healthy_median_ms']} ms (budget {BUDGET_MS:.0f} ms): {report['top_packages_ms']}"
+    eager = [name for name in DEFERRED_PACKAGES if name in report['top_packages_ms']]
+    assert not eager, f"imported at start-up: {eager}"
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Timestamps - epoch seconds codec, legacy YYYYMMDDHHMM values and their online migration
+"""
+import threading
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from db.migrations import migrate_timestamps
+from db.models import db
+from utils import timestamps
+from utils.clock import SimulatedClock
+
+
+def test_codec_round_trips_and_reads_legacy_values():
+    moment = datetime(2025, 12, 21, 1, 45, 30)
+    stored = timestamps.encode(moment)
+    assert stored == int((moment - timestamps.EPOCH).total_seconds())
+    assert timestamps.decode(stored) == moment
+
+    assert timestamps.from_legacy(202512210145) == timestamps.encode(datetime(2025, 12, 21, 1, 45))
+    assert timestamps.decode(202512210145) == datetime(2025, 12, 21, 1, 45)
+    assert timestamps.encode(202512210145) == timestamps.normalize(202512210145)
+    assert timestamps.normalize(stored) == stored
+    for invalid in (202512212400, 202512210160, 202513010000):
+        with pytest.raises(ValueError):
+            timestamps.from_legacy(invalid)
+
+
+def test_column_decoders_match_the_scalar_ones():
+    start = datetime(2023, 12, 31, 22, 0, 0)
+    moments = [start + timedelta(seconds=s) for s in range(0, 3 * 86400, 4321)]
+    stored = [timestamps.encode(m) for m in moments]
+    mixed = [202312312200] + stored  # A legacy value left by an unfinished migration
+
+    assert timestamps.iso_many(stored) == [m.isoformat() for m in moments]
+    assert timestamps.iso_many(mixed)[0] == '2023-12-31T22:00:00'
+    assert timestamps.epoch_many(stored) == stored
+    assert timestamps.epoch_many(mixed) == [timestamps.encode(start)] + stored
+
+
+def test_cash_flow_date_filters_compare_stored_timestamps(app, install_clock):
+    client = app.test_client()
+    for day in (1, 2, 3):
+        install_clock(SimulatedClock(datetime(2026, 1, day, 12), speed=1e-9))
+        assert client.post('/api/performance/cashflows', json={'amount_usd': day, 'type': 'DEPOSIT'}).status_code == 201
+
+    def amounts(query):
+        response = client.get(f'/api/performance/cashflows?{query}')
+        assert response.status_code == 200
+        return [flow['amount_usd'] for flow in response.get_json()['cashflows']]
+
+    assert amounts('') == [1, 2, 3]
+    assert amounts('start_date=2026-01-02T00:00:00') == [2, 3]
+    assert amounts('end_date=2026-01-02T12:00:00') == [1, 2]
+    assert amounts('start_date=2026-01-01T12:00:01&end_date=2026-01-03') == [2]
+
+
+def insert_legacy(count, start=datetime(2025, 1, 1)):
+    """Snapshots and cash flows stored in the legacy format, one every 15 minutes"""
+    moments = [start + timedelta(minutes=15 * i) for i in range(count)]
+    legacy = [int(m.strftime('%Y%m%d%H%M')) for m in moments]
+    db.session.execute(text('INSERT INTO snapshots (timestamp, total_value_usd) VALUES (:ts, :value)'),
+                       [{'ts': ts, 'value': 1000 + i} for i, ts in enumerate(legacy)])
+    db.session.execute(text("INSERT INTO cash_flows (timestamp, amount_usd, type) VALUES (:ts, 100, 'DEPOSIT')"),
+                       [{'ts': ts} for ts in legacy[::10]])
+    db.session.commit()
+    return moments
+
+
+def test_migration_converts_every_row_once(app):
+    moments = insert_legacy(250)
+    assert migrate_timestamps(db, batch_size=40) == 250 + 25
+    assert migrate_timestamps(db, batch_size=40) == 0
+
+    stored = db.session.execute(text('SELECT timestamp FROM snapshots ORDER BY id')).scalars().all()
+    assert stored == [timestamps.encode(m) for m in moments]
+    flows = db.session.execute(text('SELECT timestamp FROM cash_flows ORDER BY id')).scalars().all()
+    assert flows == [timestamps.encode(m) for m in moments[::10]]
+
+
+def test_readers_see_chronological_rows_during_the_migration(app):
+    moments = insert_legacy(2000)
+    engine = db.engine
+    done = threading.Event()
+    reads = []
+
+    def reader():
+        while not done.is_set():
+            with engine.connect() as conn:
+                rows = conn.execute(text('SELECT timestamp, total_value_usd FROM snapshots '
+                                         'ORDER BY timestamp')).all()
+            reads.append(rows)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        migrate_timestamps(db, batch_size=50)
+    finally:
+        done.set()
+        thread.join()
+
+    assert reads
+    for rows in reads:
+        assert [value for _, value in rows] == list(range(1000, 1000 + len(moments)))
+        assert [timestamps.decode(ts) for ts, _ in rows] == moments
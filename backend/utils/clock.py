@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Clock - Injectable source of time for background services
+Everything that reads "now" or sleeps goes through get_clock(), so simulations
+can swap in a SimulatedClock and run the real loops faster than real time.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+class SystemClock:
+    """Real wall clock (naive UTC datetimes, like the rest of the backend)"""
+
+    speed = 1.0
+
+    def now(self):
+        """Current UTC time"""
+        return datetime.utcnow()
+
+    def monotonic(self):
+        """Seconds from an arbitrary origin, never going backwards"""
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        """Block for `seconds`"""
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event, seconds):
+        """Wait up to `seconds` for a threading.Event (True if it was set)"""
+        return event.wait(max(0, seconds))
+
+
+class SimulatedClock(SystemClock):
+    """
+    Clock running `speed` times faster than real time from `start`
+    Sleeps and waits are scaled down accordingly: with speed=1000, an hourly
+    loop wakes up every 3.6 real seconds.
+    """
+
+    def __init__(self, start=None, speed=1000.0):
+        """
+        Args:
+            start: Simulated datetime at creation (default: now)
+            speed: Simulated seconds per real second
+        """
+        self.start = start or datetime.utcnow()
+        self.speed = float(speed)
+        self._origin = time.monotonic()
+        self._lock = threading.Lock()
+        self._offset = 0.0
+
+    def elapsed(self):
+        """Simulated seconds since creation"""
+        with self._lock:
+            return (time.monotonic() - self._origin) * self.speed + self._offset
+
+    def now(self):
+        return self.start + timedelta(seconds=self.elapsed())
+
+    def monotonic(self):
+        return self.elapsed()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def wait(self, event, seconds):
+        return event.wait(max(0, seconds) / self.speed)
+
+    def advance(self, seconds):
+        """Jump forward by `seconds` of simulated time"""
+        with self._lock:
+            self._offset += seconds
+
+
+_clock = SystemClock()
+
+
+def get_clock():
+    """Process-wide clock (SystemClock unless a simulation installed another)"""
+    return _clock
+
+
+def set_clock(clock):
+    """
+    Install the process-wide clock (call before creating the app and services)
+
+    Returns:
+        The previous clock
+    """
+    global _clock
+    previous, _clock = _clock, clock or SystemClock()
+    return previous
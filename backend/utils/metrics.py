@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Metrics - In-process counters, gauges and histograms in Prometheus text format
+No external dependency or server: instruments record into a module-level
+registry and GET /metrics renders it (text exposition format 0.0.4).
+Values are per process; with several workers, background-loop metrics only
+move in the elected leader.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds: 1 ms .. 30 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.label_names)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    type = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        if not self.label_names:
+            self._values[()] = 0  # Exported as 0 before the first increment
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, set directly or computed at scrape time"""
+
+    type = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), callback=None):
+        """
+        Args:
+            callback: Optional function called on every scrape, returning a
+                      number or a {label values tuple: number} dict
+        """
+        super().__init__(name, help_text, labels)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        if self.callback is None:
+            return super().render()
+
+        try:
+            result = self.callback()
+        except Exception as e:
+            logger.debug(f"Gauge {self.name} callback failed: {e}")
+            return self._header()
+
+        if result is None:
+            return self._header()
+        if not isinstance(result, dict):
+            result = {(): result}
+        return self._header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in result.items() if value is not None
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets (plus sum and count)"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts + overflow, sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, [('le', _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Named set of metrics, rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, cls, name, *args, **kwargs):
+        """Existing metric with this name, or a new one (safe on repeated create_app)"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type}")
+            return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def counter(name, help_text, labels=()):
+    return registry.get_or_create(Counter, name, help_text, labels)
+
+
+def gauge(name, help_text, labels=(), callback=None):
+    metric = registry.get_or_create(Gauge, name, help_text, labels)
+    if callback is not None:
+        metric.callback = callback
+    return metric
+
+
+def histogram(name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+    return registry.get_or_create(Histogram, name, help_text, labels, buckets)
+
+
+def horizon_label(days):
+    """Bounded label for a TWR/P&L horizon in days (0/None = total)"""
+    if not days:
+        return 'total'
+    return f"{days}d" if days in (1, 7, 30, 90, 180, 365) else 'other'
+
+
+# Instruments shared by the backend modules
+BINANCE_LATENCY = histogram(
+    'portfolio_binance_request_seconds', 'Binance API response time per endpoint', ('endpoint', 'status'))
+BINANCE_HEDGES = counter(
+    'portfolio_binance_hedged_calls_total', 'Binance calls sent a second time after the latency percentile, per winner',
+    ('call', 'winner'))
+BINANCE_WEIGHT = gauge(
+    'portfolio_binance_used_weight_1m', 'Last X-MBX-USED-WEIGHT-1M reported by Binance')
+REFRESH_DURATION = histogram(
+    'portfolio_refresh_seconds', 'Balance refresh cycle duration per phase (fetch, value, write, total)', ('phase',))
+REFRESH_ERRORS = counter(
+    'portfolio_refresh_errors_total', 'Balance refresh cycles that failed')
+DB_COMMIT_LATENCY = histogram(
+    'portfolio_db_commit_seconds', 'SQLAlchemy session commit duration (flush + COMMIT)')
+METRIC_COMPUTE = histogram(
+    'portfolio_metric_compute_seconds', 'TWR / P&L computation time per horizon', ('metric', 'horizon'))
+SINGLEFLIGHT_CALLS = counter(
+    'portfolio_singleflight_calls_total', 'Computations executed by a single-flight group', ('group',))
+SINGLEFLIGHT_COALESCED = counter(
+    'portfolio_singleflight_coalesced_total', 'Callers that waited for an identical in-flight computation',
+    ('group',))
+READ_REPLICA_REFRESH = histogram(
+    'portfolio_read_replica_refresh_seconds', 'Time to copy the database into the in-memory read replica')
+READ_REPLICA_REQUESTS = counter(
+    'portfolio_read_replica_requests_total', 'Read-only API requests per database they read (replica or file)',
+    ('target',))
+JOB_DURATION = histogram(
+    'portfolio_job_seconds', 'Background job run time per job and outcome (ok, error)', ('job', 'status'))
+JOB_FAILURES = counter(
+    'portfolio_job_failures_total', 'Background job runs that raised', ('job',))
+JOB_MISSED = counter(
+    'portfolio_job_missed_total', 'Background job deadlines missed (overlap: previous run still going, late: overdue)',
+    ('job', 'reason'))
+HTTP_LATENCY = histogram(
+    'portfolio_http_request_seconds', 'API request latency per route', ('method', 'route', 'status'))
+
+
+def instrument_app(app):
+    """Time every request by route template (not raw path, to bound cardinality)"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_latency(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            HTTP_LATENCY.observe(
+                time.perf_counter() - start,
+                method=request.method,
+                route=request.url_rule.rule if request.url_rule else 'unmatched',
+                status=str(response.status_code)
+            )
+        return response
+
+
+def instrument_session(session_class):
+    """Observe commit latency on every SQLAlchemy session of this class"""
+    from sqlalchemy import event
+
+    if getattr(session_class, '_metrics_instrumented', False):
+        return
+    session_class._metrics_instrumented = True
+
+    @event.listens_for(session_class, 'before_commit')
+    def _before_commit(session):
+        session.info['_commit_start'] = time.perf_counter()
+
+    @event.listens_for(session_class, 'after_commit')
+    def _after_commit(session):
+        start = session.info.pop('_commit_start', None)
+        if start is not None:
+            DB_COMMIT_LATENCY.observe(time.perf_counter() - start)
+
+    @event.listens_for(session_class, 'after_rollback')
+    def _after_rollback(session):
+        session.info.pop('_commit_start', None)
+
+
+def instrument_http_session(session):
+    """Binance latency per endpoint and used weight, from a requests.Session response hook"""
+    from urllib.parse import urlsplit
+
+    def _on_response(response, *args, **kwargs):
+        BINANCE_LATENCY.observe(
+            response.elapsed.total_seconds(),
+            endpoint=urlsplit(response.url).path,
+            status=str(response.status_code)
+        )
+        weight = response.headers.get('X-MBX-USED-WEIGHT-1M')
+        if weight is not None:
+            BINANCE_WEIGHT.set(int(weight))
+
+    session.hooks.setdefault('response', []).append(_on_response)
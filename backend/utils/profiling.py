@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Profiling - Opt-in cProfile capture of single requests and refresh cycles
+A request is profiled when PROFILING_ENABLED is set and it carries the
+X-Profile header (or wins the PROFILE_SAMPLE_RATE draw). Each capture writes
+a pstats file and a small JSON summary into a directory that keeps only the
+newest captures; the collapsed-stack file (flamegraph.pl / speedscope input)
+is derived from the pstats file when first downloaded.
+When profiling is disabled nothing is installed on the request path.
+"""
+import cProfile
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 64
+MAX_STACK_NODES = 20000  # path nodes visited per collapsed-stack export
+MIN_STACK_TIME = 1e-6  # seconds - lighter subtrees are not expanded
+
+
+def collapsed_stacks(stats):
+    """
+    Collapsed-stack lines ("root;child;leaf microseconds") from pstats data
+
+    cProfile only keeps caller -> callee edges, not full stacks, so the time of
+    a function reached through several callers is split along each path in
+    proportion to that caller's share of its cumulative time. The number of
+    paths grows exponentially with the call graph (SQLAlchemy alone reaches
+    the same functions through dozens of callers), so the walk expands the
+    heaviest edges first, skips subtrees worth less than MIN_STACK_TIME and
+    stops after MAX_STACK_NODES nodes. The heaviest paths are kept (about 80%
+    of a database request's time) and building takes tens of milliseconds.
+    """
+    def label(func):
+        filename, line, name = func
+        return f"{name} ({os.path.basename(filename)}:{line})" if line else name
+
+    # Per edge, computed once: (callee, self time through the edge, share of the callee's subtree)
+    children = {}
+    for func, (_, _, _, ct, callers) in stats.stats.items():
+        for caller, (_, _, edge_tt, edge_ct) in callers.items():
+            children.setdefault(caller, []).append((func, edge_tt, edge_ct / ct if ct else 0, edge_ct))
+    for edges in children.values():
+        edges.sort(key=lambda edge: edge[3], reverse=True)
+    labels = {func: label(func) for func in stats.stats}
+
+    lines = {}
+    budget = [MAX_STACK_NODES]
+
+    def walk(func, path, on_path, self_time, scale):
+        budget[0] -= 1
+        path.append(labels[func])
+        on_path.add(func)
+        if self_time > 0:
+            key = ';'.join(path)
+            lines[key] = lines.get(key, 0) + self_time
+        if len(path) < MAX_STACK_DEPTH:
+            for child, edge_tt, share, edge_ct in children.get(func, ()):
+                if budget[0] <= 0 or edge_ct * scale < MIN_STACK_TIME:
+                    break  # Edges are sorted: the rest are lighter
+                if child not in on_path:  # Recursion: keep the first occurrence
+                    walk(child, path, on_path, edge_tt * scale, scale * share)
+        path.pop()
+        on_path.discard(func)
+
+    roots = [(func, tt, ct) for func, (_, _, tt, ct, callers) in stats.stats.items() if not callers]
+    for func, tt, _ in sorted(roots, key=lambda root: root[2], reverse=True):
+        if budget[0] <= 0:
+            break
+        walk(func, [], set(), tt, 1.0)
+
+    return [f"{stack} {int(seconds * 1e6)}" for stack, seconds in lines.items() if int(seconds * 1e6) > 0]
+
+
+class Profiler:
+    """Writes cProfile captures into a bounded directory"""
+
+    def __init__(self, directory, max_profiles=50, sample_rate=0.0, header='X-Profile'):
+        """
+        Args:
+            directory: Where captures are written (created if missing)
+            max_profiles: Captures kept (oldest deleted first)
+            sample_rate: Fraction of requests/cycles profiled without the header
+            header: Request header forcing a capture ("1"/"true")
+        """
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.sample_rate = sample_rate
+        self.header = header
+        self._lock = threading.Lock()
+        self._active = threading.local()
+        os.makedirs(directory, exist_ok=True)
+
+    def wanted(self, headers=None):
+        """True if this request/cycle should be profiled"""
+        if headers is not None and headers.get(self.header, '').lower() in ('1', 'true', 'yes'):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        """Begin a capture on this thread (False if one is already running)"""
+        if getattr(self._active, 'profile', None) is not None:
+            return False
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return False  # Another thread's capture holds the profiler (Python 3.12+)
+        self._active.profile = profile
+        self._active.started = time.perf_counter()
+        return True
+
+    def stop(self, name, meta=None):
+        """
+        End this thread's capture and write it
+
+        Returns:
+            Profile id (None if no capture was running)
+        """
+        profile = getattr(self._active, 'profile', None)
+        if profile is None:
+            return None
+        profile.disable()
+        duration = time.perf_counter() - self._active.started
+        self._active.profile = None
+
+        try:
+            return self._save(profile, name, duration, meta or {})
+        except OSError as e:
+            logger.warning(f"⚠️  Could not write profile for {name}: {e}")
+            return None
+
+    @contextmanager
+    def profile(self, name, meta=None):
+        """Profile the with-block unconditionally"""
+        started = self.start()
+        try:
+            yield
+        finally:
+            if started:
+                self.stop(name, meta)
+
+    def maybe(self, name):
+        """Profile the with-block if it wins the sample_rate draw"""
+        return self.profile(name) if self.wanted() else nullcontext()
+
+    def _save(self, profile, name, duration, meta):
+        created = datetime.utcnow()
+        profile_id = f"{created.strftime('%Y%m%dT%H%M%S%f')}-{re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_')[:60]}"
+        base = os.path.join(self.directory, profile_id)
+
+        stats = pstats.Stats(profile)
+        stats.dump_stats(f"{base}.prof")
+
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:15]
+        summary = {
+            'id': profile_id,
+            'name': name,
+            'created': created.isoformat(),
+            'duration_ms': round(duration * 1000, 3),
+            **meta,
+            'top_cumulative': [
+                {'function': f"{func[2]} ({os.path.basename(func[0])}:{func[1]})",
+                 'calls': nc, 'cumulative_ms': round(ct * 1000, 3), 'self_ms': round(tt * 1000, 3)}
+                for func, (_, nc, tt, ct, _) in top
+            ]
+        }
+        with open(f"{base}.json", 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+        self._rotate()
+        logger.info(f"🔬 Profile {profile_id} written ({summary['duration_ms']:.1f} ms)")
+        return profile_id
+
+    def _rotate(self):
+        """Delete the oldest captures beyond max_profiles"""
+        with self._lock:
+            ids = sorted(f[:-5] for f in os.listdir(self.directory) if f.endswith('.json'))
+            for profile_id in ids[:max(0, len(ids) - self.max_profiles)]:
+                for ext in ('.json', '.prof', '.collapsed'):
+                    try:
+                        os.remove(os.path.join(self.directory, profile_id + ext))
+                    except FileNotFoundError:
+                        pass
+
+    def list_profiles(self, limit=50):
+        """Summaries of the newest captures, newest first"""
+        summaries = []
+        for filename in sorted((f for f in os.listdir(self.directory) if f.endswith('.json')), reverse=True)[:limit]:
+            try:
+                with open(os.path.join(self.directory, filename), encoding='utf-8') as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue  # Rotated away or half-written
+            summary.pop('top_cumulative', None)
+            summaries.append(summary)
+        return summaries
+
+    def path(self, profile_id, ext):
+        """
+        Path of one capture file (None if unknown)
+
+        Collapsed stacks are built from the pstats file on first request, not
+        while the profiled request or cycle is finishing.
+        """
+        if not re.fullmatch(r'[A-Za-z0-9_-]+', profile_id) or ext not in ('json', 'prof', 'collapsed'):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.{ext}")
+        if ext == 'collapsed' and not os.path.exists(path):
+            return self._write_collapsed(profile_id, path)
+        return path if os.path.exists(path) else None
+
+    def _write_collapsed(self, profile_id, path):
+        """Build <id>.collapsed from <id>.prof (None if the capture is gone)"""
+        source = os.path.join(self.directory, f"{profile_id}.prof")
+        try:
+            lines = collapsed_stacks(pstats.Stats(source))
+        except (OSError, EOFError, TypeError, ValueError):
+            return None  # Rotated away or half-written
+        temp = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temp, path)  # Concurrent readers see all of it or nothing
+        return path
+
+
+def get_profiler(app):
+    """The app's Profiler, or None when profiling is disabled"""
+    return app.extensions.get('profiler')
+
+
+def init_app(app):
+    """Install the request hooks when PROFILING_ENABLED is set"""
+    if not app.config.get('PROFILING_ENABLED'):
+        return None
+
+    from flask import g, request
+
+    profiler = Profiler(
+        app.config['PROFILE_DIR'],
+        max_profiles=app.config.get('PROFILE_MAX_FILES', 50),
+        sample_rate=app.config.get('PROFILE_SAMPLE_RATE', 0.0),
+        header=app.config.get('PROFILE_HEADER', 'X-Profile')
+    )
+    app.extensions['profiler'] = profiler
+
+    @app.before_request
+    def _start_profile():
+        if not request.path.startswith('/api/admin') and profiler.wanted(request.headers):
+            g._profiling = profiler.start()
+
+    @app.after_request
+    def _save_profile(response):
+        if g.pop('_profiling', False):
+            rule = request.url_rule.rule if request.url_rule else request.path
+            profile_id = profiler.stop(f"{request.method} {rule}", {
+                'method': request.method, 'path': request.full_path.rstrip('?'), 'status': response.status_code
+            })
+            if profile_id:
+                response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def _discard_profile(exc):
+        # Request failed before after_request: still record it
+        if g.pop('_profiling', False):
+            profiler.stop(f"{request.method} {request.path}", {'error': repr(exc)})
+
+    logger.info(f"🔬 Profiling enabled ({profiler.directory}, header {profiler.header}, "
+                f"sample rate {profiler.sample_rate})")
+    return profiler
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Query Stats - Count SQL statements and DB time per request and per background cycle
+SQLAlchemy cursor events feed the collector active in the current context
+(one per request, one per refresh/snapshot/ingest cycle). Totals per route or
+cycle are kept in memory for GET /api/admin/query-stats; identical statements
+repeated inside one unit of work are reported as N+1 suspects.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_KEPT = 5
+REPEAT_THRESHOLD = 5  # Same statement this many times in one unit = N+1 suspect
+STATEMENT_PREVIEW = 300
+
+_current = ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    """Statements executed by one request or cycle"""
+
+    __slots__ = ('name', 'count', 'time', 'slowest', 'repeats')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.time = 0.0
+        self.slowest = []  # [(seconds, statement)], longest first
+        self.repeats = {}
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.time += seconds
+        self.repeats[statement] = self.repeats.get(statement, 0) + 1
+        if len(self.slowest) < SLOWEST_KEPT or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[SLOWEST_KEPT:]
+
+    def repeated(self):
+        """{statement: executions} for statements run at least REPEAT_THRESHOLD times"""
+        return {s: n for s, n in self.repeats.items() if n >= REPEAT_THRESHOLD}
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'queries': self.count,
+            'db_time_ms': round(self.time * 1000, 3),
+            'slowest': [{'ms': round(s * 1000, 3), 'statement': q[:STATEMENT_PREVIEW]} for s, q in self.slowest],
+            'repeated': [{'count': n, 'statement': q[:STATEMENT_PREVIEW]}
+                         for q, n in sorted(self.repeated().items(), key=lambda item: -item[1])]
+        }
+
+
+class QueryStatsRegistry:
+    """Aggregates finished units per route / cycle name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def add(self, stats):
+        with self._lock:
+            total = self._totals.setdefault(stats.name, {
+                'units': 0, 'queries': 0, 'max_queries': 0, 'db_time': 0.0,
+                'slowest': [], 'repeated': {}
+            })
+            total['units'] += 1
+            total['queries'] += stats.count
+            total['max_queries'] = max(total['max_queries'], stats.count)
+            total['db_time'] += stats.time
+            total['slowest'] = sorted(total['slowest'] + stats.slowest, key=lambda item: item[0],
+                                      reverse=True)[:SLOWEST_KEPT]
+            for statement, n in stats.repeated().items():
+                total['repeated'][statement] = max(total['repeated'].get(statement, 0), n)
+
+    def snapshot(self):
+        """{name: aggregate} sorted by total DB time"""
+        with self._lock:
+            items = sorted(self._totals.items(), key=lambda item: item[1]['db_time'], reverse=True)
+            return {
+                name: {
+                    'units': t['units'],
+                    'queries': t['queries'],
+                    'avg_queries': round(t['queries'] / t['units'], 2),
+                    'max_queries': t['max_queries'],
+                    'db_time_ms': round(t['db_time'] * 1000, 3),
+                    'avg_db_time_ms': round(t['db_time'] * 1000 / t['units'], 3),
+                    'slowest': [{'ms': round(s * 1000, 3), 'statement': q[:STATEMENT_PREVIEW]}
+                                for s, q in t['slowest']],
+                    'repeated': [{'max_count': n, 'statement': q[:STATEMENT_PREVIEW]}
+                                 for q, n in sorted(t['repeated'].items(), key=lambda item: -item[1])]
+                }
+                for name, t in items
+            }
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+
+registry = QueryStatsRegistry()
+_installed = False
+
+
+def install():
+    """Attach the cursor listeners to every Engine (idempotent)"""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        started = conn.info.get('_query_started')
+        if stats is not None and started:
+            stats.record(statement, time.perf_counter() - started.pop())
+
+
+def start(name):
+    """Begin collecting for `name` in the current context (returns a token for stop)"""
+    stats = QueryStats(name)
+    return stats, _current.set(stats)
+
+
+def stop(stats, token, keep=True):
+    """End collection; record the unit in the registry unless keep=False"""
+    _current.reset(token)
+    if keep:
+        registry.add(stats)
+    return stats
+
+
+@contextmanager
+def collect(name):
+    """Collect the statements of a background cycle under `name`"""
+    stats, token = start(name)
+    try:
+        yield stats
+    finally:
+        stop(stats, token)
+
+
+def current():
+    """QueryStats of the running unit (None outside requests/cycles)"""
+    return _current.get()
+
+
+def init_app(app):
+    """Per-request collection, debug headers and the SQL_QUERY_BUDGET warning"""
+    from flask import g, request
+
+    install()
+    budget = app.config.get('SQL_QUERY_BUDGET') or 0
+    headers = app.debug or app.config.get('SQL_STATS_HEADERS', False)
+
+    @app.before_request
+    def _start_request_stats():
+        g._query_stats = start('unmatched')
+
+    @app.after_request
+    def _finish_request_stats(response):
+        pending = g.pop('_query_stats', None)
+        if pending is None:
+            return response
+        stats, token = pending
+        stats.name = f"{request.method} {request.url_rule.rule if request.url_rule else 'unmatched'}"
+        stop(stats, token)
+
+        if headers:
+            response.headers['X-SQL-Queries'] = str(stats.count)
+            response.headers['X-SQL-Time-Ms'] = f"{stats.time * 1000:.3f}"
+        limit = budget * g.get('_query_budget_units', 1)  # POST /api/batch: one budget per sub-request
+        if budget and stats.count > limit:
+            details = stats.to_dict()
+            logger.warning(
+                f"⚠️  {stats.name} ran {stats.count} SQL statements (budget {limit}, "
+                f"{details['db_time_ms']:.1f} ms); slowest: "
+                f"{details['slowest'][0]['statement'][:120] if details['slowest'] else '-'}"
+                + (f"; repeated: {details['repeated'][0]['count']}x {details['repeated'][0]['statement'][:120]}"
+                   if details['repeated'] else '')
+            )
+        return response
+
+    @app.teardown_request
+    def _drop_request_stats(exc):
+        # after_request did not run (unhandled error): close the unit anyway
+        pending = g.pop('_query_stats', None)
+        if pending is not None:
+            stats, token = pending
+            stats.name = f"{request.method} {request.url_rule.rule if request.url_rule else 'unmatched'}"
+            stop(stats, token)
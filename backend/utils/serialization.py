@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Serialization - Fast JSON encoding, columnar payloads and negotiated compression
+jsonify() goes through app.json: when orjson is installed (optional
+dependency) it replaces the stdlib provider with the same output (key order,
+datetimes as HTTP dates, non-ASCII characters escaped, indentation in debug)
+at a fraction of the CPU. One difference: NaN and infinities become null
+(valid JSON) where the stdlib encoder writes NaN/Infinity.
+Chart/list endpoints can answer in a columnar shape ({"t": [...], "twr": [...]},
+epoch-second timestamps) when asked with ?format=columnar. Responses above
+COMPRESSION_MIN_SIZE are compressed with brotli (optional dependency) or
+gzip, whichever the client accepts.
+"""
+import gzip
+import logging
+import re
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_MIMETYPE = 'application/vnd.portfolio.columnar+json'
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/csv', 'text/html', COLUMNAR_MIMETYPE)
+
+_NON_ASCII = re.compile('[^\x00-\x7f]')
+
+
+def _escape_non_ascii(match):
+    """JSON escape of one character, as json.dumps(ensure_ascii=True) writes it"""
+    code = ord(match.group())
+    if code < 0x10000:
+        return f'\\u{code:04x}'
+    code -= 0x10000
+    return f'\\u{0xd800 | code >> 10:04x}\\u{0xdc00 | code & 0x3ff:04x}'
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (drop-in for the stdlib provider)"""
+
+    def _options(self, indent):
+        # Datetimes go through DefaultJSONProvider.default (HTTP date), like the stdlib provider
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent=False):
+        data = orjson.dumps(obj, default=self.default, option=self._options(indent))
+        if self.ensure_ascii and not data.isascii():
+            # orjson always writes UTF-8; non-ASCII bytes only occur inside strings
+            data = _NON_ASCII.sub(_escape_non_ascii, data.decode('utf-8')).encode('ascii')
+        return data
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype)
+
+
+def json_fragment(app, data):
+    """
+    Embed an already encoded JSON document in an object passed to app.json
+
+    With the orjson provider (3.9+) the bytes are copied into the output as
+    they are (orjson.Fragment, no decoding); otherwise they are decoded.
+    """
+    if isinstance(app.json, OrjsonProvider) and hasattr(orjson, 'Fragment'):
+        return orjson.Fragment(data)
+    return app.json.loads(data)
+
+
+def wants_columnar(request):
+    """True if the client asked for the columnar shape (?format=columnar or Accept)"""
+    return request.args.get('format') == 'columnar' or \
+        request.accept_mimetypes.best == COLUMNAR_MIMETYPE
+
+
+def available_encodings():
+    """Content codings this process can produce, preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=4):
+    """Compress a response body with 'br' or 'gzip'"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def init_app(app):
+    """Install the orjson provider (JSON_SERIALIZER) and response compression (COMPRESSION_*)"""
+    from flask import request
+
+    serializer = app.config.get('JSON_SERIALIZER', 'auto')
+    if serializer == 'orjson' and orjson is None:
+        logger.warning("⚠️  JSON_SERIALIZER=orjson but orjson is not installed, using the stdlib encoder")
+    if serializer in ('auto', 'orjson') and orjson is not None:
+        app.json = OrjsonProvider(app)
+
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+    gzip_level = app.config.get('GZIP_LEVEL', 6)
+    brotli_quality = app.config.get('BROTLI_QUALITY', 4)
+    encodings = available_encodings()
+
+    @app.after_request
+    def _compress_response(response):
+        if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers \
+                or response.status_code < 200 or response.status_code in (204, 206, 304) \
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding, gzip_level, brotli_quality))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    logger.info(f"🗜️  JSON via {'orjson' if isinstance(app.json, OrjsonProvider) else 'stdlib'}, "
+                f"compression {'/'.join(encodings)} above {min_size} bytes")
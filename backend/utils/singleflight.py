@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Single Flight - Concurrent identical calls share one execution
+Several dashboard tabs polling at once ask for the same TWR/P&L horizon in
+parallel greenlets; without coordination each one scans the snapshots. A
+SingleFlight group runs the first call for a key and makes the callers that
+arrive while it is in flight wait for its result instead of computing it
+again. Nothing is cached: once the call returns, the next caller computes
+afresh, so results are never older than one computation.
+
+Waiting uses threading primitives, which gevent monkey-patches into
+cooperative ones, so this works under both thread and gevent workers.
+"""
+import copy
+import logging
+import threading
+from utils.metrics import SINGLEFLIGHT_CALLS, SINGLEFLIGHT_COALESCED
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight execution"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Group of keyed calls executed at most once concurrently"""
+
+    def __init__(self, name):
+        """
+        Args:
+            name: Group label in the metrics (e.g. 'twr')
+        """
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Run fn() unless a call with the same key is in flight, then share its outcome
+
+        Args:
+            key: Hashable identifying identical work (e.g. the horizon in days)
+            fn: Zero-argument callable
+
+        Returns:
+            A deep copy of fn's result for every caller (callers may mutate it);
+            fn's exception is raised in every caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if leader:
+            SINGLEFLIGHT_CALLS.inc(group=self.name)
+            try:
+                call.result = fn()
+            except BaseException as e:
+                # Waiters get the error too (an interrupted leader must not hand them None)
+                call.error = e if isinstance(e, Exception) else RuntimeError(f"{self.name} call interrupted")
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+                if call.waiters:
+                    logger.debug(f"{self.name}{key!r}: {call.waiters} callers coalesced")
+            return copy.deepcopy(call.result)
+
+        SINGLEFLIGHT_COALESCED.inc(group=self.name)
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+    def in_flight(self):
+        """Number of keys currently executing"""
+        with self._lock:
+            return len(self._calls)
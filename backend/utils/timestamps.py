@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Timestamps - Codec for the INTEGER timestamp columns (epoch seconds, UTC)
+Single place that knows the storage format: scalar encode/decode with integer
+arithmetic (no strftime/strptime) and column-at-a-time decoders for exports
+and columnar API responses. Stored values are epoch seconds, so range bounds
+are plain additions (`ts - days * 86400`) and columnar responses return the
+column as it is.
+
+Databases written by older versions store YYYYMMDDHHMM integers, which
+db.migrations converts in place. Until it has run, decoding is tolerant: any
+value of LEGACY_MIN or more is a legacy one (as epoch seconds it would lie
+after the year 5000).
+"""
+from datetime import date, datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+LEGACY_MIN = 10 ** 11  # 12-digit YYYYMMDDHHMM values start here
+
+# ISO time-of-day parts, indexed by hour and by second within the hour
+_HOURS = [f"T{h:02d}:" for h in range(24)]
+_MINUTES_SECONDS = [f"{s // 60:02d}:{s % 60:02d}" for s in range(3600)]
+
+
+def encode(dt):
+    """Naive UTC datetime -> stored integer (ints pass through, legacy ones converted)"""
+    if isinstance(dt, int):
+        return normalize(dt)
+    return (dt.toordinal() - EPOCH_ORDINAL) * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+
+
+def decode(value):
+    """Stored integer -> naive UTC datetime (datetimes pass through)"""
+    if isinstance(value, datetime):
+        return value
+    value = int(value)
+    if value >= LEGACY_MIN:
+        value = from_legacy(value)
+    return EPOCH + timedelta(0, value)
+
+
+def from_legacy(value):
+    """
+    YYYYMMDDHHMM integer -> epoch seconds
+
+    Raises:
+        ValueError: Not a valid date and time
+    """
+    hour, minute = value // 100 % 100, value % 100
+    if hour > 23 or minute > 59:
+        raise ValueError(f"invalid legacy timestamp {value}")
+    day = date(value // 100000000, value // 1000000 % 100, value // 10000 % 100)
+    return (day.toordinal() - EPOCH_ORDINAL) * 86400 + hour * 3600 + minute * 60
+
+
+def normalize(value):
+    """Stored integer in either format -> epoch seconds"""
+    return from_legacy(value) if value >= LEGACY_MIN else value
+
+
+def iso_many(values):
+    """Column of stored integers -> ISO 8601 strings ("2025-12-21T01:45:00")"""
+    out = []
+    days_cache = {}  # days since 1970-01-01 -> "YYYY-MM-DD"
+    hours, minutes_seconds = _HOURS, _MINUTES_SECONDS
+    for v in values:
+        if v >= LEGACY_MIN:
+            v = from_legacy(v)
+        days, seconds = divmod(v, 86400)
+        day = days_cache.get(days)
+        if day is None:
+            day = days_cache[days] = date.fromordinal(EPOCH_ORDINAL + days).isoformat()
+        out.append(day + hours[seconds // 3600] + minutes_seconds[seconds % 3600])
+    return out
+
+
+def epoch_many(values):
+    """Column of stored integers -> epoch seconds (UTC): the values themselves once migrated"""
+    if values and max(values) >= LEGACY_MIN:
+        return [normalize(v) for v in values]
+    return list(values)
+
+
+def arrow_timestamps(values):
+    """Column of stored integers -> pyarrow timestamp[s] array (a cast, no parsing)"""
+    import pyarrow as pa
+
+    return pa.array(epoch_many(values), type=pa.int64()).cast(pa.timestamp('s'))
@@ -12,10 +12,11 @@ app = create_app('production')
 # Start auto-refresh service when run by WSGI server (Gunicorn)
 # This ensures background portfolio updates work in production
 if __name__ != '__main__':
-    # When imported by Gunicorn, start auto-refresh
+    # When imported by Gunicorn, start auto-refresh in every worker:
+    # leader election makes sure only one of them runs the loops
     from services.auto_refresh import start_auto_refresh
     start_auto_refresh(app)
-    print("✅ Auto-refresh service started (production mode)")
+    print(f"✅ Auto-refresh service started (production mode, pid {os.getpid()})")
 
 # Allow running directly for testing
 if __name__ == '__main__':
@@ -257,14 +257,41 @@ export const usePerformanceStore = defineStore('performance', () => {
       loading.value = true
       error.value = null
 
-      // Fetch all data in parallel without individual loading states
-      await Promise.all([
-        fetchSnapshots(null, null, false),
-        fetchCashFlows(null, null, false),
-        fetchStats(false),
-        fetchAllTWR(false),
-        fetchAllPnL(false)
-      ])
+      const periods = [7, 14, 30, 60, 180, 365]
+
+      // One round-trip for everything (POST /api/batch), all read from the same database state
+      const data = await api.post('/batch', {
+        requests: [
+          { id: 'snapshots', path: '/api/performance/snapshots' },
+          { id: 'cashflows', path: '/api/performance/cashflows' },
+          { id: 'stats', path: '/api/performance/stats' },
+          ...periods.map(days => ({ id: `twr-${days}`, path: `/api/performance/twr/${days}` })),
+          ...periods.map(days => ({ id: `pnl-${days}`, path: `/api/performance/pnl/${days}` }))
+        ]
+      })
+
+      // Keep every successful body; a failed sub-request leaves its previous value in place
+      const bodies = {}
+      const failures = []
+      for (const response of data.responses) {
+        if (response.status >= 400) {
+          failures.push(`${response.path}: ${response.body?.error || response.status}`)
+        } else {
+          bodies[response.id] = response.body
+        }
+      }
+
+      if (bodies.snapshots) snapshots.value = bodies.snapshots.snapshots
+      if (bodies.cashflows) cashFlows.value = bodies.cashflows.cashflows
+      if (bodies.stats) trackingStats.value = bodies.stats
+      periods.forEach(days => {
+        if (bodies[`twr-${days}`]) twrMetrics.value[`${days}d`] = bodies[`twr-${days}`]
+        if (bodies[`pnl-${days}`]) pnlMetrics.value[`${days}d`] = bodies[`pnl-${days}`]
+      })
+
+      if (failures.length) {
+        throw new Error(failures.join('; '))
+      }
     } catch (err) {
       error.value = err.message
       console.error('Erreur lors du rafraîchissement des données:', err)